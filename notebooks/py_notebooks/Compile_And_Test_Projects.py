@@ -68,3 +68,14 @@ for compiled_project in compiled_projects.found_projects:
     tester = TestMatlabProject(compiled_project)
     with tester.temporary_log_level('DEBUG'):  
         tester.test_project()
+
+# %% [markdown]
+# # Or run the test cases of all projects at once, with a JUnit XML report:
+
+# %%
+
+from visp_matlab_loader.test.regression_runner import PASSED, run_regression, to_junit_xml
+
+regression_results = run_regression(compiled_projects.found_projects)
+print(sum(result.status != PASSED for result in regression_results), "test cases did not pass")
+to_junit_xml(regression_results).write("regression_results.xml")
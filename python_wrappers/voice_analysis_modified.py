@@ -79,6 +79,12 @@ parser.add_argument(
     "filename", type=str, help="Input filename"
 )  # New filename argument
 parser.add_argument("output", type=str, help="Output filename")  # New filename argument
+parser.add_argument(
+    "--output_format",
+    default=None,
+    choices=["json", "npz"],
+    help="Output file format, by default npz if the output filename ends with .npz and json otherwise",
+)
 
 # Parse the arguments
 args = parser.parse_args()
@@ -127,6 +133,9 @@ executor = MatlabExecutor(va_toolbox, return_inputs=True)
 pass_args = vars(args)
 filename = pass_args.pop("filename")
 output = pass_args.pop("output")
+output_format = pass_args.pop("output_format")
+if output_format is None:
+    output_format = "npz" if output.endswith(".npz") else "json"
 matlab_format = dict()
 
 
@@ -142,8 +151,11 @@ matlab_format["dfa_scaling"] = ensure_vector(
 
 result = executor.execute_script("voice_analysis_modified", 3, filename, matlab_format)
 
-# Save json to output file
-result.to_json(output)
+# Save the result to the output file; npz stores arrays raw, which is much smaller and faster for large outputs
+if output_format == "npz":
+    result.to_npz(output)
+else:
+    result.to_json(output)
 
 if result.return_code == 0:
     print(f"Execution successful, result saved to {output}")
@@ -0,0 +1,106 @@
+"""
+Benchmark of the start latency of a project compiled with each compile profile.
+
+The project is compiled once per profile (see compile/compile_profiles.py), into
+<output directory>/<profile>/<project>. Each binary is then started repeatedly without calling
+any function (see MatlabExecutor.warm_up), every repeat with a new, empty MCR cache root, so
+that both the cold start (extracting the binary) and the warm start are measured:
+
+    python -m visp_matlab_loader.benchmark.compile_profile_benchmark matlab/libraries/get_next_thousand /tmp/profiles
+    python -m visp_matlab_loader.benchmark.compile_profile_benchmark matlab/libraries/get_next_thousand /tmp/profiles \\
+        --profiles default startup --repeat 10 --skip-compile --output startup.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+
+from visp_matlab_loader.compile.compile_profiles import PROFILES, get_profile
+from visp_matlab_loader.compile.matlab_compiler import MATLABProjectCompiler
+from visp_matlab_loader.project.matlab_project import MatlabProject
+
+
+def compile_profile(project_path: str, output_directory: str, profile: str) -> str:
+    """Compile the project with the profile, returning the wrapper file of the compiled project."""
+    project_name = os.path.basename(os.path.normpath(project_path))
+    project_output = os.path.join(output_directory, profile, project_name)
+    os.makedirs(project_output, exist_ok=True)
+    compiler = MATLABProjectCompiler(project_path, project_output)
+    code, message = compiler.compile_project(force_output=True, profile=profile)
+    if code != 0:
+        raise RuntimeError(f"Compiling {project_name} with profile {profile} failed:\n{message}")
+    return os.path.join(project_output, f"{project_name}_wrapper.m")
+
+
+def measure_startup(wrapper_file: str, repeat: int) -> dict:
+    """The median cold and warm start times of a compiled project, in seconds."""
+    project = MatlabProject(wrapper_file)
+    cold_starts, warm_starts = [], []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory(prefix="mcr_cache_") as cache_root:
+            (result,) = project.warm_up(cache_root, function_binaries=False)
+        if not result.success:
+            raise RuntimeError(f"Starting {wrapper_file} failed with code {result.return_code}:\n{result.message}")
+        cold_starts.append(result.cold_start)
+        warm_starts.append(result.warm_start)
+    project.executor.set_mcr_cache_root(None)
+    return {
+        "cold_start": statistics.median(cold_starts),
+        "warm_start": statistics.median(warm_starts),
+        "cold_start_min": min(cold_starts),
+        "warm_start_min": min(warm_starts),
+        "repeat": repeat,
+    }
+
+
+def run(
+    project_path: str, output_directory: str, profiles: list[str] | None = None, repeat: int = 5, compile_first=True
+) -> dict:
+    """Compile the project with each profile and measure its start times, by profile name."""
+    results = {}
+    for profile in profiles or list(PROFILES):
+        runtime_options = list(get_profile(profile).runtime_options)
+        if compile_first:
+            wrapper_file = compile_profile(project_path, output_directory, profile)
+        else:
+            project_name = os.path.basename(os.path.normpath(project_path))
+            wrapper_file = os.path.join(output_directory, profile, project_name, f"{project_name}_wrapper.m")
+        results[profile] = {"runtime_options": runtime_options, **measure_startup(wrapper_file, repeat)}
+    return results
+
+
+def print_results(results: dict) -> None:
+    baseline = next(iter(results.values()), None)
+    print(f"{'profile':<12} {'cold (s)':>9} {'warm (s)':>9} {'vs first':>9}  runtime options")
+    for profile, result in results.items():
+        relative = result["cold_start"] / baseline["cold_start"] if baseline["cold_start"] else float("nan")
+        print(
+            f"{profile:<12} {result['cold_start']:>9.3f} {result['warm_start']:>9.3f} {relative:>8.2f}x  "
+            f"{' '.join(result['runtime_options']) or '-'}"
+        )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("project_path", help="The source directory of the project")
+    parser.add_argument("output_directory", help="The directory to compile each profile into")
+    parser.add_argument("--profiles", nargs="+", choices=list(PROFILES), help="Defaults to all profiles")
+    parser.add_argument("--repeat", type=int, default=5, help="The number of cold and warm starts per profile")
+    parser.add_argument("--skip-compile", action="store_true", help="Use the projects compiled by an earlier run")
+    parser.add_argument("--output", help="The JSON file to write the results to")
+    args = parser.parse_args(argv)
+
+    results = run(args.project_path, args.output_directory, args.profiles, args.repeat, not args.skip_compile)
+    print_results(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
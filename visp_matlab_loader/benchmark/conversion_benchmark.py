@@ -0,0 +1,51 @@
+"""
+Benchmark of MatlabExecutor.mat_struct_to_dict, the conversion applied to every output.
+
+The conversion should only depend on the number of structs and cells in the output, not on
+the size of the numeric arrays they contain. Run as:
+
+    python -m visp_matlab_loader.benchmark.conversion_benchmark [--sizes 100 10000 1000000]
+"""
+from __future__ import annotations
+
+import argparse
+import timeit
+
+import numpy as np
+
+from visp_matlab_loader.execute.compiled_project_executor import MatlabExecutor
+
+
+def make_outputs(size: int) -> dict:
+    """Outputs shaped as loaded from results.mat, with numeric arrays of the given size."""
+    cell = np.empty((3,), dtype=object)
+    cell[:] = [np.arange(size, dtype=float), "text", np.ones((size,), dtype=bool)]
+    return {
+        "features": np.random.default_rng(0).random(size),
+        "matrix": np.zeros((size, 2)),
+        "cell": cell,
+        "struct": {"values": np.arange(size, dtype=np.int32), "name": "name"},
+    }
+
+
+def time_conversion(size: int, repeat: int = 5) -> float:
+    """The best time, in seconds, to convert outputs with arrays of the given size."""
+    outputs = make_outputs(size)
+    timer = timeit.Timer(lambda: {n: MatlabExecutor.mat_struct_to_dict(v) for n, v in outputs.items()})
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10**x for x in range(2, 8)])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"{'Array size':>12} {'Conversion time (us)':>22}")
+    for size in args.sizes:
+        print(f"{size:>12} {time_conversion(size, args.repeat) * 1e6:>22.2f}")
+
+
+if __name__ == "__main__":
+    main()
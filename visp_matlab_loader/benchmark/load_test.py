@@ -0,0 +1,362 @@
+"""
+Load and soak testing of MATLAB calls, reporting latency percentiles, throughput and resource leaks.
+
+Calls are made through MatlabFunction.execute from several threads (or through MatlabFunction.map,
+or MatlabExecutor.execute_batch), either as fast as the concurrency allows or at a fixed arrival
+rate. By default, the stand-in runtime from `utils/stand_in_runtime.py` is used as the binary,
+so no MATLAB installation is needed; a real project can be given with --project.
+
+While the load runs, the open files, temporary call directories and resident memory of this
+process are sampled. At the end, a latency histogram is printed together with any leaks found:
+open files or temporary directories left behind, or memory that kept growing.
+
+    python -m visp_matlab_loader.benchmark.load_test --concurrency 4 --rate 20 --duration 3600
+
+The exit status is nonzero if any call failed or a leak was found.
+"""
+from __future__ import annotations
+
+import argparse
+import bisect
+import gc
+import glob
+import json
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator
+
+import numpy as np
+
+from visp_matlab_loader.execute import metrics, phase_timings
+from visp_matlab_loader.execute.matlab_execution_result import MatlabExecutionResult
+from visp_matlab_loader.project.matlab_function import MatlabFunction
+from visp_matlab_loader.project.matlab_project import MatlabProject
+from visp_matlab_loader.utils.stand_in_runtime import create_stand_in_project
+
+MODES = ("execute", "map", "batch")
+
+# The prefix of the private directories created for each call, see MatlabExecutor._run_input
+CALL_DIRECTORY_PATTERN = "matlab_call_*"
+
+# The shortest steady period, in seconds, over which memory growth is judged; shorter runs are too noisy
+MIN_RSS_WINDOW = 600.0
+
+
+def open_file_count() -> int | None:
+    """The number of open file descriptors of this process, or None if it cannot be found."""
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return None
+
+
+def call_directories() -> set[str]:
+    """The temporary call directories that currently exist."""
+    return set(glob.glob(os.path.join(tempfile.gettempdir(), CALL_DIRECTORY_PATTERN)))
+
+
+def rss_bytes() -> int:
+    """The resident memory of this process, or its peak if the current value cannot be found."""
+    try:
+        with open("/proc/self/status", "r", encoding="utf-8") as file:
+            for line in file:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class ResourceSampler:
+    """Samples the resources of this process at a fixed interval, from a background thread."""
+
+    def __init__(self, interval: float = 5.0) -> None:
+        self.interval = interval
+        self.samples: list[dict] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="resource-sampler", daemon=True)
+
+    def sample(self) -> dict:
+        sample = {
+            "time": time.monotonic(),
+            "open_files": open_file_count(),
+            "call_directories": len(call_directories()),
+            "rss_bytes": rss_bytes(),
+        }
+        self.samples.append(sample)
+        return sample
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+
+def percentiles(latencies: list[float]) -> dict:
+    if not latencies:
+        return {}
+    values = np.percentile(latencies, [50, 95, 99])
+    return {
+        "p50": float(values[0]),
+        "p95": float(values[1]),
+        "p99": float(values[2]),
+        "max": float(max(latencies)),
+        "mean": float(np.mean(latencies)),
+    }
+
+
+def histogram(latencies: list[float], buckets=metrics.DEFAULT_BUCKETS) -> list[tuple[float, int]]:
+    """The number of latencies per bucket, with the upper bound of each bucket (inf for the last)."""
+    counts = [0] * (len(buckets) + 1)
+    for latency in latencies:
+        counts[bisect.bisect_left(buckets, latency)] += 1
+    return list(zip([*buckets, float("inf")], counts))
+
+
+def rss_growth_per_hour(samples: list[dict]) -> tuple[float, float]:
+    """The slope of the resident memory over the second half of the samples, in bytes per hour.
+
+    The first half is left out, as memory is expected to grow while caches and pools warm up.
+
+    Returns:
+        tuple[float, float]: The slope, and the length of the period it was fitted over in seconds.
+    """
+    steady = samples[len(samples) // 2 :]
+    if len(steady) < 3 or steady[-1]["time"] <= steady[0]["time"]:
+        return 0.0, 0.0
+    times = np.array([sample["time"] for sample in steady])
+    slope = np.polyfit(times - times[0], [sample["rss_bytes"] for sample in steady], 1)[0]
+    return float(slope * 3600), float(times[-1] - times[0])
+
+
+def _arrivals(rate: float | None, deadline: float) -> Iterator[float]:
+    """The times at which to start calls until the deadline, waiting for each if a rate is given."""
+    start = time.monotonic()
+    index = 0
+    while True:
+        scheduled = start + index / rate if rate else time.monotonic()
+        if scheduled >= deadline:
+            return
+        delay = scheduled - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        yield scheduled
+        index += 1
+
+
+def _drive_execute(function: MatlabFunction, arguments: list, concurrency: int, rate, deadline, record) -> None:
+    """Call execute from concurrency threads. Latency includes any time spent waiting for a free thread."""
+
+    def call(scheduled: float) -> None:
+        result = function.execute(*arguments)
+        record(result, time.monotonic() - scheduled)
+
+    if rate:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for scheduled in _arrivals(rate, deadline):
+                pool.submit(call, scheduled)
+        return
+
+    def closed_loop() -> None:
+        while time.monotonic() < deadline:
+            call(time.monotonic())
+
+    threads = [threading.Thread(target=closed_loop) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def _drive_map(function: MatlabFunction, arguments: list, concurrency: int, rate, deadline, record) -> None:
+    """Call map with a stream of argument sets. Latency is the total time of each call."""
+    argument_sets = (list(arguments) for _ in _arrivals(rate, deadline))
+    for _, result in function.map(argument_sets, max_workers=concurrency, ordered=False):
+        record(result, result.timings.get(phase_timings.TOTAL, 0.0))
+
+
+def _drive_batch(
+    function: MatlabFunction, arguments: list, concurrency: int, rate, deadline, record, batch_size: int = 10
+) -> None:
+    """Call execute_batch from concurrency threads. Latency is the total time of the batch of each call."""
+    executor = function.matlab_project.executor
+    calls = [(function.function_name, function.output_count, arguments)] * batch_size
+    # With a rate, each arrival is a whole batch
+    batch_rate = rate / batch_size if rate else None
+
+    def batch(scheduled: float) -> None:
+        for result in executor.execute_batch(calls, chunk_size=batch_size):
+            record(result, time.monotonic() - scheduled)
+
+    def closed_loop() -> None:
+        while time.monotonic() < deadline:
+            batch(time.monotonic())
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        if batch_rate:
+            for scheduled in _arrivals(batch_rate, deadline):
+                pool.submit(batch, scheduled)
+        else:
+            for _ in range(concurrency):
+                pool.submit(closed_loop)
+
+
+def run_load(
+    function: MatlabFunction,
+    arguments: list,
+    mode: str = "execute",
+    concurrency: int = 4,
+    rate: float | None = None,
+    duration: float = 60.0,
+    sample_interval: float = 5.0,
+    open_file_tolerance: int = 5,
+    rss_growth_limit: float = 64 * 1024**2,
+) -> dict:
+    """Run a load test, returning a report of the latencies, throughput and leaks found.
+
+    Args:
+        function (MatlabFunction): The function to call.
+        arguments (list): The unnamed arguments of each call.
+        mode (str, optional): How to make the calls, one of MODES. Defaults to 'execute'.
+        concurrency (int, optional): The number of calls (or batches) running at the same time. Defaults to 4.
+        rate (float, optional): The number of calls to start per second. Defaults to as many as possible.
+        duration (float, optional): For how long to start new calls, in seconds. Defaults to 60.
+        sample_interval (float, optional): The time between resource samples, in seconds. Defaults to 5.
+        open_file_tolerance (int, optional): The number of extra open files allowed at the end. Defaults to 5.
+        rss_growth_limit (float, optional): The memory growth allowed per hour, in bytes, once warmed up.
+            Only checked if the second half of the run is at least MIN_RSS_WINDOW long. Defaults to 64 MB.
+
+    Returns:
+        dict: The report, see print_report.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode {mode}, expected one of {', '.join(MODES)}")
+    drive: Callable = {"execute": _drive_execute, "map": _drive_map, "batch": _drive_batch}[mode]
+
+    lock = threading.Lock()
+    latencies: list[float] = []
+    failures: dict[str, int] = {}
+
+    def record(result: MatlabExecutionResult, latency: float) -> None:
+        with lock:
+            latencies.append(latency)
+            if not result.success:
+                failures[str(result.return_code)] = failures.get(str(result.return_code), 0) + 1
+
+    existing_directories = call_directories()
+    sampler = ResourceSampler(sample_interval)
+    initial = sampler.sample()
+    sampler.start()
+    start = time.monotonic()
+    try:
+        drive(function, arguments, concurrency, rate, start + duration, record)
+    finally:
+        elapsed = time.monotonic() - start
+        sampler.stop()
+    gc.collect()
+    final = sampler.sample()
+
+    leaks = []
+    if initial["open_files"] is not None and final["open_files"] - initial["open_files"] > open_file_tolerance:
+        leaks.append(f"{final['open_files'] - initial['open_files']} more open files than at the start")
+    left_behind = call_directories() - existing_directories
+    if left_behind:
+        leaks.append(f"{len(left_behind)} temporary call directories left behind, e.g. {min(left_behind)}")
+    growth, window = rss_growth_per_hour(sampler.samples)
+    if window >= MIN_RSS_WINDOW and growth > rss_growth_limit:
+        leaks.append(f"Resident memory growing by {growth / 1024**2:.1f} MB per hour")
+
+    return {
+        "mode": mode,
+        "function": function.function_name,
+        "concurrency": concurrency,
+        "rate": rate,
+        "duration": elapsed,
+        "calls": len(latencies),
+        "failures": failures,
+        "throughput": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "latency": percentiles(latencies),
+        "histogram": histogram(latencies),
+        "rss_growth_per_hour": growth,
+        "samples": sampler.samples,
+        "leaks": leaks,
+    }
+
+
+def print_report(report: dict) -> None:
+    print(
+        f"{report['calls']} calls to {report['function']} ({report['mode']}, concurrency {report['concurrency']}) "
+        f"in {report['duration']:.1f} s: {report['throughput']:.2f} calls/s"
+    )
+    if report["failures"]:
+        print(f"Failures by return code: {report['failures']}")
+    if report["latency"]:
+        print("Latency (ms): " + ", ".join(f"{key} {value * 1e3:.1f}" for key, value in report["latency"].items()))
+    largest = max((count for _, count in report["histogram"]), default=0)
+    for bound, count in report["histogram"]:
+        if count:
+            bar = "#" * max(1, round(40 * count / largest))
+            print(f"  <= {bound * 1e3:>9.0f} ms {count:>8} {bar}")
+    first, last = report["samples"][0], report["samples"][-1]
+    print(
+        f"Open files {first['open_files']} -> {last['open_files']}, "
+        f"RSS {first['rss_bytes'] / 1024**2:.1f} -> {last['rss_bytes'] / 1024**2:.1f} MB "
+        f"({report['rss_growth_per_hour'] / 1024**2:+.1f} MB/h)"
+    )
+    for leak in report["leaks"]:
+        print(f"LEAK: {leak}")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--project", help="The wrapper file of the project, defaults to a stand-in project")
+    parser.add_argument("--function", default="getnextthousand")
+    parser.add_argument("--arguments", type=float, nargs="*", default=[1.0])
+    parser.add_argument("--mode", choices=MODES, default="execute")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rate", type=float, help="Calls started per second, as many as possible if not given")
+    parser.add_argument("--duration", type=float, default=60.0, help="Seconds")
+    parser.add_argument("--workers", type=int, default=0, help="Start this many workers (see start_workers)")
+    parser.add_argument("--sample-interval", type=float, default=5.0, help="Seconds")
+    parser.add_argument("--output", help="Also write the report to this JSON file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="load_test_") as directory:
+        project = MatlabProject(args.project or create_stand_in_project(directory))
+        if args.workers:
+            project.executor.start_workers(args.workers)
+        try:
+            report = run_load(
+                project.functions[args.function],
+                args.arguments,
+                args.mode,
+                args.concurrency,
+                args.rate,
+                args.duration,
+                args.sample_interval,
+            )
+        finally:
+            project.executor.stop_workers()
+
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+    return 1 if report["failures"] or report["leaks"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
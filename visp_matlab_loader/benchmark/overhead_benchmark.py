@@ -0,0 +1,185 @@
+"""
+Benchmark of the Python-side overhead of a MATLAB call, using the stand-in runtime.
+
+Each case calls a `get_next_thousand` function through MatlabExecutor, with the stand-in binary
+from `utils/stand_in_runtime.py`, so no MATLAB installation is needed. The cases cover input
+sizes, every output type of `getnextfivetypes` (double, char, cell, struct, logical) and output
+counts. The phases of each call are taken from MatlabExecutionResult.timings, and the overhead
+is everything except running the binary: marshalling, savemat, loadmat and converting outputs.
+
+Results are stored as a JSON baseline, which later runs can be compared against:
+
+    python -m visp_matlab_loader.benchmark.overhead_benchmark run --output baseline.json
+    python -m visp_matlab_loader.benchmark.overhead_benchmark run --output current.json
+    python -m visp_matlab_loader.benchmark.overhead_benchmark compare baseline.json current.json
+
+The compare command exits with a nonzero status if the overhead of any case has regressed.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+import scipy
+
+from visp_matlab_loader.execute import phase_timings
+from visp_matlab_loader.execute.compiled_project_executor import MatlabExecutor
+from visp_matlab_loader.project.matlab_project import MatlabProject
+from visp_matlab_loader.utils.stand_in_runtime import create_stand_in_project
+
+# The phases spent in Python, rather than in the binary
+OVERHEAD_PHASES = (phase_timings.MARSHAL, phase_timings.SAVEMAT, phase_timings.LOADMAT, phase_timings.CONVERT)
+
+DEFAULT_SIZES = (1, 1000, 100000)
+
+# The outputs of getnextfivetypes, in order
+FIVE_TYPES = ("double", "char", "cell", "struct", "logical")
+
+
+def make_cases(sizes=DEFAULT_SIZES) -> dict[str, tuple[str, int, list]]:
+    """The benchmark cases, as case name -> (function name, output count, arguments)."""
+    cases = {}
+    for size in sizes:
+        # getnextone adds one to its input, so the output is as large as the input
+        cases[f"input_size/{size}"] = ("getnextone", 1, [np.arange(size, dtype=float)])
+    for output_count, output_type in enumerate(FIVE_TYPES, start=1):
+        # Each added output is of a new type, so the difference to the previous case is the cost of that type
+        cases[f"output_type/{output_type}"] = ("getnextfivetypes", output_count, [1.0])
+    for output_count in range(1, 4):
+        cases[f"output_count/{output_count}"] = ("getnextthree", output_count, [1.0])
+    cases["output_size/1000"] = ("getnextthousand", 1, [1.0])
+    cases["output_size/2000"] = ("getnexttwothousand", 1, [1.0])
+    return cases
+
+
+def run_case(executor: MatlabExecutor, function_name: str, output_count: int, args: list, repeat: int) -> dict:
+    """Call a function repeat times, returning the median of each phase and of the overhead, in seconds."""
+    samples: dict[str, list[float]] = {}
+    for _ in range(repeat):
+        result = executor.execute_script(function_name, output_count, *args)
+        if not result.success:
+            raise RuntimeError(f"Benchmark call to {function_name} failed:\n{result.execution_message}")
+        timings = dict(result.timings)
+        timings["overhead"] = sum(timings.get(phase, 0.0) for phase in OVERHEAD_PHASES)
+        for phase, duration in timings.items():
+            samples.setdefault(phase, []).append(duration)
+    return {phase: statistics.median(durations) for phase, durations in samples.items()}
+
+
+def run(sizes=DEFAULT_SIZES, repeat: int = 20, workers: bool = False, cases: list[str] | None = None) -> dict:
+    """Run the benchmark cases against a temporary stand-in project.
+
+    Args:
+        sizes (optional): The input sizes to benchmark. Defaults to DEFAULT_SIZES.
+        repeat (int, optional): The number of calls per case. Defaults to 20.
+        workers (bool, optional): Whether to use a worker, so that the binary is not started for each call.
+            Defaults to False.
+        cases (list[str], optional): Only run the cases whose names start with one of these. Defaults to all.
+
+    Returns:
+        dict: The baseline, with the environment and the median timings of each case.
+    """
+    with tempfile.TemporaryDirectory(prefix="overhead_benchmark_") as directory:
+        project = MatlabProject(create_stand_in_project(directory))
+        executor = project.executor
+        if workers:
+            executor.start_workers()
+        try:
+            # Warm up imports, caches and the worker
+            executor.execute_script("getnextone", 1, 1.0)
+            results = {}
+            for name, (function_name, output_count, args) in make_cases(sizes).items():
+                if cases and not any(name.startswith(prefix) for prefix in cases):
+                    continue
+                results[name] = run_case(executor, function_name, output_count, args, repeat)
+                print(f"{name:<24} overhead {results[name]['overhead'] * 1e3:8.3f} ms", file=sys.stderr)
+        finally:
+            executor.stop_workers()
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "scipy": scipy.__version__,
+            "platform": platform.platform(),
+            "workers": workers,
+            "repeat": repeat,
+            "timestamp": time.time(),
+        },
+        "cases": results,
+    }
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.25, metric: str = "overhead") -> list[str]:
+    """Compare two runs, returning the names of the cases that regressed.
+
+    Args:
+        baseline (dict): The earlier run, as returned by run.
+        current (dict): The later run.
+        threshold (float, optional): The relative increase of the metric counted as a regression. Defaults to 0.25.
+        metric (str, optional): The timing to compare, 'overhead' or a phase. Defaults to 'overhead'.
+
+    Returns:
+        list[str]: The regressed cases.
+    """
+    regressions = []
+    print(f"{'Case':<24} {'Baseline (ms)':>14} {'Current (ms)':>14} {'Change':>8}")
+    for name, timings in current["cases"].items():
+        if name not in baseline["cases"] or metric not in timings or metric not in baseline["cases"][name]:
+            print(f"{name:<24} {'-':>14} {timings.get(metric, float('nan')) * 1e3:>14.3f} {'new':>8}")
+            continue
+        before, after = baseline["cases"][name][metric], timings[metric]
+        change = (after - before) / before if before > 0 else 0.0
+        marker = ""
+        if change > threshold:
+            regressions.append(name)
+            marker = "  REGRESSION"
+        print(f"{name:<24} {before * 1e3:>14.3f} {after * 1e3:>14.3f} {change:>+8.1%}{marker}")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run the benchmark and store the results")
+    run_parser.add_argument("--output", help="The JSON file to write, printed if not given")
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    run_parser.add_argument("--repeat", type=int, default=20)
+    run_parser.add_argument("--workers", action="store_true", help="Keep the stand-in running between calls")
+    run_parser.add_argument("--cases", nargs="+", help="Only run cases starting with these names")
+
+    compare_parser = subparsers.add_parser("compare", help="Compare a run against a baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.25)
+    compare_parser.add_argument("--metric", default="overhead")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        results = run(args.sizes, args.repeat, args.workers, args.cases)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as file:
+                json.dump(results, file, indent=2)
+        else:
+            print(json.dumps(results, indent=2))
+        return 0
+
+    with open(args.baseline, "r", encoding="utf-8") as file:
+        baseline = json.load(file)
+    with open(args.current, "r", encoding="utf-8") as file:
+        current = json.load(file)
+    regressions = compare(baseline, current, args.threshold, args.metric)
+    if regressions:
+        print(f"{len(regressions)} case(s) regressed: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+"""
+Benchmark of compiling a project with and without dependency pruning.
+
+The project is compiled with every subdirectory included, into <output directory>/full/<project>,
+and with only the directories its functions need (see compile/dependency_analysis.py), into
+<output directory>/pruned/<project>. For each, the number of directories included, the time mcc
+took, the size of the binary with its CTF archive, and the cold and warm start times (as in
+compile_profile_benchmark) are reported:
+
+    python -m visp_matlab_loader.benchmark.pruning_benchmark matlab/libraries/voice_analysis_toolbox /tmp/pruning
+    python -m visp_matlab_loader.benchmark.pruning_benchmark matlab/libraries/voice_analysis_toolbox /tmp/pruning \\
+        --allow compute_feature_a --repeat 10 --output pruning.json
+"""
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+
+from visp_matlab_loader.benchmark.compile_profile_benchmark import measure_startup
+from visp_matlab_loader.compile import build_hashes
+from visp_matlab_loader.compile.matlab_compiler import MATLABProjectCompiler
+
+VARIANTS = ("full", "pruned")
+
+
+def archive_size(project_output: str) -> int:
+    """The size of the binary of a compiled project, with any separate CTF archive, in bytes."""
+    with open(os.path.join(project_output, build_hashes.METADATA_FILE_NAME), "r", encoding="utf-8") as file:
+        output_file = json.load(file)["output_file"]
+    files = [os.path.join(project_output, output_file), *glob.glob(os.path.join(project_output, "*.ctf"))]
+    return sum(os.path.getsize(path) for path in files if os.path.isfile(path))
+
+
+def included_directories(project_output: str) -> int:
+    with open(os.path.join(project_output, build_hashes.METADATA_FILE_NAME), "r", encoding="utf-8") as file:
+        return len(json.load(file)["additional_dirs"] or [])
+
+
+def compile_variant(project_path: str, project_output: str, pruned: bool, dynamic_calls: list[str] | None) -> float:
+    """Compile the project with or without pruning, returning the time taken in seconds."""
+    os.makedirs(project_output, exist_ok=True)
+    compiler = MATLABProjectCompiler(project_path, project_output)
+    start = time.perf_counter()
+    code, message = compiler.compile_project(force_output=True, prune=pruned, dynamic_calls=dynamic_calls)
+    compile_time = time.perf_counter() - start
+    if code != 0:
+        raise RuntimeError(f"Compiling {project_path} ({'pruned' if pruned else 'full'}) failed:\n{message}")
+    return compile_time
+
+
+def run(
+    project_path: str,
+    output_directory: str,
+    repeat: int = 5,
+    dynamic_calls: list[str] | None = None,
+    compile_first=True,
+) -> dict:
+    """Compile the project with and without pruning and measure the results, by variant."""
+    project_name = os.path.basename(os.path.normpath(project_path))
+    results = {}
+    for variant in VARIANTS:
+        project_output = os.path.join(output_directory, variant, project_name)
+        compile_time = None
+        if compile_first:
+            compile_time = compile_variant(project_path, project_output, variant == "pruned", dynamic_calls)
+        results[variant] = {
+            "directories": included_directories(project_output),
+            "compile_time": compile_time,
+            "archive_size": archive_size(project_output),
+            **measure_startup(os.path.join(project_output, f"{project_name}_wrapper.m"), repeat),
+        }
+    return results
+
+
+def print_results(results: dict) -> None:
+    print(f"{'variant':<8} {'dirs':>6} {'mcc (s)':>8} {'size (KiB)':>11} {'cold (s)':>9} {'warm (s)':>9}")
+    for variant, result in results.items():
+        compile_time = f"{result['compile_time']:.1f}" if result["compile_time"] is not None else "-"
+        print(
+            f"{variant:<8} {result['directories']:>6} {compile_time:>8} {result['archive_size'] / 1024:>11.1f} "
+            f"{result['cold_start']:>9.3f} {result['warm_start']:>9.3f}"
+        )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("project_path", help="The source directory of the project")
+    parser.add_argument("output_directory", help="The directory to compile both variants into")
+    parser.add_argument("--allow", nargs="+", help="Functions called dynamically, see dependency_analysis")
+    parser.add_argument("--repeat", type=int, default=5, help="The number of cold and warm starts per variant")
+    parser.add_argument("--skip-compile", action="store_true", help="Use the projects compiled by an earlier run")
+    parser.add_argument("--output", help="The JSON file to write the results to")
+    args = parser.parse_args(argv)
+
+    results = run(args.project_path, args.output_directory, args.repeat, args.allow, not args.skip_compile)
+    print_results(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
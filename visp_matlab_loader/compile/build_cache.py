@@ -0,0 +1,227 @@
+"""
+A content-addressed cache of compiled projects, which can be shared between machines.
+
+MatlabCompiler.compile stores the outputs of every successful mcc run (the binary, wrapper,
+functions.json, readme.txt and metadata.json) in the cache, keyed by the hash of the sources,
+the wrapper, the mcc options and the MATLAB release. Compiling the same project again, on any
+machine using the same cache directory, then restores the outputs instead of running mcc.
+
+The key does not depend on where the sources or outputs are, so that machines with different
+checkouts share entries. Each entry is a directory holding the files and a manifest of their
+hashes, which are verified when restoring, and only becomes visible once complete. Unlike
+MatlabResultCache there is no SQLite index, as SQLite locking is unreliable on network file
+systems; the entries are few and large, so the least recently used are found by scanning.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+
+from visp_matlab_loader.compile import build_hashes
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+
+MANIFEST_FILE_NAME = "manifest.json"
+# Unfinished entries, removed when older than STALE_TEMPORARY_AGE seconds
+TEMPORARY_DIRECTORY = "tmp"
+STALE_TEMPORARY_AGE = 24 * 3600
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1024**2), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def make_key(source_directories: list[str], script_path: str, mcc_options: list[str], release: str | None) -> str:
+    """The cache key of a build.
+
+    Args:
+        source_directories (list[str]): The directories included with -I, hashed relative to their common parent.
+        script_path (str): The wrapper script compiled.
+        mcc_options (list[str]): The mcc options that change the binary, such as those of the compile profile
+            and the output name, but not the paths.
+        release (str | None): The MATLAB release of mcc.
+    """
+    parts = {
+        build_hashes.SOURCES: build_hashes.hash_sources(source_directories, relative=True),
+        build_hashes.WRAPPER: build_hashes.hash_file(script_path),
+        "options": mcc_options,
+        build_hashes.RELEASE: release,
+    }
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class BuildCache:
+    """A size-bounded directory of compiled project outputs, keyed by make_key.
+
+    Attributes:
+        directory (str): The cache directory, which may be shared between processes and machines.
+        max_bytes (int): The maximum total size of the entries, after which the least recently
+            used are evicted.
+        hits (int): The number of builds restored from the cache, in this process.
+        misses (int): The number of builds not found in the cache, in this process.
+        evictions (int): The number of entries evicted to stay within max_bytes, in this process.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 10 * 1024**3) -> None:
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(self.directory, TEMPORARY_DIRECTORY), exist_ok=True)
+
+    @property
+    def stats(self) -> dict:
+        entries = self._entries()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+        }
+
+    def entry_directory(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def restore(self, key: str, output_dir: str) -> list[str] | None:
+        """Copy the files of an entry to output_dir, verifying their hashes.
+
+        Returns:
+            list[str] | None: The names of the files restored, or None if there is no such entry
+                (or it failed verification, in which case it is removed).
+        """
+        entry_directory = self.entry_directory(key)
+        try:
+            with open(os.path.join(entry_directory, MANIFEST_FILE_NAME), "r", encoding="utf-8") as file:
+                manifest = json.load(file)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        copied = []
+        try:
+            # Copied next to their final names and verified first, so that a failure leaves no partial outputs
+            for name, expected_hash in manifest["files"].items():
+                temporary_file = os.path.join(output_dir, f".{name}.{uuid.uuid4().hex}")
+                copied.append((temporary_file, os.path.join(output_dir, name)))
+                shutil.copy2(os.path.join(entry_directory, name), temporary_file)
+                if _hash_file(temporary_file) != expected_hash:
+                    raise ValueError(f"{name} does not match its hash")
+        except (OSError, ValueError, KeyError, AttributeError) as e:
+            logger.warning("Removing build cache entry %s, which could not be restored: %s", key, e)
+            for temporary_file, _ in copied:
+                if os.path.exists(temporary_file):
+                    os.remove(temporary_file)
+            self._remove(entry_directory)
+            with self._lock:
+                self.misses += 1
+            return None
+
+        for temporary_file, output_file in copied:
+            os.replace(temporary_file, output_file)
+        # The modification time of the manifest is the last use of the entry, for eviction
+        try:
+            os.utime(os.path.join(entry_directory, MANIFEST_FILE_NAME))
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return list(manifest["files"])
+
+    def put(self, key: str, output_dir: str, file_names: list[str]) -> None:
+        """Store the given files of output_dir, those that exist, as the entry of key.
+
+        An existing entry is kept as it is, as it holds the same build.
+        """
+        entry_directory = self.entry_directory(key)
+        if os.path.exists(os.path.join(entry_directory, MANIFEST_FILE_NAME)):
+            return
+        temporary_directory = os.path.join(self.directory, TEMPORARY_DIRECTORY, f"{key}.{uuid.uuid4().hex}")
+        try:
+            os.makedirs(temporary_directory)
+            files = {}
+            for name in file_names:
+                path = os.path.join(output_dir, name)
+                if os.path.isfile(path):
+                    shutil.copy2(path, os.path.join(temporary_directory, name))
+                    files[name] = _hash_file(os.path.join(temporary_directory, name))
+            manifest = {"key": key, "created": time.time(), "files": files}
+            with open(os.path.join(temporary_directory, MANIFEST_FILE_NAME), "w", encoding="utf-8") as file:
+                json.dump(manifest, file, indent=4)
+            os.makedirs(os.path.dirname(entry_directory), exist_ok=True)
+            # Renaming a directory onto an existing one fails, in which case another process stored it first
+            os.rename(temporary_directory, entry_directory)
+        except OSError as e:
+            logger.info("Not storing build %s in the cache: %s", key, e)
+            shutil.rmtree(temporary_directory, ignore_errors=True)
+            return
+        self._evict()
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        for entry_directory, _, _ in self._entries():
+            self._remove(entry_directory)
+
+    def _entries(self) -> list[tuple[str, int, float]]:
+        """The (directory, size, last use) of every complete entry."""
+        entries = []
+        for prefix in os.scandir(self.directory):
+            if not prefix.is_dir() or prefix.name == TEMPORARY_DIRECTORY:
+                continue
+            for entry in os.scandir(prefix.path):
+                try:
+                    last_use = os.stat(os.path.join(entry.path, MANIFEST_FILE_NAME)).st_mtime
+                    size = sum(file.stat().st_size for file in os.scandir(entry.path) if file.is_file())
+                except OSError:
+                    continue
+                entries.append((entry.path, size, last_use))
+        return entries
+
+    def _evict(self) -> None:
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for entry_directory, size, _ in sorted(entries, key=lambda entry: entry[2]):
+            if total <= self.max_bytes:
+                break
+            self._remove(entry_directory)
+            total -= size
+            evicted += 1
+        if evicted:
+            logger.info("Evicted %d builds from the build cache", evicted)
+            with self._lock:
+                self.evictions += evicted
+        self._remove_stale_temporaries()
+
+    def _remove(self, entry_directory: str) -> None:
+        # Moved away first, so that readers see either the whole entry or none of it
+        removed = os.path.join(self.directory, TEMPORARY_DIRECTORY, f"removed.{uuid.uuid4().hex}")
+        try:
+            os.rename(entry_directory, removed)
+        except OSError:
+            return
+        shutil.rmtree(removed, ignore_errors=True)
+
+    def _remove_stale_temporaries(self) -> None:
+        """Remove what processes that died while storing an entry left behind."""
+        temporary_root = os.path.join(self.directory, TEMPORARY_DIRECTORY)
+        for temporary in os.scandir(temporary_root):
+            try:
+                if time.time() - temporary.stat().st_mtime > STALE_TEMPORARY_AGE:
+                    shutil.rmtree(temporary.path, ignore_errors=True)
+            except OSError:
+                continue
@@ -0,0 +1,88 @@
+"""
+Content hashes of everything that goes into compiling a project, used for incremental builds.
+
+MatlabCompiler.compile stores the hashes in metadata.json next to the compiled binary. When
+compiling incrementally, mcc is skipped if the hashes stored are the same as those of the
+current build, as the binary would then be the same.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shlex
+
+METADATA_FILE_NAME = "metadata.json"
+
+# The parts of a build that are hashed, stored under "build_hashes" in metadata.json
+SOURCES = "sources"
+WRAPPER = "wrapper"
+COMMAND = "command"
+RELEASE = "release"
+
+
+def _unquote(directory: str) -> str:
+    # MATLABProjectCompiler.get_all_subdirectories quotes the directories
+    return shlex.split(directory)[0] if directory.startswith("'") else directory
+
+
+def hash_sources(directories: list[str], relative: bool = False) -> str:
+    """The hash of the paths and contents of the .m files directly in the given directories.
+
+    Args:
+        directories (list[str]): The directories, as passed to mcc with -I.
+        relative (bool, optional): Hash the paths relative to the common parent of the directories,
+            so that the hash is the same wherever the sources are. Defaults to False.
+    """
+    directories = [os.path.abspath(_unquote(directory)) for directory in directories]
+    files = set()
+    for directory in directories:
+        try:
+            with os.scandir(directory) as entries:
+                files.update(entry.path for entry in entries if entry.name.endswith(".m") and entry.is_file())
+        except OSError:
+            continue
+    root = os.path.commonpath(directories) if relative and directories else None
+    digest = hashlib.sha256()
+    for path in sorted(files):
+        name = os.path.relpath(path, root) if root else path
+        digest.update(name.encode("utf-8") + b"\0")
+        with open(path, "rb") as file:
+            digest.update(hashlib.sha256(file.read()).digest())
+    return digest.hexdigest()
+
+
+def hash_file(path: str) -> str:
+    with open(path, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def hash_command(command: list[str]) -> str:
+    return hashlib.sha256(json.dumps(command).encode("utf-8")).hexdigest()
+
+
+def build_hashes(script_path: str, additional_dirs: list[str] | None, command: list[str], release: str | None) -> dict:
+    """The hashes of a build: the sources included, the wrapper compiled, the mcc command and the release."""
+    return {
+        SOURCES: hash_sources(list(additional_dirs or [])),
+        WRAPPER: hash_file(script_path),
+        COMMAND: hash_command(command),
+        RELEASE: release,
+    }
+
+
+def stored_hashes(output_dir: str) -> dict | None:
+    """The build hashes in metadata.json of a compiled project, None if there are none."""
+    try:
+        with open(os.path.join(output_dir, METADATA_FILE_NAME), "r", encoding="utf-8") as file:
+            return json.load(file).get("build_hashes")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def changed_parts(output_dir: str, hashes: dict) -> list[str]:
+    """The parts of the build that differ from the one stored, all of them if none is stored."""
+    stored = stored_hashes(output_dir)
+    if not stored:
+        return list(hashes)
+    return [part for part, value in hashes.items() if stored.get(part) != value]
@@ -0,0 +1,88 @@
+"""
+Running several mcc jobs at once, used by MATLABProjectCompiler.compile_projects.
+
+A single mcc job can use several GiB of memory, so besides the number of jobs, a JobLimiter can
+also limit them by the memory available: a job is only started if the memory available is at
+least memory_per_job (unless no other job is running), and no more jobs are run at once than fit
+in the memory available when the limiter was created.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+
+# How often to check the available memory while waiting to start a job, in seconds
+MEMORY_POLL_INTERVAL = 1.0
+
+
+def available_memory() -> int | None:
+    """The memory available for new processes in bytes, None if it cannot be found."""
+    try:
+        with open("/proc/meminfo", "r", encoding="utf-8") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+class JobLimiter:
+    """Limits the number of jobs running at once, by count and by the memory available.
+
+    Args:
+        max_jobs (int): The maximum number of jobs running at once.
+        memory_per_job (int, optional): The memory a single job needs, in bytes. Defaults to not
+            taking memory into account.
+    """
+
+    def __init__(self, max_jobs: int = 1, memory_per_job: int | None = None) -> None:
+        self.max_jobs = max(max_jobs, 1)
+        self.memory_per_job = memory_per_job
+        if memory_per_job:
+            available = available_memory()
+            if available is not None:
+                fitting_jobs = max(available // memory_per_job, 1)
+                if fitting_jobs < self.max_jobs:
+                    logger.warning(
+                        "Running at most %d jobs at once, as %.1f GiB of memory is available",
+                        fitting_jobs,
+                        available / 1024**3,
+                    )
+                    self.max_jobs = fitting_jobs
+        self._running = 0
+        self._condition = threading.Condition()
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    def _may_start(self) -> bool:
+        if self._running >= self.max_jobs:
+            return False
+        if self._running == 0 or not self.memory_per_job:
+            return True
+        available = available_memory()
+        return available is None or available >= self.memory_per_job
+
+    @contextmanager
+    def slot(self):
+        """Wait until a job may start, and count it as running for the duration of the context."""
+        with self._condition:
+            while not self._may_start():
+                self._condition.wait(timeout=MEMORY_POLL_INTERVAL)
+            self._running += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._running -= 1
+                self._condition.notify_all()
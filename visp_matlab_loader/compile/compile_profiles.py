@@ -0,0 +1,92 @@
+"""
+Named sets of mcc options, used by MatlabCompiler.compile.
+
+A profile chooses the MATLAB Runtime options compiled into the binary (passed to mcc as
+`-R <option>`) and whether mcc prints verbose output. The runtime options mostly affect how
+long the binary takes to start:
+
+- `-nodisplay`: no display is used, which MATLAB would otherwise try to connect to.
+- `-nojvm`: the Java virtual machine is not started. Functions that use Java (including figures
+  and some toolboxes) no longer work.
+- `-singleCompThread`: computations use a single thread, which is usually better when many
+  binaries run at the same time, but slower for a single large computation.
+
+The default profile keeps the options used before profiles existed.
+"""
+from __future__ import annotations
+
+from typing import Iterable
+
+DEFAULT_PROFILE = "default"
+
+
+class CompileProfile:
+    """A named set of mcc options.
+
+    Attributes:
+        name (str): The name of the profile, stored in metadata.json of the compiled project.
+        runtime_options (tuple[str, ...]): The MATLAB Runtime options, each passed as -R <option>.
+        verbose (bool): Whether mcc is run with -v.
+        description (str): What the profile is meant for.
+    """
+
+    __slots__ = ("name", "runtime_options", "verbose", "description")
+
+    def __init__(self, name: str, runtime_options: Iterable[str] = (), verbose: bool = True, description: str = ""):
+        object.__setattr__(self, "name", name)
+        object.__setattr__(self, "runtime_options", tuple(runtime_options))
+        object.__setattr__(self, "verbose", verbose)
+        object.__setattr__(self, "description", description)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} cannot be changed, create a new one instead")
+
+    def mcc_options(self) -> list[str]:
+        """The options passed to mcc, in addition to the output and include options."""
+        options = ["-v"] if self.verbose else []
+        for runtime_option in self.runtime_options:
+            options.extend(["-R", runtime_option])
+        return options
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "runtime_options": list(self.runtime_options), "verbose": self.verbose}
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.name!r}, runtime_options={self.runtime_options!r})"
+
+
+PROFILES: dict[str, CompileProfile] = {}
+
+
+def register_profile(profile: CompileProfile) -> CompileProfile:
+    """Make a profile available by name, replacing any profile with the same name."""
+    PROFILES[profile.name] = profile
+    return profile
+
+
+def get_profile(profile: str | CompileProfile | None = None) -> CompileProfile:
+    """The profile with the given name, the profile itself, or the default profile if None."""
+    if isinstance(profile, CompileProfile):
+        return profile
+    name = DEFAULT_PROFILE if profile is None else profile
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown compile profile '{name}', available profiles: {', '.join(PROFILES)}") from None
+
+
+register_profile(CompileProfile(DEFAULT_PROFILE, (), verbose=True, description="No runtime options"))
+register_profile(
+    CompileProfile("headless", ("-nodisplay",), verbose=False, description="No display, Java still available")
+)
+register_profile(
+    CompileProfile("startup", ("-nodisplay", "-nojvm"), verbose=False, description="Fastest start, no Java")
+)
+register_profile(
+    CompileProfile(
+        "parallel",
+        ("-nodisplay", "-nojvm", "-singleCompThread"),
+        verbose=False,
+        description="Fastest start, for many binaries running at the same time",
+    )
+)
@@ -0,0 +1,289 @@
+"""
+Static analysis of the calls between the .m files of a project, used to only include the
+directories the compiled functions need when compiling (see MATLABProjectCompiler.compile_project).
+
+Every function file (.m, .p, .mlx or MEX) is indexed by its function name (the file name without
+the extension). Starting from the functions exposed by the wrapper, each reachable .m file is
+scanned for identifiers naming another function of the project, with comments and strings left
+out, which gives the files and directories needed. This over-approximates (a variable named like a
+function also counts as a call), which is the safe side. Directories holding data files (.mat) are
+always included, as which function loads them cannot be known.
+
+Calls made by name at runtime cannot be followed in general. A function name given as a string
+literal to feval, str2func or run, or code given as a string literal to eval or evalc, is
+followed; other dynamic calls are reported, and the functions they call must be given in the
+allowlist. So are reachable .p and .mlx files, whose code cannot be read:
+
+    python -m visp_matlab_loader.compile.dependency_analysis matlab/libraries/voice_analysis_toolbox \\
+        --allow compute_feature_a compute_feature_b
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import sys
+from typing import Iterable, NamedTuple
+
+from visp_matlab_loader.mat_to_wrapper import create_script
+
+# The file, written next to functions.json, with the result of the analysis of a compiled project
+DEPENDENCIES_FILE_NAME = "dependencies.json"
+
+# Files defining a function, besides MEX files (.mexa64, .mexw64, ...), and data files
+FUNCTION_EXTENSIONS = (".m", ".p", ".mlx")
+DATA_EXTENSIONS = (".mat",)
+
+# Functions taking the name of a function to call, and code to run, as their first argument
+NAME_CALLS = ("feval", "str2func", "run")
+CODE_CALLS = ("eval", "evalc", "evalin", "assignin")
+
+# Directories MATLAB searches through their parent, rather than being on the path themselves
+_PARENT_SEARCHED = re.compile(r"^(private|[+@].*)$")
+_MEX_EXTENSION = re.compile(r"^\.mex\w+$")
+_IDENTIFIER = re.compile(r"[A-Za-z]\w*")
+_DYNAMIC_CALL = re.compile(r"\b(" + "|".join(NAME_CALLS + CODE_CALLS) + r")\s*\(\s*(\x00(\d+)\x00)?")
+# Characters after which a quote is the transpose operator rather than the start of a string
+_TRANSPOSABLE = re.compile(r"[\w)\]}.']")
+
+
+class DynamicCall(NamedTuple):
+    """A call by a name that is only known at runtime."""
+
+    file: str
+    line: int
+    text: str
+
+
+class FileAnalysis(NamedTuple):
+    """The identifiers and dynamic calls of a .m file."""
+
+    identifiers: frozenset[str]
+    dynamic_calls: tuple[DynamicCall, ...]
+
+
+class DependencyReport(NamedTuple):
+    """The files and directories needed by a set of functions of a project.
+
+    Attributes:
+        roots (tuple[str, ...]): The functions the analysis started from, including the allowlist.
+        functions (tuple[str, ...]): The functions of the project reachable from the roots.
+        files (tuple[str, ...]): The .m files of those functions.
+        directories (tuple[str, ...]): The directories to include with -I for those files.
+        excluded_directories (tuple[str, ...]): The directories of the project not needed.
+        dynamic_calls (tuple[DynamicCall, ...]): The calls in the files that could not be followed.
+        missing (tuple[str, ...]): Roots not found in the project.
+    """
+
+    roots: tuple[str, ...]
+    functions: tuple[str, ...]
+    files: tuple[str, ...]
+    directories: tuple[str, ...]
+    excluded_directories: tuple[str, ...]
+    dynamic_calls: tuple[DynamicCall, ...]
+    missing: tuple[str, ...]
+
+    def to_dict(self) -> dict:
+        report = self._asdict()
+        report["dynamic_calls"] = [call._asdict() for call in self.dynamic_calls]
+        return report
+
+    def __str__(self) -> str:
+        lines = [
+            f"{len(self.functions)} functions in {len(self.files)} files are needed by {len(self.roots)} functions",
+            f"Included directories ({len(self.directories)}):",
+            *(f"  {directory}" for directory in self.directories),
+            f"Excluded directories ({len(self.excluded_directories)}):",
+            *(f"  {directory}" for directory in self.excluded_directories),
+        ]
+        if self.dynamic_calls:
+            lines.append("Dynamic calls that could not be followed, add the functions they call to the allowlist:")
+            lines.extend(f"  {call.file}:{call.line}: {call.text}" for call in self.dynamic_calls)
+        if self.missing:
+            lines.append(f"Not found in the project: {', '.join(self.missing)}")
+        return "\n".join(lines)
+
+
+def search_directory(path: str) -> str:
+    """The directory to include for a .m file, the first parent not searched through its own parent."""
+    directory = os.path.dirname(path)
+    while _PARENT_SEARCHED.match(os.path.basename(directory)):
+        directory = os.path.dirname(directory)
+    return directory
+
+
+def _walk(project_paths: Iterable[str]):
+    """os.walk of each project, in a stable order and without .git directories."""
+    for project_path in project_paths:
+        for root, directories, files in os.walk(os.path.abspath(project_path)):
+            directories[:] = sorted(directory for directory in directories if directory != ".git")
+            yield root, sorted(files)
+
+
+def index_functions(project_paths: Iterable[str]) -> dict[str, list[str]]:
+    """The function files of the projects by function name, several for functions shadowing each other."""
+    index = {}
+    for root, files in _walk(project_paths):
+        for name in files:
+            stem, extension = os.path.splitext(name)
+            if extension in FUNCTION_EXTENSIONS or _MEX_EXTENSION.match(extension):
+                index.setdefault(stem, []).append(os.path.join(root, name))
+    return index
+
+
+def data_directories(project_paths: Iterable[str]) -> list[str]:
+    """The directories to include for the data files of the projects."""
+    return sorted(
+        {
+            search_directory(os.path.join(root, name))
+            for root, files in _walk(project_paths)
+            for name in files
+            if os.path.splitext(name)[1] in DATA_EXTENSIONS
+        }
+    )
+
+
+def _strip_line(line: str, literals: list[str]) -> str:
+    """The code of a line, with comments removed and each string replaced by \\0<index in literals>\\0."""
+    code = []
+    i = 0
+    while i < len(line):
+        character = line[i]
+        if character == "%" or line.startswith("...", i):
+            break
+        is_string = character == '"' or (character == "'" and not (code and _TRANSPOSABLE.match(code[-1][-1:])))
+        if not is_string:
+            code.append(character)
+            i += 1
+            continue
+        # Quotes are escaped by doubling them
+        end = i + 1
+        literal = []
+        while end < len(line):
+            if line[end] == character:
+                if line.startswith(character * 2, end):
+                    literal.append(character)
+                    end += 2
+                    continue
+                break
+            literal.append(line[end])
+            end += 1
+        literals.append("".join(literal))
+        code.append(f"\0{len(literals) - 1}\0")
+        i = end + 1
+    return "".join(code)
+
+
+def analyze_file(path: str) -> FileAnalysis:
+    """The identifiers in the code of a .m file (without comments and strings), and its dynamic calls."""
+    with open(path, "r", encoding="ISO-8859-1") as file:
+        lines = file.read().splitlines()
+
+    identifiers = set()
+    dynamic_calls = []
+    in_block_comment = 0
+    for number, line in enumerate(lines, start=1):
+        stripped = line.strip()
+        if stripped == "%{":
+            in_block_comment += 1
+            continue
+        if in_block_comment:
+            if stripped == "%}":
+                in_block_comment -= 1
+            continue
+
+        literals = []
+        code = _strip_line(line, literals)
+        identifiers.update(_IDENTIFIER.findall(re.sub(r"\x00\d+\x00", " ", code)))
+        for match in _DYNAMIC_CALL.finditer(code):
+            function, literal_index = match.group(1), match.group(3)
+            if function in ("evalin", "assignin") or literal_index is None:
+                dynamic_calls.append(DynamicCall(path, number, stripped))
+            elif function in NAME_CALLS:
+                identifiers.add(literals[int(literal_index)])
+            else:
+                identifiers.update(_IDENTIFIER.findall(_strip_line(literals[int(literal_index)], [])))
+    return FileAnalysis(frozenset(identifiers), tuple(dynamic_calls))
+
+
+def analyze(
+    project_paths: str | list[str], roots: Iterable[str], allowlist: Iterable[str] | None = None
+) -> DependencyReport:
+    """Find the files and directories of a project needed by the given functions.
+
+    Args:
+        project_paths (str | list[str]): The source directories of the project.
+        roots (Iterable[str]): The functions called, usually those exposed by the wrapper.
+        allowlist (Iterable[str], optional): Functions called dynamically, to include as well.
+    """
+    if isinstance(project_paths, str):
+        project_paths = [project_paths]
+    index = index_functions(project_paths)
+    roots = tuple(dict.fromkeys([*roots, *(allowlist or [])]))
+
+    reachable = set()
+    dynamic_calls = []
+    pending = [root for root in roots if root in index]
+    while pending:
+        function = pending.pop()
+        if function in reachable:
+            continue
+        reachable.add(function)
+        for path in index[function]:
+            extension = os.path.splitext(path)[1]
+            if extension != ".m":
+                # MEX files do not call back into MATLAB code, as a rule, but .p and .mlx files may
+                if extension in FUNCTION_EXTENSIONS:
+                    dynamic_calls.append(DynamicCall(path, 0, f"{function}{extension} cannot be analyzed"))
+                continue
+            analysis = analyze_file(path)
+            dynamic_calls.extend(analysis.dynamic_calls)
+            pending.extend(name for name in analysis.identifiers if name in index and name not in reachable)
+
+    files = sorted(path for function in reachable for path in index[function])
+    directories = sorted({search_directory(path) for path in files}.union(data_directories(project_paths)))
+    all_directories = sorted(
+        root for root, _ in _walk(project_paths) if not _PARENT_SEARCHED.match(os.path.basename(root))
+    )
+    return DependencyReport(
+        roots=roots,
+        functions=tuple(sorted(reachable)),
+        files=tuple(files),
+        directories=tuple(directories),
+        excluded_directories=tuple(directory for directory in all_directories if directory not in directories),
+        dynamic_calls=tuple(sorted(set(dynamic_calls))),
+        missing=tuple(root for root in roots if root not in index),
+    )
+
+
+def analyze_project(
+    project_path: str, functions: Iterable[str] | None = None, allowlist: Iterable[str] | None = None
+) -> DependencyReport:
+    """Analyze a project, starting from the given functions or all those its wrapper exposes."""
+    if functions is None:
+        created_script = create_script.directory_to_script(project_path)
+        if created_script is None:
+            raise ValueError(f"Unable to create the wrapper of {project_path}")
+        functions = created_script[1]
+    return analyze(project_path, functions, allowlist)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("project_path", help="The source directory of the project")
+    parser.add_argument("--functions", nargs="+", help="The functions called, defaults to all the wrapper exposes")
+    parser.add_argument("--allow", nargs="+", default=[], help="Functions called dynamically, to include as well")
+    parser.add_argument("--output", help="The JSON file to write the report to")
+    args = parser.parse_args(argv)
+
+    report = analyze_project(args.project_path, args.functions, args.allow)
+    print(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report.to_dict(), file, indent=2)
+    return 1 if report.missing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
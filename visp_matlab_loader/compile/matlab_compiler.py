@@ -10,8 +10,15 @@ import shutil
 # import numpy as np
 import subprocess
 import sys
+import threading
+import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
 
+from visp_matlab_loader.compile import build_hashes, compile_jobs, dependency_analysis
+from visp_matlab_loader.compile.build_cache import BuildCache, make_key
+from visp_matlab_loader.compile.compile_profiles import CompileProfile, get_profile
 from visp_matlab_loader.mat_to_wrapper import create_script
 
 # Add the parent directory to the system path
@@ -19,6 +26,14 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # TODO: Why does this import fail if I don't do it this way?
 from visp_matlab_loader.matlab_path_setter import MatlabPathSetter
+from visp_matlab_loader.project.matlab_project import FUNCTION_BINARIES_DIRECTORY
+
+# The log of mcc for each project compiled by compile_projects, in the output directory of the project
+LOG_FILE_NAME = "mcc.log"
+# The summary of compile_projects, in its output directory
+SUMMARY_FILE_NAME = "compile_summary.json"
+# The files of a compiled project, besides the binary and wrapper, stored in the build cache
+CACHED_FILE_NAMES = ("functions.json", "readme.txt", build_hashes.METADATA_FILE_NAME)
 
 
 class MATLABProjectCompiler:
@@ -78,7 +93,7 @@ class MATLABProjectCompiler:
 
         self.ensure_directories_exist([project_path, output_path])
 
-        self.path_setter = path_setter or MatlabPathSetter()
+        self.path_setter = path_setter or MatlabPathSetter.shared()
         self.path_setter.verify_paths()
 
     @staticmethod
@@ -100,7 +115,8 @@ class MATLABProjectCompiler:
                     quoted_root = shlex.quote(root)
                     all_dirs.add(quoted_root)
 
-        return list(all_dirs)
+        # Sorted, as the order of a set differs between processes, which would change the build hashes
+        return sorted(all_dirs)
 
     @staticmethod
     def write_text_to_file(file_path, text):
@@ -113,6 +129,14 @@ class MATLABProjectCompiler:
             # Print an error message if the file could not be opened or written to
             print(f"Unable to open or write to file {file_path}. Error: {str(e)}")
 
+    @staticmethod
+    def _file_has_text(file_path, text) -> bool:
+        try:
+            with open(file_path, "r", encoding="utf-8") as file:
+                return file.read() == text
+        except (OSError, UnicodeDecodeError):
+            return False
+
     @staticmethod
     def create_directory(directory_path):
         # Check if the directory does not exist
@@ -138,7 +162,20 @@ class MATLABProjectCompiler:
         relative_paths = [os.path.relpath(path, current_path) for path in absolute_paths]
         return relative_paths
 
-    def compile_project(self, verbose=False, force_output=False):
+    def compile_project(
+        self,
+        verbose=False,
+        force_output=False,
+        worker_mode=False,
+        profile: str | CompileProfile | None = None,
+        incremental=False,
+        log_file: str | None = None,
+        output_callback: Callable[[str], None] | None = None,
+        build_cache: BuildCache | None = None,
+        prune: bool = False,
+        dynamic_calls: list[str] | None = None,
+        function_binaries: list[str] | None = None,
+    ):
         """Compiles the project to a standalone executable.
         This function will create a wrapper script for the given project directory,
         and then compile it into a standalone executable.
@@ -146,6 +183,23 @@ class MATLABProjectCompiler:
         Args:
             verbose: bool - Whether to print additional status messages or not
             force_output: bool - Whether to overwrite the output file if it already exists
+            worker_mode: bool - Whether to compile the worker variant of the wrapper, which can
+                also be used as a long-lived worker (see MatlabExecutor.start_workers)
+            profile: str | CompileProfile - The mcc options to use, see compile_profiles. Defaults to the
+                default profile.
+            incremental: bool - Whether to skip mcc if nothing has changed since the last compile
+                (see MatlabCompiler.compile)
+            log_file: str - Stream the output of mcc to this file, see MatlabCompiler.compile
+            output_callback: Callable[[str], None] - Called with each line mcc prints, see MatlabCompiler.compile
+            build_cache: BuildCache - Restore the project from this cache instead of running mcc when it
+                has been compiled before, see MatlabCompiler.compile
+            prune: bool - Whether to only include the directories with functions the wrapper calls, directly or
+                indirectly, instead of every subdirectory (see dependency_analysis). The analysis is written to
+                dependencies.json in the output directory.
+            dynamic_calls: list[str] - When pruning, functions called by name at runtime (such as with feval),
+                which the analysis cannot follow, to include as well
+            function_binaries: list[str] - Functions to also compile a dedicated binary for, see
+                compile_function_binaries. Dedicated binaries of other functions are removed.
         """
         # Create the target directory if it does not exist
         self.create_directory(self.output_directory)
@@ -164,21 +218,28 @@ class MATLABProjectCompiler:
             self.project_path,
             verbose=verbose,
             save_function_location=os.path.join(self.output_directory, "functions.json"),
+            worker_mode=worker_mode,
         )
         if created_script is None:
             return 1, "Error creating script"
-        matlab_script, _ = created_script
+        matlab_script, function_dict = created_script
 
         # Use the project name for the output wrapper file and write it
         project_output_file = os.path.join(self.output_directory, f"{self.project_name}_wrapper.m")
-        self.write_text_to_file(project_output_file, matlab_script)
+        if not self._file_has_text(project_output_file, matlab_script):
+            self.write_text_to_file(project_output_file, matlab_script)
 
         # Get all subdirectories of the project directory
-        if isinstance(self.project_path, list):
-            project_dir = [os.path.abspath(x) for x in self.project_path if os.path.isdir(x)]
+        project_dir = self._source_directories()
+        if prune:
+            report_line = output_callback or print
+            project_dir = list(
+                self._analyze_dependencies(
+                    project_dir, list(function_dict), dynamic_calls, report_line, self.output_directory
+                ).directories
+            )
         else:
-            project_dir = [os.path.abspath(self.project_path)]
-        project_dir = self.get_all_subdirectories(project_dir)
+            project_dir = self.get_all_subdirectories(project_dir)
 
         vprint("project_output_file:", project_output_file)
         vprint("target_dir:", self.output_directory)
@@ -195,28 +256,199 @@ class MATLABProjectCompiler:
             additional_dirs=project_dir,
             create_output_directory=True,
             force_output=force_output,
+            profile=profile,
+            incremental=incremental,
+            log_file=log_file,
+            output_callback=output_callback,
+            build_cache=build_cache,
         )
         vprint("Compiled with code:", compiler_code)
         vprint("Message:", compiler_message)
+
+        if function_binaries is not None and compiler_code == 0:
+            for function_name, code, message in self.compile_function_binaries(
+                function_binaries,
+                verbose=verbose,
+                force_output=force_output,
+                profile=profile,
+                incremental=incremental,
+                log_file=log_file,
+                output_callback=output_callback,
+                build_cache=build_cache,
+                dynamic_calls=dynamic_calls,
+            ):
+                compiler_code = max(compiler_code, code)
+                compiler_message += f"\nBinary of {function_name}: {message if code else message.splitlines()[0]}"
         return compiler_code, compiler_message
 
+    def compile_function_binaries(
+        self,
+        functions: list[str],
+        verbose=False,
+        force_output=False,
+        profile: str | CompileProfile | None = None,
+        incremental=False,
+        log_file: str | None = None,
+        output_callback: Callable[[str], None] | None = None,
+        build_cache: BuildCache | None = None,
+        dynamic_calls: list[str] | None = None,
+    ) -> list[tuple[str, int, str]]:
+        """Compiles a binary dedicated to each of the given functions, in function_binaries/<function>.
+
+        Each binary only exposes its function, and only includes the directories that function
+        needs (see dependency_analysis), so that it is smaller and faster to start than the binary
+        of the whole project. MatlabExecutor calls a function with its dedicated binary when it has
+        one. Dedicated binaries of functions not given are removed, as they would otherwise still be
+        called.
+
+        As a function that works with the binary of the whole project could then fail, no binary is
+        compiled for a function with calls the analysis could not follow, unless dynamic_calls is
+        given; the function is then still called with the binary of the whole project.
+
+        Args:
+            functions: list[str] - The functions to compile a binary for
+            log_file: str - If given, the output of mcc is streamed to mcc.log in the directory of each binary
+            dynamic_calls: list[str] - Functions called by name at runtime, to include in every binary. Giving
+                them (even as an empty list) also allows binaries of functions with calls not followed.
+
+            The other arguments are as for compile_project.
+
+        Returns:
+            list[tuple[str, int, str]]: The function name, return code and compilation result of each binary.
+        """
+        binaries_directory = os.path.join(self.output_directory, FUNCTION_BINARIES_DIRECTORY)
+        if os.path.isdir(binaries_directory):
+            for function_name in os.listdir(binaries_directory):
+                if function_name not in functions:
+                    shutil.rmtree(os.path.join(binaries_directory, function_name), ignore_errors=True)
+
+        results = []
+        for function_name in functions:
+            function_output = os.path.join(binaries_directory, function_name)
+            self.create_directory(function_output)
+            created_script = create_script.directory_to_script(
+                self.project_path,
+                verbose=verbose,
+                save_function_location=os.path.join(function_output, "functions.json"),
+                included_functions=[function_name],
+            )
+            if created_script is None or function_name not in created_script[1]:
+                shutil.rmtree(function_output, ignore_errors=True)
+                results.append((function_name, 1, f"Function {function_name} not found in {self.project_name}"))
+                continue
+
+            wrapper_file = os.path.join(function_output, f"{function_name}_wrapper.m")
+            if not self._file_has_text(wrapper_file, created_script[0]):
+                self.write_text_to_file(wrapper_file, created_script[0])
+            report = self._analyze_dependencies(
+                self._source_directories(), [function_name], dynamic_calls, output_callback or print, function_output
+            )
+            if (report.dynamic_calls or report.missing) and dynamic_calls is None:
+                shutil.rmtree(function_output, ignore_errors=True)
+                results.append(
+                    (
+                        function_name,
+                        1,
+                        f"Not compiled, as {function_name} has calls that could not be followed: give the functions "
+                        "they call with dynamic_calls. It is called with the binary of the whole project instead.",
+                    )
+                )
+                continue
+            code, message = MatlabCompiler(self.path_setter).compile(
+                wrapper_file,
+                function_output,
+                function_name,
+                additional_dirs=list(report.directories),
+                create_output_directory=True,
+                force_output=force_output,
+                profile=profile,
+                incremental=incremental,
+                log_file=os.path.join(function_output, LOG_FILE_NAME) if log_file else None,
+                output_callback=output_callback,
+                build_cache=build_cache,
+            )
+            results.append((function_name, code, message))
+        return results
+
+    def _source_directories(self) -> list[str]:
+        if isinstance(self.project_path, list):
+            return [os.path.abspath(x) for x in self.project_path if os.path.isdir(x)]
+        return [os.path.abspath(self.project_path)]
+
+    def _analyze_dependencies(
+        self,
+        project_dirs: list[str],
+        functions: list[str],
+        dynamic_calls: list[str] | None,
+        report_line: Callable[[str], None],
+        output_directory: str,
+    ) -> dependency_analysis.DependencyReport:
+        """The files and directories needed by the functions, also written to dependencies.json in output_directory."""
+        report = dependency_analysis.analyze(project_dirs, functions, dynamic_calls)
+        with open(
+            os.path.join(output_directory, dependency_analysis.DEPENDENCIES_FILE_NAME), "w", encoding="utf-8"
+        ) as file:
+            json.dump(report.to_dict(), file, indent=4)
+        report_line(
+            f"Including {len(report.directories)} directories with the {len(report.files)} files needed, "
+            f"excluding {len(report.excluded_directories)}"
+        )
+        for call in report.dynamic_calls:
+            report_line(f"Warning: dynamic call not followed, allow the functions it calls: {call.file}:{call.line}")
+        if report.missing:
+            report_line(f"Warning: functions allowed but not found: {', '.join(report.missing)}")
+        return report
+
     @staticmethod
     def compile_projects(
         source_path: str,
         output_path: str,
         force_output: bool = False,
         path_setter: MatlabPathSetter | None = None,
+        worker_mode: bool = False,
+        profile: str | CompileProfile | None = None,
+        project_profiles: dict[str, str | CompileProfile] | None = None,
+        incremental: bool = True,
+        max_jobs: int = 1,
+        memory_per_job: int | None = None,
+        build_cache: BuildCache | str | None = None,
+        prune: bool = False,
+        dynamic_calls: dict[str, list[str]] | None = None,
+        function_binaries: dict[str, list[str]] | None = None,
     ) -> list[tuple[str, int, str]]:
         """Compile all projects in the source directory.
 
         Each project will be compiled into a separate directory in the output directory, with the same
         name as the project.
 
+        With max_jobs above 1, several projects are compiled at once. The output of mcc is streamed to
+        mcc.log in the output directory of each project, and printed with the project name in front.
+        Finally, a summary with the result and wall time of each project is printed, and written to
+        compile_summary.json in the output directory.
+
         Args:
             source_path (str): The source path, containing separate subdirectories for each project.
             output_path (str): The output path, with one subdirectory created for each project.
             path_setter (MatlabPathSetter, optional): A path setter object. Defaults to None. Can be used if a specific
                 MATLAB version is required.
+            worker_mode (bool, optional): Whether to compile the worker variant of the wrappers. Defaults to False.
+            profile (str | CompileProfile, optional): The compile profile of the projects, see compile_profiles.
+                Defaults to the default profile.
+            project_profiles (dict, optional): The compile profile of specific projects, by project name,
+                overriding profile.
+            incremental (bool, optional): Whether to only run mcc for projects that have changed since they were
+                last compiled, see MatlabCompiler.compile. Defaults to True.
+            max_jobs (int, optional): The number of projects to compile at once. Defaults to 1.
+            memory_per_job (int, optional): The memory a single mcc job needs, in bytes. If given, jobs are
+                only started while enough memory is available, see compile_jobs.JobLimiter.
+            build_cache (BuildCache | str, optional): The build cache, or its directory, to restore projects
+                compiled before from instead of running mcc, see MatlabCompiler.compile.
+            prune (bool, optional): Whether to only include the directories each wrapper needs, see
+                compile_project. Defaults to False.
+            dynamic_calls (dict, optional): The functions called dynamically in specific projects, by project
+                name, see compile_project.
+            function_binaries (dict, optional): The functions to compile a dedicated binary for in specific
+                projects, by project name, see compile_project.
 
         Returns:
             list[tuple[str, int, str]]: A tuple containing the project name,
@@ -227,9 +459,6 @@ class MATLABProjectCompiler:
         print("Force output:", force_output)
         print("Path setter:", path_setter)
 
-        # Create a list to store the results
-        results = []
-
         # Get all subdirectories of the project directory
         project_dirs = [
             os.path.abspath(os.path.join(source_path, x))
@@ -237,23 +466,87 @@ class MATLABProjectCompiler:
             if os.path.isdir(os.path.join(source_path, x))
         ]
 
-        # Loop through the directories and compile the projects
-        for project_path in project_dirs:
+        if isinstance(build_cache, str):
+            build_cache = BuildCache(build_cache)
+        limiter = compile_jobs.JobLimiter(max_jobs, memory_per_job)
+        print_lock = threading.Lock()
+
+        def compile_one(project_path: str) -> tuple[str, int, str, float, str]:
             project_name = os.path.basename(project_path)
-            print("Project is:", project_name)
             current_project_output = os.path.join(output_path, project_name)
-            print("Creating output path: ", current_project_output)
             os.makedirs(current_project_output, exist_ok=True)
+            log_file = os.path.join(current_project_output, LOG_FILE_NAME)
 
-            compiler = MATLABProjectCompiler(
-                project_path=os.path.join(source_path, project_name),
-                output_path=current_project_output,
-                path_setter=path_setter,
-            )
-            compiler_code, compiler_message = compiler.compile_project(force_output=force_output)
-            results.append((project_name, compiler_code, compiler_message))
+            def print_line(line: str) -> None:
+                with print_lock:
+                    print(f"[{project_name}] {line}", end="" if line.endswith("\n") else "\n", flush=True)
 
-        return results
+            with limiter.slot():
+                print_line(f"Compiling into {current_project_output}")
+                start = time.perf_counter()
+                try:
+                    compiler = MATLABProjectCompiler(
+                        project_path=project_path,
+                        output_path=current_project_output,
+                        path_setter=path_setter,
+                    )
+                    compiler_code, compiler_message = compiler.compile_project(
+                        force_output=force_output,
+                        worker_mode=worker_mode,
+                        profile=(project_profiles or {}).get(project_name, profile),
+                        incremental=incremental,
+                        log_file=log_file,
+                        output_callback=print_line,
+                        build_cache=build_cache,
+                        prune=prune,
+                        dynamic_calls=(dynamic_calls or {}).get(project_name),
+                        function_binaries=(function_binaries or {}).get(project_name),
+                    )
+                except Exception:  # pylint: disable=broad-except
+                    compiler_code, compiler_message = 1, traceback.format_exc()
+                wall_time = time.perf_counter() - start
+                print_line(f"Finished with code {compiler_code} in {wall_time:.1f} s")
+            return project_name, compiler_code, compiler_message, wall_time, log_file
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=limiter.max_jobs) as pool:
+            compiled = list(pool.map(compile_one, project_dirs))
+        MATLABProjectCompiler._write_summary(output_path, compiled, time.perf_counter() - start)
+
+        return [(project_name, code, message) for project_name, code, message, _, _ in compiled]
+
+    @staticmethod
+    def _write_summary(output_path: str, compiled: list[tuple[str, int, str, float, str]], wall_time: float):
+        """Print the result and wall time of each project, and write them to compile_summary.json."""
+        projects = [
+            {
+                "project": project_name,
+                "return_code": code,
+                # The first line is about the binary of the whole project, any others about dedicated binaries
+                "skipped": code == 0 and "mcc was not run" in message.splitlines()[0],
+                "restored": code == 0 and "restored from the build cache" in message.splitlines()[0],
+                "wall_time": project_wall_time,
+                "log_file": log_file,
+            }
+            for project_name, code, message, project_wall_time, log_file in compiled
+        ]
+        print(f"{'Project':<30} {'Result':<10} {'Wall time':>10}")
+        for project in projects:
+            if project["return_code"] != 0:
+                result = "FAILED"
+            elif project["restored"]:
+                result = "cached"
+            else:
+                result = "up to date" if project["skipped"] else "ok"
+            print(f"{project['project']:<30} {result:<10} {project['wall_time']:>9.1f}s")
+        print(f"{len(projects)} projects in {wall_time:.1f} s")
+
+        summary = {"wall_time": wall_time, "projects": projects}
+        try:
+            with open(os.path.join(output_path, SUMMARY_FILE_NAME), "w", encoding="utf-8") as file:
+                json.dump(summary, file, indent=4)
+        except OSError as e:
+            print(f"Unable to write the compile summary. Error: {str(e)}")
 
 
 class MatlabCompiler:
@@ -261,7 +554,7 @@ class MatlabCompiler:
 
     def __init__(self, matlab_path=None):
         if not matlab_path:
-            matlab_path = MatlabPathSetter()
+            matlab_path = MatlabPathSetter.shared()
         self.matlab_path = matlab_path
 
     @staticmethod
@@ -269,6 +562,62 @@ class MatlabCompiler:
         full_path = os.path.join(path, filename)
         return os.path.isfile(full_path)
 
+    def _run_streamed(
+        self, command: list[str], log_file: str | None, output_callback: Callable[[str], None] | None
+    ) -> subprocess.CompletedProcess:
+        """Run mcc, passing each line it prints to the log file and callback as it is printed.
+
+        Raises:
+            subprocess.CalledProcessError: If mcc fails, as with subprocess.run(..., check=True).
+        """
+        output_lines = []
+        with open(log_file or os.devnull, "w", encoding="utf-8") as log, subprocess.Popen(
+            command,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            env=self.matlab_path.child_environment(),
+        ) as process:
+            for line in process.stdout:
+                output_lines.append(line)
+                log.write(line)
+                log.flush()
+                if output_callback is not None:
+                    output_callback(line)
+        output = "".join(output_lines)
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, command, output, "")
+        return subprocess.CompletedProcess(command, process.returncode, output, "")
+
+    @staticmethod
+    def _write_metadata(
+        output_dir,
+        script_path,
+        output_file,
+        additional_dirs,
+        create_output_directory,
+        command,
+        profile: CompileProfile,
+        hashes: dict,
+        cache_key: str | None = None,
+    ) -> None:
+        """Write metadata.json of a compiled project, with the build cache entry it was restored from, if any."""
+        metadata = {
+            "script_path": script_path,
+            "output_dir": output_dir,
+            "output_file": output_file,
+            "additional_dirs": additional_dirs,
+            "create_output_directory": create_output_directory,
+            "command": command,
+            "profile": profile.to_dict(),
+            "build_hashes": hashes,
+        }
+        if cache_key is not None:
+            metadata["restored_from_cache"] = cache_key
+
+        with open(os.path.join(output_dir, build_hashes.METADATA_FILE_NAME), "w", encoding="utf-8") as file:
+            json.dump(metadata, file, indent=4)
+
     def compile(
         self,
         script_path,
@@ -278,6 +627,11 @@ class MatlabCompiler:
         create_output_directory=False,
         force_output=False,
         verbose=False,
+        profile: str | CompileProfile | None = None,
+        incremental=False,
+        log_file: str | None = None,
+        output_callback: Callable[[str], None] | None = None,
+        build_cache: BuildCache | None = None,
     ):
         """
         Compile a MATLAB script using the MATLAB Compiler (mcc).
@@ -295,6 +649,19 @@ class MatlabCompiler:
             force_output (bool, optional): If True, the output file will be overwritten if it already exists.
                 If False and the output file already exists, an error will be returned. Default is False.
             verbose (bool, optional): If True, verbose output will be printed during compilation. Default is False.
+            profile (str | CompileProfile, optional): The mcc options to use, see compile_profiles.
+                Defaults to the default profile.
+            incremental (bool, optional): If True, mcc is only run if the output file does not exist, or if
+                the sources in additional_dirs, the script, the mcc command or the MATLAB release have changed
+                since it was compiled (see build_hashes). The output file is then overwritten regardless of
+                force_output. Default is False.
+            log_file (str, optional): If given, everything mcc prints (stdout and stderr together) is written
+                to this file as it is printed, instead of being collected when mcc finishes.
+            output_callback (Callable[[str], None], optional): If given, called with each line mcc prints,
+                as it is printed.
+            build_cache (BuildCache, optional): If given, and the same sources, script, profile and release
+                have been compiled before (here or on another machine using the cache), the outputs are
+                restored from the cache instead of running mcc. Outputs compiled by mcc are stored in it.
 
         Returns:
             tuple: A tuple containing the return code and the compilation result.
@@ -306,6 +673,7 @@ class MatlabCompiler:
 
         """
         vprint = print if verbose else lambda *args, **kwargs: None
+        profile = get_profile(profile)
 
         if not os.path.isfile(script_path):
             return 1, f"Input file {script_path} does not exist."
@@ -321,22 +689,12 @@ class MatlabCompiler:
         if not output_file:
             output_file = script_name
 
-        if not force_output and self.__class__.file_exists(output_dir, output_file):
-            return 2, f"Output file {output_file} already exists in {output_dir}."
-
-        if not os.path.isdir(output_dir):
-            if create_output_directory:
-                vprint("Creating output directory")
-                os.makedirs(output_dir)
-            else:
-                return 1, f"Output directory {output_dir} does not exist."
-
         matlab_bin = self.matlab_path.mcc_binary
 
         command = [
             matlab_bin,
             "-m",
-            "-v",
+            *profile.mcc_options(),
             "-o",
             output_file,
             "-d",
@@ -348,25 +706,61 @@ class MatlabCompiler:
             for directory in additional_dirs:
                 command.extend(["-I", directory])
 
+        release = os.path.basename(self.matlab_path.matlab_root) if self.matlab_path.matlab_root else None
+        hashes = build_hashes.build_hashes(script_path, additional_dirs, command, release)
+
+        if incremental and self.__class__.file_exists(output_dir, output_file):
+            changed_parts = build_hashes.changed_parts(output_dir, hashes)
+            if not changed_parts:
+                vprint("Up to date, skipping mcc")
+                return 0, f"{output_file} in {output_dir} is up to date, mcc was not run."
+            vprint(f"Compiling, as the {', '.join(changed_parts)} changed")
+        elif not force_output and self.__class__.file_exists(output_dir, output_file):
+            return 2, f"Output file {output_file} already exists in {output_dir}."
+
+        if not os.path.isdir(output_dir):
+            if create_output_directory:
+                vprint("Creating output directory")
+                os.makedirs(output_dir)
+            else:
+                return 1, f"Output directory {output_dir} does not exist."
+
+        cache_key = None
+        if build_cache is not None:
+            cache_key = make_key(
+                list(additional_dirs or []), script_path, [*profile.mcc_options(), "-o", output_file], release
+            )
+            if build_cache.restore(cache_key, output_dir) is not None:
+                vprint(f"Restored from the build cache ({cache_key})")
+                self._write_metadata(
+                    output_dir,
+                    script_path,
+                    output_file,
+                    additional_dirs,
+                    create_output_directory,
+                    command,
+                    profile,
+                    hashes,
+                    cache_key,
+                )
+                return 0, f"{output_file} in {output_dir} was restored from the build cache, mcc was not run."
+
         try:
-            result = subprocess.run(command, check=True, capture_output=True, text=True)
+            if log_file is None and output_callback is None:
+                result = subprocess.run(
+                    command, check=True, capture_output=True, text=True, env=self.matlab_path.child_environment()
+                )
+            else:
+                result = self._run_streamed(command, log_file, output_callback)
             output_result = result.stdout
             output_error = result.stderr
             if output_error is None or len(output_error) == 0:
                 output_error = "None"
 
             # Create a metadata file
-            metadata = {
-                "script_path": script_path,
-                "output_dir": output_dir,
-                "output_file": output_file,
-                "additional_dirs": additional_dirs,
-                "create_output_directory": create_output_directory,
-                "command": command,
-            }
-
-            with open(os.path.join(output_dir, "metadata.json"), "w", encoding="utf-8") as file:
-                json.dump(metadata, file, indent=4)
+            self._write_metadata(
+                output_dir, script_path, output_file, additional_dirs, create_output_directory, command, profile, hashes
+            )
 
             # Copy the original input file to the output directory
             # Also catches same file error, when using the same directory for input and output
@@ -374,6 +768,8 @@ class MatlabCompiler:
                 shutil.copy(script_path, output_dir)
             except (IOError, shutil.SameFileError, PermissionError) as e:
                 vprint(f"Error occurred: {str(e)}")
+            if build_cache is not None:
+                build_cache.put(cache_key, output_dir, [output_file, os.path.basename(script_path), *CACHED_FILE_NAMES])
             vprint("Successful...")
 
             return (
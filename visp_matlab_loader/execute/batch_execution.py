@@ -0,0 +1,97 @@
+"""
+Running many MATLAB calls concurrently, used by MatlabExecutor.execute_many and MatlabFunction.map.
+
+Every call is a separate compiled MATLAB process (or a request to a long-lived worker, see
+MatlabExecutor.start_workers), so threads are enough to keep several of them running at once.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import traceback
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, Iterator
+
+from .matlab_execution_result import MatlabExecutionResult
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+
+
+def default_worker_count() -> int:
+    return os.cpu_count() or 1
+
+
+def run_concurrently(
+    calls: Iterable[Callable[[], MatlabExecutionResult]],
+    error_result: Callable[[str], MatlabExecutionResult],
+    max_workers: int | None = None,
+    max_in_flight: int | None = None,
+    ordered: bool = True,
+) -> Iterator[tuple[int, MatlabExecutionResult]]:
+    """Run calls concurrently, yielding their results together with their index.
+
+    The calls are only taken from the iterable as there is room for them, so at most
+    max_in_flight calls are running or waiting to be yielded at any time. This means that
+    the iterable may be a generator over more calls than fit in memory.
+
+    An exception raised by a call does not stop the other calls; instead, it is turned into
+    a failed result using error_result, which is given the formatted traceback.
+
+    Args:
+        calls (Iterable[Callable[[], MatlabExecutionResult]]): The calls to make, each without arguments.
+        error_result (Callable[[str], MatlabExecutionResult]): Creates the result of a call that raised.
+        max_workers (int, optional): The number of calls to run at the same time.
+            Defaults to the number of CPUs.
+        max_in_flight (int, optional): The maximum number of calls taken from the iterable but not
+            yet yielded. Defaults to twice max_workers.
+        ordered (bool, optional): Whether to yield results in the order of the calls, rather than
+            as soon as they complete. Defaults to True.
+
+    Yields:
+        tuple[int, MatlabExecutionResult]: The index of the call and its result.
+    """
+    max_workers = max_workers or default_worker_count()
+    max_in_flight = max(max_in_flight or 2 * max_workers, 1)
+
+    def capture_errors(call: Callable[[], MatlabExecutionResult]) -> MatlabExecutionResult:
+        try:
+            return call()
+        except Exception:  # pylint: disable=broad-except
+            message = traceback.format_exc()
+            logger.error("Call failed: %s", message)
+            return error_result(message)
+
+    numbered_calls = enumerate(calls)
+    exhausted = False
+    pending: dict[Future, int] = {}
+    # Completed results waiting for earlier ones, when ordered
+    completed: dict[int, MatlabExecutionResult] = {}
+    next_index = 0
+
+    pool = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        while True:
+            while not exhausted and len(pending) + len(completed) < max_in_flight:
+                try:
+                    index, call = next(numbered_calls)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending[pool.submit(capture_errors, call)] = index
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                if ordered:
+                    completed[index] = future.result()
+                else:
+                    yield index, future.result()
+            while next_index in completed:
+                yield next_index, completed.pop(next_index)
+                next_index += 1
+    finally:
+        # Also reached if the caller stops iterating early, in which case queued calls are dropped
+        pool.shutdown(wait=True, cancel_futures=True)
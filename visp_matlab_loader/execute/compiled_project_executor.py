@@ -1,12 +1,17 @@
 from __future__ import annotations
 
-import numbers
+import asyncio
+import contextlib
+import functools
 import os
+import signal
 import subprocess
 import tempfile
+import time
 import logging
+import weakref
 from subprocess import PIPE
-from typing import Iterable
+from typing import Iterable, Iterator, Sequence
 
 import numpy as np
 import scipy
@@ -16,7 +21,10 @@ from visp_matlab_loader.project.matlab_project import MatlabProject
 
 from .. import matlab_path_setter
 from ..mat_to_wrapper import create_script
+from . import batch_execution, input_marshalling, mcr_cache, metrics, phase_timings
 from .matlab_execution_result import MatlabExecutionResult
+from .matlab_worker import MatlabWorkerPool
+from .result_cache import MatlabResultCache
 
 
 logger = logging.getLogger(__name__)
@@ -32,16 +40,23 @@ class MatlabExecutor:
     The compiled scripts should be the ones generated from the create_script function.
 
     In the current implementation, arguments are passed to and from matlab using saved
-    MATLAB files ('input.mat' and 'output.mat').
+    MATLAB files ('input.mat' and 'results.mat'), in a temporary directory private to each call.
+    The location of 'results.mat' is passed to the wrapper as 'output_file' in 'input.mat'.
 
     To make this work, the LD_LIBRARY_PATH must be set, usually to the installation directory
     of the MATLAB runtime; see the default LD_LIBRARY_PATH for reference.
 
     auto_convert automatically converts inputs to floating point, according to MATLAB default handling.
     This can be avoided by setting the flag to False, but then the user must instead ensure the types are
-    correct. Only simple numbers are converted - numpy arrays are not.
+    correct. Numbers, integer arrays and homogeneous numeric lists are converted to float64, while other
+    lists are kept as cell arrays (see input_marshalling).
 
+    worker_count starts a pool of long-lived workers (see start_workers), so that calls do not
+    pay the MATLAB Runtime startup every time. This requires the project to be compiled with
+    the worker variant of the wrapper. By default, every call starts a new process.
 
+    async_concurrency limits the number of calls made at the same time using execute_script_async,
+    defaulting to the number of CPUs.
 
     Returns:
         ScriptExecutor: An instance of the class
@@ -53,13 +68,268 @@ class MatlabExecutor:
         auto_convert=True,
         function_json=None,
         return_inputs=False,
+        worker_count: int = 0,
+        async_concurrency: int | None = None,
     ) -> None:
         self.matlab_project: MatlabProject = matlab_project
         self.auto_convert: bool = auto_convert
-        self.path_setter: matlab_path_setter.MatlabPathSetter = matlab_path_setter.MatlabPathSetter()
+        self.path_setter: matlab_path_setter.MatlabPathSetter = self._runtime_path_setter(matlab_project)
         self.path_setter.verify_paths()
         self.return_inputs: bool = return_inputs
         self.function_json = function_json
+        self._worker_pool: MatlabWorkerPool | None = None
+        self.mcr_cache: mcr_cache.McrCacheLayout | None = None
+        self._worker_cache_indices: list[int] = []
+        self.result_cache: MatlabResultCache | None = None
+        self.async_concurrency: int = async_concurrency or batch_execution.default_worker_count()
+        self._async_semaphores: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        if worker_count > 0:
+            self.start_workers(worker_count)
+
+    @staticmethod
+    def _runtime_path_setter(matlab_project: MatlabProject) -> matlab_path_setter.MatlabPathSetter:
+        """The installation of the release the project was compiled for, or else the latest one."""
+        version = matlab_project.required_matlab_version
+        if version is not None:
+            path_setter = matlab_path_setter.MatlabPathSetter.shared(version)
+            if path_setter.matlab_root is not None:
+                return path_setter
+            logger.warning(
+                "MATLAB Runtime R%s required by %s not found, using the latest release", version, matlab_project.name
+            )
+        return matlab_path_setter.MatlabPathSetter.shared()
+
+    def child_environment(self, mcr_cache_directory: str | None = None) -> dict[str, str]:
+        """The environment the compiled binary is run with, see MatlabPathSetter.child_environment.
+
+        Args:
+            mcr_cache_directory (str, optional): The MCR_CACHE_ROOT of the process. Defaults to leaving it as it is.
+        """
+        environment = self.path_setter.child_environment()
+        if mcr_cache_directory is not None:
+            environment[mcr_cache.MCR_CACHE_ROOT_VARIABLE] = mcr_cache_directory
+        return environment
+
+    def set_mcr_cache_root(self, cache_root: str | None) -> mcr_cache.McrCacheLayout | None:
+        """Give every concurrently running MATLAB process its own MCR cache root below cache_root.
+
+        Calls then no longer wait on each other while the MATLAB Runtime extracts the binary. Use
+        warm_up to extract it ahead of time. Worker pools started before are not changed.
+
+        Args:
+            cache_root (str | None): The directory of the cache roots, see McrCacheLayout. None goes
+                back to the MCR_CACHE_ROOT of the environment (or the default of the MATLAB Runtime).
+
+        Returns:
+            McrCacheLayout | None: The layout of the cache roots.
+        """
+        if self.mcr_cache is not None and cache_root is not None and self.mcr_cache.root == os.path.abspath(cache_root):
+            return self.mcr_cache
+        self.mcr_cache = None if cache_root is None else mcr_cache.McrCacheLayout(cache_root)
+        return self.mcr_cache
+
+    def _mcr_cache_directory(self):
+        """A context holding an MCR cache root for a single process, yielding None if not set."""
+        if self.mcr_cache is None:
+            return contextlib.nullcontext()
+        return self.mcr_cache.acquire()
+
+    def warm_up(
+        self, cache_root: str | None = None, worker_count: int = 1, function_binaries: bool | list[str] = True
+    ) -> list[mcr_cache.WarmUpResult]:
+        """Start the compiled binaries ahead of time, so that the MATLAB Runtime has extracted them.
+
+        Each binary is started twice with each of the first worker_count cache roots (in parallel),
+        without calling any function, and the time of each start is reported. The first start is
+        only cold if the cache root was empty.
+
+        Args:
+            cache_root (str, optional): Use per-process cache roots below this directory, see set_mcr_cache_root.
+                Defaults to the cache roots already set, or else the cache root of the environment.
+            worker_count (int, optional): The number of cache roots to fill, usually the number of calls
+                that will run at the same time. Defaults to 1.
+            function_binaries (bool | list[str], optional): Whether to also start the binaries dedicated to
+                single functions (see MatlabProject.function_binaries), or the functions whose binaries to start.
+                Defaults to all of them.
+
+        Returns:
+            list[WarmUpResult]: The start latencies of each binary with each cache root.
+        """
+        if cache_root is not None:
+            self.set_mcr_cache_root(cache_root)
+        directories: list[str | None] = [None]
+        if self.mcr_cache is not None:
+            directories = [self.mcr_cache.directory(index) for index in range(max(worker_count, 1))]
+
+        # None stands for the binary of the whole project
+        function_names: list[str | None] = [None]
+        if function_binaries:
+            dedicated = self.matlab_project.function_binaries
+            function_names += [
+                name for name in (dedicated if function_binaries is True else function_binaries) if name in dedicated
+            ]
+
+        def error_result(message: str) -> list[mcr_cache.WarmUpResult]:
+            return [mcr_cache.WarmUpResult(self.matlab_project.name, None, return_code=1, message=message)]
+
+        return [
+            result
+            for _, results in batch_execution.run_concurrently(
+                (functools.partial(self._warm_up_directory, directory, function_names) for directory in directories),
+                error_result,
+                max_workers=len(directories),
+            )
+            for result in results
+        ]
+
+    def _warm_up_directory(
+        self, directory: str | None, function_names: list[str | None]
+    ) -> list[mcr_cache.WarmUpResult]:
+        # Whether the cache root was empty before any of the binaries was started with it
+        cold = not mcr_cache.is_populated(directory)
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+        environment = self.child_environment(directory)
+        results = []
+        for function_name in function_names:
+            result = mcr_cache.WarmUpResult(self.matlab_project.name, directory, function_name=function_name)
+            for attempt in range(2 if cold else 1):
+                result.return_code, result.message, start_time = self._start_runtime(environment, function_name)
+                if not result.success:
+                    break
+                if cold and attempt == 0:
+                    result.cold_start = start_time
+                else:
+                    result.warm_start = start_time
+            logger.info("%s", result)
+            results.append(result)
+        return results
+
+    def _start_runtime(self, environment: dict[str, str], function_name: str | None = None) -> tuple[int, str, float]:
+        """Run a binary on an empty batch of calls, returning the exit code, output and time taken.
+
+        The binary dedicated to function_name is run if given, otherwise the binary of the whole project.
+        """
+        with tempfile.TemporaryDirectory(prefix="matlab_call_") as call_directory:
+            input_file, _ = self._write_input(call_directory, {"requests": np.empty((0,), dtype=object)})
+            start = time.perf_counter()
+            try:
+                binary_file = (
+                    self.matlab_project.binary_file_for(function_name)
+                    if function_name
+                    else self.matlab_project.binary_file
+                )
+                completed_process = subprocess.run(
+                    [binary_file, input_file],
+                    env=environment,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT,
+                    text=True,
+                    cwd=call_directory,
+                )
+            except OSError as e:
+                return 1, f"{type(e).__name__}: {e}", time.perf_counter() - start
+            return completed_process.returncode, completed_process.stdout, time.perf_counter() - start
+
+    @property
+    def worker_pool(self) -> MatlabWorkerPool | None:
+        return self._worker_pool
+
+    def start_workers(self, worker_count: int = 1, request_timeout: float | None = None) -> MatlabWorkerPool:
+        """Start serving calls from a pool of long-lived worker processes.
+
+        The workers are started on first use, and crashed workers are restarted automatically.
+        The project must have been compiled with the worker variant of the wrapper
+        (see create_script.directory_to_script).
+
+        Args:
+            worker_count (int, optional): The number of worker processes. Defaults to 1.
+            request_timeout (float, optional): The maximum time for a single call, in seconds,
+                after which the worker is killed. Defaults to no limit.
+
+        Returns:
+            MatlabWorkerPool: The new worker pool.
+        """
+        self.stop_workers()
+        worker_environments = None
+        if self.mcr_cache is not None:
+            # Each worker keeps its cache root for as long as the pool runs
+            self._worker_cache_indices = [self.mcr_cache.reserve() for _ in range(worker_count)]
+            worker_environments = [
+                self.child_environment(self.mcr_cache.directory(index)) for index in self._worker_cache_indices
+            ]
+        self._worker_pool = MatlabWorkerPool(
+            self.matlab_project.binary_file,
+            worker_count=worker_count,
+            environment=self.child_environment(),
+            request_timeout=request_timeout,
+            worker_environments=worker_environments,
+        )
+        return self._worker_pool
+
+    def enable_cache(self, directory: str, max_bytes: int = 1024**3) -> MatlabResultCache:
+        """Reuse the results of earlier calls with the same inputs, stored in the given directory.
+
+        Successful results are stored, keyed by the compiled binary, the function name, the number
+        of outputs and the inputs (after auto_convert). Results of an earlier version of the binary
+        are never returned. The cache directory can be shared between projects and processes.
+
+        Args:
+            directory (str): The cache directory, created if it does not exist.
+            max_bytes (int, optional): The maximum size of the cache, after which the least recently
+                used results are removed. Defaults to 1 GiB.
+
+        Returns:
+            MatlabResultCache: The cache, which also holds the hit and miss counters.
+        """
+        self.result_cache = MatlabResultCache(directory, max_bytes=max_bytes)
+        return self.result_cache
+
+    def disable_cache(self) -> None:
+        if self.result_cache is not None:
+            self.result_cache.close()
+            self.result_cache = None
+
+    def _cache_key(self, binary_file: str, function_name: str, output_count: int, varargin: np.ndarray) -> str | None:
+        if self.result_cache is None:
+            return None
+        return self.result_cache.make_key(binary_file, function_name, output_count, varargin)
+
+    def _cache_lookup(self, cache_key: str | None) -> MatlabExecutionResult | None:
+        if self.result_cache is None or cache_key is None:
+            return None
+        return self.result_cache.get(cache_key)
+
+    def _cache_store(
+        self, cache_key: str | None, binary_file: str, result: MatlabExecutionResult
+    ) -> MatlabExecutionResult:
+        if self.result_cache is not None and cache_key is not None:
+            self.result_cache.put(cache_key, binary_file, result)
+        return result
+
+    def _binary_file_for(self, function_name: str) -> str:
+        """The binary a single call runs with: the binary dedicated to the function, if there is one.
+
+        Resolved once per call, which then runs with it and keys its cached result on it, so that
+        recompiling only the dedicated binary of a function invalidates its results. Workers, and
+        batches (which may call several functions), use the binary of the whole project.
+        """
+        if self._worker_pool is not None:
+            return self.matlab_project.binary_file
+        binary_file = self.matlab_project.binary_file_for(function_name)
+        if binary_file != self.matlab_project.binary_file:
+            logger.info("Calling %s with its dedicated binary", function_name)
+        return binary_file
+
+    def stop_workers(self) -> None:
+        """Stop all worker processes, returning to one process per call."""
+        if self._worker_pool is not None:
+            self._worker_pool.close()
+            self._worker_pool = None
+        if self.mcr_cache is not None:
+            for index in self._worker_cache_indices:
+                self.mcr_cache.release(index)
+        self._worker_cache_indices = []
 
     @property
     def available_functions(self):
@@ -93,25 +363,32 @@ class MatlabExecutor:
     def mat_struct_to_dict(obj):
         """
         A function to convert MATLAB structs into Python dictionaries.
+
+        Only containers that may hold structs are recursed into: structs, structured NumPy arrays,
+        cell (object) arrays and lists. Numeric, logical and char arrays cannot contain structs,
+        and are returned as they are, so the cost does not depend on their size.
         """
+        if isinstance(obj, np.ndarray):
+            if obj.dtype.names is not None:
+                # If the input object is a structured NumPy array, convert it to a dictionary
+                logger.debug("Converting structured NumPy array to dictionary.")
+                return {name: MatlabExecutor.mat_struct_to_dict(obj[name]) for name in obj.dtype.names}
+            if obj.dtype.hasobject:
+                # A cell array, where each element can be anything
+                logger.debug("Applying function to each element of cell array.")
+                return [MatlabExecutor.mat_struct_to_dict(element) for element in obj]
+            # A numeric, logical or char array, which is kept as it is
+            return obj
         if isinstance(obj, scipy.io.matlab.mat_struct):
             # If the input object is a MATLAB struct, convert it to a dictionary
-            dict = {str(field): MatlabExecutor.mat_struct_to_dict(getattr(obj, field)) for field in obj._fieldnames}
-            logger.debug("Converted MATLAB struct to dictionary.")
-        elif isinstance(obj, np.ndarray) and obj.dtype.names is not None:
-            # If the input object is a structured NumPy array, convert it to a dictionary
-            dict = {name: MatlabExecutor.mat_struct_to_dict(obj[name]) for name in obj.dtype.names}
-            logger.debug("Converted structured NumPy array to dictionary.")
-        elif isinstance(obj, (list, np.ndarray)):
-            # If the input object is a list or an unstructured NumPy array, apply the function to each element
-            dict = [MatlabExecutor.mat_struct_to_dict(element) for element in obj]
-            logger.debug("Applied function to each element of list or unstructured NumPy array.")
-        else:
-            # If the input object is not a MATLAB struct or a NumPy array, return it as is
-            dict = obj
-            # Omitted this even in logging, as it is the most common case and not very interesting.
-            # logger.debug("Input object is not a MATLAB struct or a NumPy array.")
-        return dict
+            logger.debug("Converting MATLAB struct to dictionary.")
+            return {str(field): MatlabExecutor.mat_struct_to_dict(getattr(obj, field)) for field in obj._fieldnames}
+        if isinstance(obj, list):
+            # Cell arrays are loaded as lists when using simplify_cells
+            return [MatlabExecutor.mat_struct_to_dict(element) for element in obj]
+        # If the input object is not a container, return it as is.
+        # Omitted this even in logging, as it is the most common case and not very interesting.
+        return obj
 
     def execute_script(self, function_name: str, output_count: int, *args):
         """Executes the specific script name witht he specified arguments.
@@ -132,94 +409,448 @@ class MatlabExecutor:
         for i, arg in enumerate(args):
             logger.info("  %d: %s of type %s", i, arg, type(arg).__name__)
 
-        if not isinstance(args, list):
-            logger.info("Converting to list for enumeration.")
-            args = list(args)
+        if not metrics.registry.enabled:
+            return self._execute_script(function_name, output_count, args)
+        metrics_start = metrics.registry.call_started(self.matlab_project.name, function_name)
+        return_code = metrics.EXCEPTION_RETURN_CODE
+        try:
+            result = self._execute_script(function_name, output_count, args)
+            return_code = result.return_code
+            return result
+        finally:
+            metrics.registry.call_finished(self.matlab_project.name, function_name, metrics_start, return_code)
+
+    def _execute_script(self, function_name: str, output_count: int, args) -> MatlabExecutionResult:
+        """Executes a script, see execute_script."""
+        call_start = time.perf_counter()
+        timings = {}
 
         script_input = {}
         script_input["function_name"] = function_name
         script_input["output_count"] = output_count
+        with phase_timings.timed(timings, phase_timings.MARSHAL):
+            varargin = self._prepare_varargin(args)
+        script_input["varargin"] = varargin
+        binary_file = self._binary_file_for(function_name)
+
+        cache_key = None
+        if self.result_cache is not None:
+            with phase_timings.timed(timings, phase_timings.CACHE):
+                cache_key = self._cache_key(binary_file, function_name, output_count, varargin)
+                cached_result = self._cache_lookup(cache_key)
+            if metrics.registry.enabled and cache_key is not None:
+                metrics.registry.record_cache(self.matlab_project.name, function_name, cached_result is not None)
+            if cached_result is not None:
+                logger.info("Using cached result for %s", function_name)
+                timings[phase_timings.TOTAL] = time.perf_counter() - call_start
+                cached_result.timings = timings
+                return cached_result
+
+        exit_code, matlab_output, results = self._run_input(script_input, timings, binary_file)
+        result = self._convert_results(
+            function_name, output_count, varargin, exit_code, matlab_output, results, timings
+        )
+        timings[phase_timings.TOTAL] = time.perf_counter() - call_start
+        return self._cache_store(cache_key, binary_file, result)
 
-        varargin = np.empty((len(args),), dtype=object)
+    def _prepare_varargin(self, args) -> np.ndarray:
+        """Convert the arguments to the cell array passed as varargin, using auto_convert if set."""
+        if not isinstance(args, list):
+            logger.info("Converting to list for enumeration.")
+            args = list(args)
+
+        if self.auto_convert:
+            args, conversions = input_marshalling.marshal_arguments(args)
+            for i, (arg, conversion) in enumerate(zip(args, conversions)):
+                logger.debug("Input argument %d: %s, now %s", i, conversion, type(arg).__name__)
 
+        varargin = np.empty((len(args),), dtype=object)
         for i, arg in enumerate(args):
-            if self.auto_convert:
-                original_type = type(arg).__name__
-                if isinstance(arg, numbers.Real):
-                    arg = float(arg)
-                    conversion_message = f"Input argument {i}: Converting argument to float, was {original_type}"
-                elif isinstance(arg, list):
-                    conversion_message = f"Input argument {i}: Found list, attempting conversion if number"
-                    # We must verify if this actually works with complex file types.
-
-                    arg = [
-                        float(entry)
-                        if isinstance(entry, numbers.Real)
-                        else entry
-                        if isinstance(entry, numbers.Complex)
-                        else entry
-                        for entry in arg
-                    ]
-                else:
-                    conversion_message = f"Input argument {i}: No conversion, type is {original_type}"
+            varargin[i] = arg
 
-                final_type = type(arg).__name__
-                conversion_message += f", now {final_type}"
+        return varargin
 
-                logger.debug(conversion_message)
+    def _run_input(self, script_input: dict, timings: dict, binary_file: str | None = None):
+        """Run the compiled binary (or a worker) on the given input, adding the phases to timings.
 
-            varargin[i] = arg
+        The binary of the whole project is run, unless another binary_file is given.
 
-        script_input["varargin"] = varargin
+        Returns:
+            tuple: The exit code, the MATLAB output, and the loaded 'results' variable
+                (None if the exit code was nonzero).
+        """
+        # Each call gets a private directory for its input and results files, so that any
+        # number of calls can run at the same time, regardless of the current directory.
+        with tempfile.TemporaryDirectory(prefix="matlab_call_") as call_directory:
+            with phase_timings.timed(timings, phase_timings.SAVEMAT):
+                input_file, results_file = self._write_input(call_directory, script_input)
+
+            if self._worker_pool is not None:
+                with self._worker_pool.acquire() as worker, phase_timings.timed(timings, phase_timings.PROCESS):
+                    exit_code, matlab_output = worker.request(input_file, timeout=self._worker_pool.request_timeout)
+            else:
+                try:
+                    # The working directory is set as well, for wrappers compiled before output_file was supported
+                    process_start = time.perf_counter()
+                    with self._mcr_cache_directory() as mcr_cache_directory:
+                        completed_process = subprocess.run(
+                            [binary_file or self.matlab_project.binary_file, input_file],
+                            env=self.child_environment(mcr_cache_directory),
+                            stdout=subprocess.PIPE,
+                            text=True,
+                            cwd=call_directory,
+                        )
+                except (
+                    subprocess.TimeoutExpired,
+                    subprocess.CalledProcessError,
+                    FileNotFoundError,
+                    PermissionError,
+                    OSError,
+                    ValueError,
+                    subprocess.SubprocessError,
+                ) as e:
+                    logger.error("%s: %s", type(e).__name__, e)
+
+                timings[phase_timings.PROCESS] = time.perf_counter() - process_start
+                exit_code = completed_process.returncode
+                matlab_output = completed_process.stdout
+
+            logger.info("MATLAB exited with code: %d", exit_code)
+            if metrics.registry.enabled:
+                self._record_bytes(script_input.get("function_name", metrics.BATCH_FUNCTION), input_file, results_file)
+            if exit_code != 0:
+                return exit_code, matlab_output, None
+            with phase_timings.timed(timings, phase_timings.LOADMAT):
+                results, compute_time = self._load_results(results_file)
+            phase_timings.add_compute_time(timings, compute_time)
+            return exit_code, matlab_output, results
+
+    def _record_bytes(self, function_name: str, input_file: str, results_file: str) -> None:
+        """Add the sizes of the input and results files of a call to the metrics."""
+        bytes_out = os.path.getsize(results_file) if os.path.exists(results_file) else 0
+        metrics.registry.add_bytes(self.matlab_project.name, function_name, os.path.getsize(input_file), bytes_out)
+
+    @staticmethod
+    def _write_input(call_directory: str, script_input: dict) -> tuple[str, str]:
+        """Save the input file in the call directory, returning the input and results file names."""
+        input_file = os.path.join(call_directory, "input.mat")
+        results_file = os.path.join(call_directory, "results.mat")
+        script_input["output_file"] = results_file
+
+        # Save input to the file
+        savemat(input_file, script_input)
+        logger.debug("Sending the following to the script: %s", script_input)
+        return input_file, results_file
+
+    @staticmethod
+    def _load_results(results_file: str):
+        """Load the 'results' and 'compute_time' variables saved by the wrapper.
+
+        Wrappers compiled before compute times were reported only save 'results', in which case
+        the compute time is None.
+        """
+        # The results file is removed along with the call directory
+        res = loadmat(results_file, squeeze_me=True, simplify_cells=True, struct_as_record=True)
+        return res["results"], res.get("compute_time")
 
-        # Verify that results.mat does not exist before running the script, as it will be overwritten:
-        if os.path.exists("results.mat"):
-            raise FileExistsError("results.mat already exists, please remove before running!")
+    def _async_semaphore(self) -> asyncio.Semaphore:
+        """The semaphore limiting concurrent calls from the running event loop."""
+        loop = asyncio.get_running_loop()
+        if loop not in self._async_semaphores:
+            self._async_semaphores[loop] = asyncio.Semaphore(self.async_concurrency)
+        return self._async_semaphores[loop]
 
-        with tempfile.NamedTemporaryFile(suffix=".mat", delete=True) as temp_file:
-            input_file = temp_file.name
+    async def execute_script_async(self, function_name: str, output_count: int, *args) -> MatlabExecutionResult:
+        """Executes the specific script name with the specified arguments, without blocking the event loop.
 
-            # Save input to the file
-            savemat(input_file, script_input)
-            logger.debug("Sending the following to the script:", script_input)
+        At most async_concurrency calls run at the same time for this project; any others wait for
+        their turn. Cancelling the call kills the MATLAB process, along with anything it started.
+        If workers are started, the call is instead sent to a worker from a separate thread, and
+        a cancelled call is allowed to finish in the background.
 
-            custom_environment = os.environ.copy()
+        Args:
+            function_name (str): The script name to run
+            output_count (int): The number of outputs to request
 
+        Returns:
+            A MATLAB execution result object (MatlabExecutionResult)
+        """
+        logger.info("Executing script %s with %d outputs asynchronously", function_name, output_count)
+        async with self._async_semaphore():
+            if self._worker_pool is not None:
+                return await asyncio.to_thread(self.execute_script, function_name, output_count, *args)
+            if not metrics.registry.enabled:
+                return await self._execute_script_async(function_name, output_count, args)
+            metrics_start = metrics.registry.call_started(self.matlab_project.name, function_name)
+            return_code = metrics.EXCEPTION_RETURN_CODE
             try:
-                completed_process = subprocess.run(
-                    [self.matlab_project.binary_file, input_file],
-                    env=custom_environment,
-                    stdout=subprocess.PIPE,
-                    text=True,
-                )
-            except (
-                subprocess.TimeoutExpired,
-                subprocess.CalledProcessError,
-                FileNotFoundError,
-                PermissionError,
-                OSError,
-                ValueError,
-                subprocess.SubprocessError,
-            ) as e:
-                logger.error("%s: %s", type(e).__name__, e)
-
-            exit_code = completed_process.returncode
+                result = await self._execute_script_async(function_name, output_count, args)
+                return_code = result.return_code
+                return result
+            finally:
+                metrics.registry.call_finished(self.matlab_project.name, function_name, metrics_start, return_code)
+
+    async def _execute_script_async(self, function_name: str, output_count: int, args) -> MatlabExecutionResult:
+        """Executes a script in a new process, see execute_script_async."""
+        call_start = time.perf_counter()
+        timings = {}
+
+        script_input = {}
+        script_input["function_name"] = function_name
+        script_input["output_count"] = output_count
+        with phase_timings.timed(timings, phase_timings.MARSHAL):
+            varargin = self._prepare_varargin(args)
+        script_input["varargin"] = varargin
+        binary_file = self._binary_file_for(function_name)
+
+        cache_key = None
+        if self.result_cache is not None:
+            with phase_timings.timed(timings, phase_timings.CACHE):
+                cache_key = await asyncio.to_thread(self._cache_key, binary_file, function_name, output_count, varargin)
+                cached_result = await asyncio.to_thread(self._cache_lookup, cache_key)
+            if metrics.registry.enabled and cache_key is not None:
+                metrics.registry.record_cache(self.matlab_project.name, function_name, cached_result is not None)
+            if cached_result is not None:
+                logger.info("Using cached result for %s", function_name)
+                timings[phase_timings.TOTAL] = time.perf_counter() - call_start
+                cached_result.timings = timings
+                return cached_result
+
+        with (
+            tempfile.TemporaryDirectory(prefix="matlab_call_") as call_directory,
+            self._mcr_cache_directory() as mcr_cache_directory,
+        ):
+            with phase_timings.timed(timings, phase_timings.SAVEMAT):
+                input_file, results_file = await asyncio.to_thread(self._write_input, call_directory, script_input)
+
+            process_start = time.perf_counter()
+            process = await asyncio.create_subprocess_exec(
+                binary_file,
+                input_file,
+                env=self.child_environment(mcr_cache_directory),
+                stdout=subprocess.PIPE,
+                cwd=call_directory,
+                # A new process group, so that everything can be killed on cancellation
+                start_new_session=True,
+            )
+            try:
+                stdout, _ = await process.communicate()
+            except asyncio.CancelledError:
+                logger.warning("Call to %s cancelled, killing MATLAB process %d", function_name, process.pid)
+                try:
+                    os.killpg(process.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                await process.wait()
+                raise
+
+            timings[phase_timings.PROCESS] = time.perf_counter() - process_start
+            exit_code = process.returncode
+            matlab_output = stdout.decode(errors="replace")
             logger.info("MATLAB exited with code: %d", exit_code)
-            matlab_output = completed_process.stdout
-            if exit_code != 0:
-                logger.error("Error: Nonzero MATLAB exit code, no results returned!")
-                return MatlabExecutionResult(
-                    exit_code,
-                    matlab_output,
-                    function_name,
-                    {},
-                    self.matlab_project.name,
+            if metrics.registry.enabled:
+                self._record_bytes(function_name, input_file, results_file)
+            results = None
+            if exit_code == 0:
+                with phase_timings.timed(timings, phase_timings.LOADMAT):
+                    results, compute_time = await asyncio.to_thread(self._load_results, results_file)
+                phase_timings.add_compute_time(timings, compute_time)
+
+        result = self._convert_results(
+            function_name, output_count, varargin, exit_code, matlab_output, results, timings
+        )
+        timings[phase_timings.TOTAL] = time.perf_counter() - call_start
+        if cache_key is not None:
+            await asyncio.to_thread(self._cache_store, cache_key, binary_file, result)
+        return result
+
+    def execute_batch(
+        self,
+        calls: Iterable[tuple[str, int, Sequence]],
+        chunk_size: int = 10,
+    ) -> list[MatlabExecutionResult]:
+        """Executes many scripts, with several calls handled by each start of the compiled binary.
+
+        The calls are packed into chunks of chunk_size, and each chunk is passed to the binary
+        as a single input file, so the MATLAB Runtime is only started once per chunk.
+        The timings of each result are those of its whole chunk, except for the compute time.
+        A call that fails inside MATLAB only fails that call; if the binary itself fails,
+        all calls of that chunk fail with its exit code.
+
+        Args:
+            calls (Iterable[tuple[str, int, Sequence]]): The function name, output count and arguments
+                of each call, as for execute_script.
+            chunk_size (int, optional): The maximum number of calls per start of the binary. Defaults to 10.
+
+        Returns:
+            list[MatlabExecutionResult]: The result of each call, in order.
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+
+        results = []
+        chunk = []
+        for function_name, output_count, args in calls:
+            chunk.append((function_name, output_count, self._prepare_varargin(args)))
+            if len(chunk) == chunk_size:
+                results.extend(self._execute_chunk(chunk))
+                chunk = []
+        if chunk:
+            results.extend(self._execute_chunk(chunk))
+        return results
+
+    def _execute_chunk(self, chunk: list[tuple[str, int, np.ndarray]]) -> list[MatlabExecutionResult]:
+        """Execute prepared calls using a single input file, see execute_batch."""
+        logger.info("Executing %d calls in one batch", len(chunk))
+        requests = np.empty((len(chunk),), dtype=object)
+        for i, (function_name, output_count, varargin) in enumerate(chunk):
+            request = np.empty((3,), dtype=object)
+            request[:] = [function_name, output_count, varargin]
+            requests[i] = request
+
+        if not metrics.registry.enabled:
+            return self._run_chunk(chunk, requests)
+        metrics_starts = [metrics.registry.call_started(self.matlab_project.name, call[0]) for call in chunk]
+        return_codes = [metrics.EXCEPTION_RETURN_CODE] * len(chunk)
+        try:
+            converted = self._run_chunk(chunk, requests)
+            return_codes = [result.return_code for result in converted]
+            return converted
+        finally:
+            for call, metrics_start, return_code in zip(chunk, metrics_starts, return_codes):
+                metrics.registry.call_finished(self.matlab_project.name, call[0], metrics_start, return_code)
+
+    def _run_chunk(self, chunk: list[tuple[str, int, np.ndarray]], requests: np.ndarray) -> list[MatlabExecutionResult]:
+        chunk_start = time.perf_counter()
+        chunk_timings = {}
+        exit_code, matlab_output, results = self._run_input({"requests": requests}, chunk_timings)
+        if exit_code != 0:
+            chunk_timings[phase_timings.TOTAL] = time.perf_counter() - chunk_start
+            return [
+                self._convert_results(
+                    function_name, output_count, varargin, exit_code, matlab_output, None, dict(chunk_timings)
                 )
+                for function_name, output_count, varargin in chunk
+            ]
+
+        # Due to squeeze_me, a single request is not wrapped in a list
+        if len(chunk) == 1:
+            results = [results]
+
+        converted = []
+        for (function_name, output_count, varargin), item in zip(chunk, results):
+            # Each item is {success, result or error message, compute time}
+            success, result = item[0], item[1]
+            timings = dict(chunk_timings)
+            timings.pop(phase_timings.STARTUP, None)
+            if len(item) > 2:
+                timings[phase_timings.COMPUTE] = float(item[2])
+            if success:
+                converted.append(
+                    self._convert_results(
+                        function_name, output_count, varargin, exit_code, matlab_output, result, timings
+                    )
+                )
+            else:
+                logger.error("Error in batched call to %s: %s", function_name, result)
+                converted.append(
+                    MatlabExecutionResult(
+                        1,
+                        f"{matlab_output}\nError: {result}",
+                        function_name,
+                        {},
+                        self.matlab_project.name,
+                        timings=timings,
+                    )
+                )
+        total = time.perf_counter() - chunk_start
+        for result in converted:
+            result.timings[phase_timings.TOTAL] = total
+        return converted
+
+    def execute_many(
+        self,
+        function_name: str,
+        output_count: int,
+        argument_sets: Iterable[Sequence],
+        max_workers: int | None = None,
+        max_in_flight: int | None = None,
+        ordered: bool = True,
+    ) -> Iterator[tuple[int, MatlabExecutionResult]]:
+        """Executes the same script for many sets of arguments, running several calls at once.
+
+        A call that raises does not stop the others; its result instead has return code -1 and
+        the traceback as its execution message. To avoid starting the MATLAB Runtime for
+        every call, combine this with start_workers.
 
-            # Load results from "results.mat" and then delete the file
-            res = loadmat("results.mat", squeeze_me=True, simplify_cells=True, struct_as_record=True)
-            os.remove("results.mat")
-        output_names, outputs = res["results"]
+        Args:
+            function_name (str): The script name to run
+            output_count (int): The number of outputs to request
+            argument_sets (Iterable[Sequence]): The arguments for each call. Only consumed as
+                there is room for more calls, so this can be a generator.
+            max_workers (int, optional): The number of calls to run at the same time. Defaults to
+                the number of workers if started, otherwise the number of CPUs.
+            max_in_flight (int, optional): The maximum number of calls started but not yet yielded.
+                Defaults to twice max_workers.
+            ordered (bool, optional): Whether to yield results in the order of argument_sets,
+                rather than as they complete. Defaults to True.
+
+        Yields:
+            tuple[int, MatlabExecutionResult]: The index of the argument set and its result.
+        """
+        calls = (
+            functools.partial(self.execute_script, function_name, output_count, *arguments)
+            for arguments in argument_sets
+        )
+        return batch_execution.run_concurrently(
+            calls,
+            self.error_result_factory(function_name),
+            max_workers=max_workers or self.default_concurrency,
+            max_in_flight=max_in_flight,
+            ordered=ordered,
+        )
+
+    @property
+    def default_concurrency(self) -> int:
+        """The number of calls to run at once, if not specified."""
+        if self._worker_pool is not None:
+            return self._worker_pool.worker_count
+        return batch_execution.default_worker_count()
+
+    def error_result_factory(self, function_name: str):
+        """Returns a function creating a failed result for a call that raised, given the traceback."""
+
+        def error_result(message: str) -> MatlabExecutionResult:
+            return MatlabExecutionResult(-1, message, function_name, {}, self.matlab_project.name)
+
+        return error_result
+
+    def _convert_results(
+        self,
+        function_name: str,
+        output_count: int,
+        varargin: np.ndarray,
+        exit_code: int,
+        matlab_output: str,
+        results,
+        timings: dict | None = None,
+    ) -> MatlabExecutionResult:
+        """Convert the results of a single call, as saved by dispatch_function in the wrapper."""
+        if timings is None:
+            timings = {}
+        if exit_code != 0:
+            logger.error("Error: Nonzero MATLAB exit code, no results returned!")
+            return MatlabExecutionResult(
+                exit_code,
+                matlab_output,
+                function_name,
+                {},
+                self.matlab_project.name,
+                timings=timings,
+            )
+        convert_start = time.perf_counter()
+
+        output_names, outputs = results
 
         # Due to how we squeeze and simplify the cells, the output array can be a numpy
         # array shaped in unexpected ways.
@@ -262,6 +893,8 @@ class MatlabExecutor:
         # Convert any matlab structs to python dictionaries
         outputs_dict = {n:MatlabExecutor.mat_struct_to_dict(v) for n,v in outputs_dict.items()}
 
+        timings[phase_timings.CONVERT] = time.perf_counter() - convert_start
+
         debug_output_lines = [f"{key}: {str(value)[:100]}" for key, value in outputs_dict.items()]
         debug_output_str = "\n\t".join(debug_output_lines)
         logger.debug("Outputs: %s", debug_output_str)
@@ -273,6 +906,7 @@ class MatlabExecutor:
             outputs_dict,
             self.matlab_project.name,
             return_inputs,
+            timings=timings,
         )
 
     # exit_code, matlab_output, {x: y for x, y in zip(names, outputs_iter)}
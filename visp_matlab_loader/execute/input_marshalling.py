@@ -0,0 +1,70 @@
+"""
+Conversion of Python inputs to the types MATLAB expects, used by MatlabExecutor when auto_convert is set.
+
+MATLAB works with doubles by default, so numbers, integer arrays and homogeneous numeric lists are
+converted to float64. Lists are converted in a single vectorized step, so that savemat does not have to
+marshal them element by element a second time. Only truly heterogeneous lists are kept as lists,
+which savemat stores as cell arrays.
+"""
+from __future__ import annotations
+
+import numbers
+from typing import Any, Iterable
+
+import numpy as np
+
+# The conversions reported for each argument
+UNCHANGED = "unchanged"
+SCALAR_TO_FLOAT = "scalar to float"
+FLOAT64_ARRAY = "float64 array, no copy"
+ARRAY_TO_FLOAT64 = "array to float64"
+LIST_TO_FLOAT64 = "numeric list to float64 array"
+LIST_TO_COMPLEX = "complex list to complex array"
+LIST_TO_CELL = "heterogeneous list to cell"
+
+
+def marshal_argument(arg: Any) -> tuple[Any, str]:
+    """Convert a single argument, returning the converted value and the conversion used.
+
+    Args:
+        arg (Any): The argument, as given by the user.
+
+    Returns:
+        tuple[Any, str]: The converted argument, and one of the conversions defined in this module.
+    """
+    if isinstance(arg, numbers.Real):
+        return float(arg), SCALAR_TO_FLOAT
+    if isinstance(arg, np.ndarray):
+        if arg.dtype == np.float64 and arg.flags.c_contiguous:
+            return arg, FLOAT64_ARRAY
+        if arg.dtype.kind in "iu":
+            return np.ascontiguousarray(arg, dtype=np.float64), ARRAY_TO_FLOAT64
+        return arg, UNCHANGED
+    if isinstance(arg, list):
+        return _marshal_list(arg)
+    return arg, UNCHANGED
+
+
+def _marshal_list(arg: list) -> tuple[Any, str]:
+    """Convert a list to a single array if it is homogeneous and numeric, or a list of converted elements."""
+    try:
+        array = np.asarray(arg)
+    except ValueError:
+        # Ragged nested lists
+        array = None
+    if array is not None and array.dtype.kind in "biuf":
+        return np.ascontiguousarray(array, dtype=np.float64), LIST_TO_FLOAT64
+    if array is not None and array.dtype.kind == "c":
+        return array, LIST_TO_COMPLEX
+    # Keep cell semantics, converting only the numbers in the list
+    return [float(entry) if isinstance(entry, numbers.Real) else entry for entry in arg], LIST_TO_CELL
+
+
+def marshal_arguments(args: Iterable[Any]) -> tuple[list[Any], list[str]]:
+    """Convert all arguments, see marshal_argument.
+
+    Returns:
+        tuple[list[Any], list[str]]: The converted arguments, and the conversion used for each.
+    """
+    converted = [marshal_argument(arg) for arg in args]
+    return [value for value, _ in converted], [conversion for _, conversion in converted]
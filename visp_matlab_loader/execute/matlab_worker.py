@@ -0,0 +1,221 @@
+"""
+Long-lived compiled MATLAB processes, used to avoid paying the MATLAB Runtime startup for every call.
+
+A worker is the compiled wrapper generated with `create_script.directory_to_script(..., worker_mode=True)`,
+started once and then fed input files over a FIFO (see the worker protocol in `create_script`).
+Any executable speaking the same protocol can be used, such as `utils/stand_in_runtime.py`.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import select
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+from ..mat_to_wrapper import create_script
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+
+# How often to check if the worker is still alive while waiting for a response
+POLL_INTERVAL = 0.1
+
+
+class MatlabWorker:
+    """A single long-lived compiled MATLAB process.
+
+    Each worker has a private directory, used as its working directory, containing the
+    request and response FIFOs and the log of everything the process prints.
+
+    Both FIFOs are kept open for reading and writing on our side, so that the worker can
+    open and close them for every request without blocking, and without us seeing an end
+    of file in between. Crashes are instead detected by polling the process.
+    """
+
+    @property
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    def __init__(self, binary_file: str, environment: dict | None = None) -> None:
+        self.binary_file = binary_file
+        self.environment = environment
+        self.process: subprocess.Popen | None = None
+        self.directory: str = tempfile.mkdtemp(prefix="matlab_worker_")
+        self.request_fifo = os.path.join(self.directory, "request.fifo")
+        self.response_fifo = os.path.join(self.directory, "response.fifo")
+        self.log_file = os.path.join(self.directory, "worker.log")
+        os.mkfifo(self.request_fifo)
+        os.mkfifo(self.response_fifo)
+        self._request_fd = os.open(self.request_fifo, os.O_RDWR)
+        self._response_fd = os.open(self.response_fifo, os.O_RDWR)
+        self._log = None
+
+    def start(self) -> None:
+        """Start the worker process. Any previous process is stopped first."""
+        if self.process is not None:
+            self.stop()
+        self._log = open(self.log_file, "ab")  # pylint: disable=consider-using-with
+        self.process = subprocess.Popen(  # pylint: disable=consider-using-with
+            [self.binary_file, create_script.WORKER_FLAG, self.request_fifo, self.response_fifo],
+            cwd=self.directory,
+            env=self.environment,
+            stdin=subprocess.DEVNULL,
+            stdout=self._log,
+            stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+        logger.info("Started worker %d for %s", self.process.pid, self.binary_file)
+
+    def request(self, input_file: str, timeout: float | None = None) -> tuple[int, str]:
+        """Send a single input file to the worker and wait for it to finish.
+
+        Args:
+            input_file (str): The input .mat file, in the same format as for a single call.
+            timeout (float, optional): The maximum time to wait, in seconds. The worker is killed
+                if it does not respond in time.
+
+        Returns:
+            tuple[int, str]: The exit code (0 on success, the process exit code if the worker
+                crashed) and everything the worker printed while handling the request.
+        """
+        if not self.is_alive:
+            self.start()
+
+        log_offset = os.path.getsize(self.log_file)
+        os.write(self._request_fd, f"{input_file}\n".encode())
+        response = self._read_response(timeout)
+
+        with open(self.log_file, "r", encoding="utf-8", errors="replace") as log:
+            log.seek(log_offset)
+            output = log.read()
+
+        if response is None:
+            # Either crashed or hung; make sure it is dead so that it is restarted on next use
+            if self.is_alive:
+                self.kill()
+            exit_code = self.process.returncode if self.process is not None else None
+            if not exit_code:
+                exit_code = -1
+            logger.error("Worker crashed or timed out with exit code %d", exit_code)
+            return exit_code, output
+        if response == create_script.WORKER_OK_RESPONSE:
+            return 0, output
+        logger.error("Worker returned error: %s", response)
+        return 1, output + response + "\n"
+
+    def _read_response(self, timeout: float | None) -> str | None:
+        """Read a single response line, or return None if the worker died or timed out."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        response = b""
+        while not response.endswith(b"\n"):
+            wait = POLL_INTERVAL
+            if deadline is not None:
+                wait = min(wait, deadline - time.monotonic())
+                if wait <= 0:
+                    logger.error("Worker did not respond within %s seconds", timeout)
+                    return None
+            readable, _, _ = select.select([self._response_fd], [], [], wait)
+            if readable:
+                response += os.read(self._response_fd, 4096)
+            elif not self.is_alive:
+                return None
+        return response.decode(errors="replace").strip()
+
+    def stop(self, timeout: float = 5) -> None:
+        """Stop the worker process, asking it to quit before killing it."""
+        if self.process is not None:
+            if self.process.poll() is None:
+                os.write(self._request_fd, f"{create_script.WORKER_QUIT_REQUEST}\n".encode())
+                try:
+                    self.process.wait(timeout=timeout)
+                except subprocess.TimeoutExpired:
+                    self.kill()
+            self.process = None
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        # Discard anything left over from the previous process
+        for fd in (self._request_fd, self._response_fd):
+            while select.select([fd], [], [], 0)[0]:
+                os.read(fd, 4096)
+
+    def kill(self) -> None:
+        """Kill the worker process, along with anything it has started."""
+        if self.process is not None and self.process.poll() is None:
+            os.killpg(self.process.pid, signal.SIGKILL)
+            self.process.wait()
+
+    def close(self) -> None:
+        """Stop the worker and remove its private directory."""
+        self.stop()
+        os.close(self._request_fd)
+        os.close(self._response_fd)
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+class MatlabWorkerPool:
+    """A fixed size pool of MatlabWorkers for a single compiled binary.
+
+    Workers are started on first use. A worker that has crashed is restarted automatically
+    the next time it is acquired. The workers share one environment, unless worker_environments
+    gives each its own (such as its own MCR_CACHE_ROOT).
+    """
+
+    def __init__(
+        self,
+        binary_file: str,
+        worker_count: int = 1,
+        environment: dict | None = None,
+        request_timeout: float | None = None,
+        worker_environments: list[dict] | None = None,
+    ) -> None:
+        if worker_count < 1:
+            raise ValueError("worker_count must be at least 1")
+        if worker_environments is None:
+            worker_environments = [environment] * worker_count
+        elif len(worker_environments) != worker_count:
+            raise ValueError("worker_environments must have one environment per worker")
+        self.binary_file = binary_file
+        self.request_timeout = request_timeout
+        self.restart_count = 0
+        self._workers = [MatlabWorker(binary_file, worker_environment) for worker_environment in worker_environments]
+        self._idle: queue.Queue[MatlabWorker] = queue.Queue()
+        for worker in self._workers:
+            self._idle.put(worker)
+        self._lock = threading.Lock()
+        self._finalizer = weakref.finalize(self, MatlabWorkerPool._close_workers, self._workers)
+
+    @property
+    def worker_count(self) -> int:
+        return len(self._workers)
+
+    @contextmanager
+    def acquire(self):
+        """Wait for an idle worker, (re)starting it if needed, and hold it for the duration of the context."""
+        worker = self._idle.get()
+        try:
+            if not worker.is_alive:
+                if worker.process is not None:
+                    with self._lock:
+                        self.restart_count += 1
+                    logger.warning("Restarting crashed worker for %s", self.binary_file)
+                worker.start()
+            yield worker
+        finally:
+            self._idle.put(worker)
+
+    def close(self) -> None:
+        self._finalizer()
+
+    @staticmethod
+    def _close_workers(workers: list[MatlabWorker]) -> None:
+        for worker in workers:
+            worker.close()
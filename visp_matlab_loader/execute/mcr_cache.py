@@ -0,0 +1,171 @@
+"""
+The MATLAB Runtime (MCR) cache of compiled projects, and warming it up before use.
+
+The first time a compiled binary is run with a given cache root (the MCR_CACHE_ROOT environment
+variable, or a directory in the home directory by default), the MATLAB Runtime extracts the
+archive embedded in the binary into it. This is slow, and processes sharing a cache root wait on
+each other's lock while it happens. An McrCacheLayout therefore gives every concurrently running
+process of an executor its own cache root below a single directory:
+
+    <cache root>/worker_0
+    <cache root>/worker_1
+    ...
+
+and MatlabExecutor.warm_up (or MatlabProject.warm_up, CompiledProjectFinder.warm_up) fills these
+ahead of time, reporting the cold and warm start latency:
+
+    python -m visp_matlab_loader.execute.mcr_cache matlab/compiled /scratch/mcr_cache --workers 4
+"""
+from __future__ import annotations
+
+import argparse
+import heapq
+import logging
+import os
+import sys
+import threading
+from contextlib import contextmanager
+
+from visp_matlab_loader.find_compiled_projects import CompiledProjectFinder
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+
+MCR_CACHE_ROOT_VARIABLE = "MCR_CACHE_ROOT"
+WORKER_DIRECTORY_PREFIX = "worker_"
+
+
+class McrCacheLayout:
+    """Separate MCR cache roots, one per concurrently running process, below a single directory.
+
+    Each running process holds one of the directories, and the directory with the lowest index
+    that is free is handed out first, so that the same (warm) directories keep being used. As
+    acquiring never waits, more directories are used if more processes run at once.
+    """
+
+    def __init__(self, root: str) -> None:
+        self.root = os.path.abspath(root)
+        self._free: list[int] = []
+        self._directory_count = 0
+        self._lock = threading.Lock()
+
+    def directory(self, index: int) -> str:
+        return os.path.join(self.root, f"{WORKER_DIRECTORY_PREFIX}{index}")
+
+    def reserve(self) -> int:
+        """Take the free directory with the lowest index, returning its index."""
+        with self._lock:
+            if self._free:
+                return heapq.heappop(self._free)
+            self._directory_count += 1
+            return self._directory_count - 1
+
+    def release(self, index: int) -> None:
+        with self._lock:
+            heapq.heappush(self._free, index)
+
+    @contextmanager
+    def acquire(self):
+        """Hold a directory for the duration of the context, yielding its path."""
+        index = self.reserve()
+        try:
+            yield self.directory(index)
+        finally:
+            self.release(index)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.root!r})"
+
+
+def is_populated(directory: str | None) -> bool:
+    """Whether a cache root holds anything, None meaning the default cache root (assumed populated)."""
+    if directory is None:
+        return True
+    try:
+        with os.scandir(directory) as entries:
+            return any(True for _ in entries)
+    except OSError:
+        return False
+
+
+class WarmUpResult:
+    """The start latencies of a compiled binary with a single cache root.
+
+    Attributes:
+        project_name (str): The name of the project.
+        function_name (str | None): The function of a dedicated binary, None for the binary of the whole project.
+        cache_directory (str | None): The cache root, None for the default of the MATLAB Runtime.
+        cold_start (float | None): The time of the first start, in seconds, if the cache root was empty before.
+        warm_start (float | None): The time of a start with the cache root filled, in seconds.
+        return_code (int): The exit code of the last start, nonzero if it failed.
+        message (str): What the binary printed, if it failed.
+    """
+
+    def __init__(
+        self,
+        project_name: str,
+        cache_directory: str | None,
+        cold_start: float | None = None,
+        warm_start: float | None = None,
+        return_code: int = 0,
+        message: str = "",
+        function_name: str | None = None,
+    ) -> None:
+        self.project_name = project_name
+        self.function_name = function_name
+        self.cache_directory = cache_directory
+        self.cold_start = cold_start
+        self.warm_start = warm_start
+        self.return_code = return_code
+        self.message = message
+
+    @property
+    def success(self) -> bool:
+        return self.return_code == 0
+
+    def to_dict(self) -> dict:
+        return {
+            "project": self.project_name,
+            "function": self.function_name,
+            "cache_directory": self.cache_directory,
+            "cold_start": self.cold_start,
+            "warm_start": self.warm_start,
+            "return_code": self.return_code,
+            "message": self.message,
+        }
+
+    def __str__(self) -> str:
+        name = self.project_name if self.function_name is None else f"{self.project_name}/{self.function_name}"
+        if not self.success:
+            return f"{name} [{self.cache_directory}]: failed with code {self.return_code}"
+        cold = "already warm" if self.cold_start is None else f"cold {self.cold_start:.2f} s"
+        return f"{name} [{self.cache_directory}]: {cold}, warm {self.warm_start:.2f} s"
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("compiled_directory", help="The directory of the compiled projects")
+    parser.add_argument("cache_root", help="The directory to create the per-worker cache roots in")
+    parser.add_argument("--workers", type=int, default=1, help="The number of cache roots to fill")
+    parser.add_argument("--projects", nargs="+", help="Only warm up these projects")
+    parser.add_argument(
+        "--no-function-binaries", action="store_true", help="Skip the binaries dedicated to single functions"
+    )
+    args = parser.parse_args(argv)
+
+    finder = CompiledProjectFinder(args.compiled_directory)
+    results = finder.warm_up(
+        args.cache_root,
+        worker_count=args.workers,
+        project_names=args.projects,
+        function_binaries=not args.no_function_binaries,
+    )
+    for result in results:
+        print(result)
+        if not result.success and result.message:
+            print(f"    {result.message.strip()}".replace("\n", "\n    "))
+    return 0 if all(result.success for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,233 @@
+"""
+Process-wide metrics of MATLAB calls, for capacity planning.
+
+Metrics are kept per project and function: the number of calls, failures by return code, calls
+in flight, a latency histogram, the bytes written to and read from the compiled binary and,
+when caching is enabled, cache hits and misses. Collection is disabled by default, in which
+case each call only checks a single flag. Enable it with:
+
+    from visp_matlab_loader.execute import metrics
+    metrics.registry.enable()
+
+The metrics can then be read with snapshot(), rendered in the Prometheus text format with
+to_prometheus(), or written to a file that a local scraper reads with write_snapshot().
+"""
+from __future__ import annotations
+
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+
+# Upper bounds, in seconds, of the latency histogram buckets. Calls start a MATLAB Runtime
+# unless workers are used, so the buckets go from milliseconds to minutes.
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# The function name used for the bytes of batched calls, which share an input and results file
+BATCH_FUNCTION = "(batch)"
+
+# The return code reported for calls that raised an exception instead of returning a result
+EXCEPTION_RETURN_CODE = "exception"
+
+
+class _Series:
+    """The metrics of a single (project, function) pair."""
+
+    def __init__(self, bucket_count: int) -> None:
+        self.calls = 0
+        self.failures: dict[str, int] = {}
+        self.in_flight = 0
+        # One count per bucket, plus one for calls slower than the last bucket
+        self.bucket_counts = [0] * (bucket_count + 1)
+        self.duration_sum = 0.0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+class MetricsRegistry:
+    """Thread-safe counters, gauges and histograms of MATLAB calls.
+
+    Attributes:
+        enabled (bool): Whether metrics are collected. Checked by the executor before any
+            other work is done, so a disabled registry costs a single attribute lookup per call.
+        buckets (tuple[float, ...]): The upper bounds of the latency histogram buckets, in seconds.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.enabled = False
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series: dict[tuple[str, str], _Series] = {}
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        """Stop collecting metrics, keeping those collected so far."""
+        self.enabled = False
+
+    def reset(self) -> None:
+        """Remove all collected metrics."""
+        with self._lock:
+            self._series.clear()
+
+    def _get_series(self, project: str, function: str) -> _Series:
+        # Must be called with the lock held
+        key = (project, function)
+        if key not in self._series:
+            self._series[key] = _Series(len(self.buckets))
+        return self._series[key]
+
+    def call_started(self, project: str, function: str) -> float:
+        """Record the start of a call, returning the start time to pass to call_finished."""
+        with self._lock:
+            self._get_series(project, function).in_flight += 1
+        return time.perf_counter()
+
+    def call_finished(self, project: str, function: str, start: float, return_code: int | str) -> None:
+        """Record the end of a call started with call_started.
+
+        Args:
+            project (str): The name of the project.
+            function (str): The name of the function.
+            start (float): The value returned by call_started.
+            return_code (int | str): The return code of the call, or EXCEPTION_RETURN_CODE if it raised.
+        """
+        duration = time.perf_counter() - start
+        with self._lock:
+            series = self._get_series(project, function)
+            series.in_flight -= 1
+            series.calls += 1
+            series.bucket_counts[bisect.bisect_left(self.buckets, duration)] += 1
+            series.duration_sum += duration
+            if return_code != 0:
+                code = str(return_code)
+                series.failures[code] = series.failures.get(code, 0) + 1
+
+    def add_bytes(self, project: str, function: str, bytes_in: int, bytes_out: int) -> None:
+        """Record the sizes of the input file written and the results file read for a call."""
+        with self._lock:
+            series = self._get_series(project, function)
+            series.bytes_in += bytes_in
+            series.bytes_out += bytes_out
+
+    def record_cache(self, project: str, function: str, hit: bool) -> None:
+        with self._lock:
+            series = self._get_series(project, function)
+            if hit:
+                series.cache_hits += 1
+            else:
+                series.cache_misses += 1
+
+    def snapshot(self) -> dict:
+        """The current metrics, as a dictionary that can be stored as JSON."""
+        with self._lock:
+            series = [
+                {
+                    "project": project,
+                    "function": function,
+                    "calls": values.calls,
+                    "failures": dict(values.failures),
+                    "in_flight": values.in_flight,
+                    "duration_seconds": {
+                        "buckets": [
+                            [bound, count] for bound, count in zip([*self.buckets, "+Inf"], values.bucket_counts)
+                        ],
+                        "sum": values.duration_sum,
+                        "count": values.calls,
+                    },
+                    "bytes_in": values.bytes_in,
+                    "bytes_out": values.bytes_out,
+                    "cache_hits": values.cache_hits,
+                    "cache_misses": values.cache_misses,
+                }
+                for (project, function), values in sorted(self._series.items())
+            ]
+        return {"timestamp": time.time(), "series": series}
+
+    def to_prometheus(self) -> str:
+        """The current metrics in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = []
+
+        def family(name: str, metric_type: str, description: str) -> None:
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {metric_type}")
+
+        def labels(series: dict, **extra) -> str:
+            pairs = {"project": series["project"], "function": series["function"], **extra}
+            return ",".join(f'{key}="{_escape_label(str(value))}"' for key, value in pairs.items())
+
+        family("visp_matlab_calls_total", "counter", "MATLAB calls completed.")
+        for series in snapshot["series"]:
+            lines.append(f"visp_matlab_calls_total{{{labels(series)}}} {series['calls']}")
+
+        family("visp_matlab_call_failures_total", "counter", "MATLAB calls that failed, by return code.")
+        for series in snapshot["series"]:
+            for return_code, count in sorted(series["failures"].items()):
+                lines.append(f"visp_matlab_call_failures_total{{{labels(series, return_code=return_code)}}} {count}")
+
+        family("visp_matlab_calls_in_flight", "gauge", "MATLAB calls currently running.")
+        for series in snapshot["series"]:
+            lines.append(f"visp_matlab_calls_in_flight{{{labels(series)}}} {series['in_flight']}")
+
+        family("visp_matlab_call_duration_seconds", "histogram", "Duration of MATLAB calls.")
+        for series in snapshot["series"]:
+            duration = series["duration_seconds"]
+            cumulative = 0
+            for bound, count in duration["buckets"]:
+                cumulative += count
+                bucket_labels = labels(series, le=_format_bound(bound))
+                lines.append(f"visp_matlab_call_duration_seconds_bucket{{{bucket_labels}}} {cumulative}")
+            lines.append(f"visp_matlab_call_duration_seconds_sum{{{labels(series)}}} {duration['sum']!r}")
+            lines.append(f"visp_matlab_call_duration_seconds_count{{{labels(series)}}} {duration['count']}")
+
+        for name, key, description in (
+            ("visp_matlab_input_bytes_total", "bytes_in", "Bytes of input files written for MATLAB."),
+            ("visp_matlab_output_bytes_total", "bytes_out", "Bytes of results files read from MATLAB."),
+            ("visp_matlab_cache_hits_total", "cache_hits", "Calls answered from the result cache."),
+            ("visp_matlab_cache_misses_total", "cache_misses", "Calls not found in the result cache."),
+        ):
+            family(name, "counter", description)
+            for series in snapshot["series"]:
+                lines.append(f"{name}{{{labels(series)}}} {series[key]}")
+
+        return "\n".join(lines) + "\n"
+
+    def write_snapshot(self, path: str, prometheus: bool | None = None) -> None:
+        """Write the current metrics to a file, replacing it atomically so a scraper never sees a partial file.
+
+        Args:
+            path (str): The file to write.
+            prometheus (bool, optional): Whether to use the Prometheus text format rather than JSON.
+                Defaults to True if the file name ends with .prom.
+        """
+        if prometheus is None:
+            prometheus = path.endswith(".prom")
+        content = self.to_prometheus() if prometheus else json.dumps(self.snapshot(), indent=2)
+        # Unique per call, so that threads writing a snapshot at the same time do not share a temporary file
+        temporary_file = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+        with open(temporary_file, "w", encoding="utf-8") as file:
+            file.write(content)
+        os.replace(temporary_file, path)
+        logger.info("Wrote metrics to %s", path)
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_bound(bound) -> str:
+    return bound if isinstance(bound, str) else repr(float(bound))
+
+
+# The registry used by all executors
+registry = MetricsRegistry()
@@ -0,0 +1,162 @@
+"""
+Binary serialization of MatlabExecutionResult, used by to_npz and from_npz.
+
+The file is an uncompressed .npz archive, so it can also be opened with numpy.load. Each numeric,
+logical or char array is stored raw as its own .npy member, and everything else (the metadata,
+and the nesting of dicts, lists and cell arrays in the outputs and inputs) is described by a
+small JSON manifest member. As the members are not compressed, arrays can be memory-mapped
+straight from the file instead of being read into memory.
+"""
+from __future__ import annotations
+
+import json
+import zipfile
+
+import numpy as np
+
+MANIFEST_NAME = "manifest.json"
+FORMAT_VERSION = 1
+
+# The fields of MatlabExecutionResult stored in the manifest as they are
+METADATA_FIELDS = ("return_code", "execution_message", "function_name", "project_name", "timings")
+
+
+class _Encoder:
+    """Replaces arrays by references to .npy members, collecting the arrays to write."""
+
+    def __init__(self) -> None:
+        self.arrays: dict[str, np.ndarray] = {}
+
+    def _add_array(self, array: np.ndarray) -> str:
+        name = f"array_{len(self.arrays)}"
+        self.arrays[name] = array
+        return name
+
+    def encode(self, value):
+        if isinstance(value, np.ndarray):
+            if value.dtype.hasobject:
+                return {"cell": list(value.shape), "items": [self.encode(item) for item in value.flat]}
+            return {"array": self._add_array(value)}
+        if isinstance(value, np.generic):
+            return {"scalar": self._add_array(np.asarray(value))}
+        if isinstance(value, dict):
+            return {"dict": [[str(key), self.encode(item)] for key, item in value.items()]}
+        if isinstance(value, list):
+            return {"list": [self.encode(item) for item in value]}
+        if isinstance(value, tuple):
+            return {"tuple": [self.encode(item) for item in value]}
+        if isinstance(value, complex):
+            return {"complex": [value.real, value.imag]}
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return {"value": value}
+        raise TypeError(f"Cannot serialize values of type {type(value).__name__}")
+
+
+def _decode(node, arrays: dict):
+    if "array" in node:
+        return arrays[node["array"]]
+    if "scalar" in node:
+        return arrays[node["scalar"]][()]
+    if "cell" in node:
+        cell = np.empty((len(node["items"]),), dtype=object)
+        cell[:] = [_decode(item, arrays) for item in node["items"]]
+        return cell.reshape(node["cell"])
+    if "dict" in node:
+        return {key: _decode(item, arrays) for key, item in node["dict"]}
+    if "list" in node:
+        return [_decode(item, arrays) for item in node["list"]]
+    if "tuple" in node:
+        return tuple(_decode(item, arrays) for item in node["tuple"])
+    if "complex" in node:
+        return complex(*node["complex"])
+    return node["value"]
+
+
+def _json_default(value):
+    # NumPy scalars in the metadata, such as a return code
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot serialize values of type {type(value).__name__}")
+
+
+def save(file: str, fields: dict) -> None:
+    """Write the fields of a MatlabExecutionResult to file.
+
+    Args:
+        file (str): The file to write, usually ending with .npz.
+        fields (dict): The fields, as in MatlabExecutionResult.__dict__.
+    """
+    encoder = _Encoder()
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "metadata": {name: fields.get(name) for name in METADATA_FIELDS},
+        "outputs": encoder.encode(fields["outputs"]),
+        "inputs": encoder.encode(fields["inputs"]),
+    }
+    with zipfile.ZipFile(file, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        archive.writestr(MANIFEST_NAME, json.dumps(manifest, allow_nan=True, default=_json_default))
+        for name, array in encoder.arrays.items():
+            with archive.open(f"{name}.npy", "w", force_zip64=True) as member:
+                np.lib.format.write_array(member, array, allow_pickle=False)
+
+
+def _memory_map(file: str, archive: zipfile.ZipFile, info: zipfile.ZipInfo) -> np.ndarray:
+    """Map a stored .npy member of the archive, without reading its data."""
+    with open(file, "rb") as raw:
+        # The member data follows its local header, whose size depends on the name and extra field
+        raw.seek(info.header_offset)
+        local_header = raw.read(zipfile.sizeFileHeader)
+        name_length = int.from_bytes(local_header[26:28], "little")
+        extra_length = int.from_bytes(local_header[28:30], "little")
+        data_offset = info.header_offset + zipfile.sizeFileHeader + name_length + extra_length
+
+        raw.seek(data_offset)
+        version = np.lib.format.read_magic(raw)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(raw)
+        elif version == (2, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(raw)
+        else:
+            shape = None
+        array_offset = raw.tell()
+    if not shape or dtype.itemsize == 0 or np.prod(shape) == 0:
+        # Empty and zero-dimensional arrays are small, and cannot always be mapped
+        with archive.open(info) as member:
+            return np.lib.format.read_array(member, allow_pickle=False)
+    mapped = np.memmap(
+        file, dtype=dtype, mode="r", offset=array_offset, shape=shape, order="F" if fortran_order else "C"
+    )
+    # A plain ndarray view of the mapping, so that it compares like any other loaded array
+    return np.asarray(mapped)
+
+
+def load(file: str, mmap: bool = False) -> dict:
+    """Read the fields of a MatlabExecutionResult written by save.
+
+    Args:
+        file (str): The file to read.
+        mmap (bool, optional): Whether to memory-map the arrays read-only instead of reading them.
+            The file must then not be changed while the arrays are in use. Defaults to False.
+
+    Returns:
+        dict: The fields, to be passed to MatlabExecutionResult.
+    """
+    with zipfile.ZipFile(file, "r") as archive:
+        manifest = json.loads(archive.read(MANIFEST_NAME))
+        if manifest.get("format_version", 0) > FORMAT_VERSION:
+            raise ValueError(f"{file} was written by a newer version, format {manifest['format_version']}")
+        arrays = {}
+        for info in archive.infolist():
+            if not info.filename.endswith(".npy"):
+                continue
+            name = info.filename[: -len(".npy")]
+            if mmap and info.compress_type == zipfile.ZIP_STORED:
+                arrays[name] = _memory_map(file, archive, info)
+            else:
+                with archive.open(info) as member:
+                    arrays[name] = np.lib.format.read_array(member, allow_pickle=False)
+
+    fields = dict(manifest["metadata"])
+    fields["outputs"] = _decode(manifest["outputs"], arrays)
+    fields["inputs"] = _decode(manifest["inputs"], arrays)
+    return fields
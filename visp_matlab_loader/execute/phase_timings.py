@@ -0,0 +1,52 @@
+"""
+Timing of the phases of a MATLAB call, as reported in MatlabExecutionResult.timings.
+
+All timings are durations in seconds, measured with a monotonic clock. Phases that were not
+part of a call (such as loading results after a failure) are left out.
+"""
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+
+# Converting the inputs (auto_convert)
+MARSHAL = "marshal"
+# Hashing the inputs and looking up the result, when caching is enabled
+CACHE = "cache"
+# Writing input.mat
+SAVEMAT = "savemat"
+# From starting the binary (or sending the request to a worker) until it finished
+PROCESS = "process"
+# The MATLAB function itself, as measured by the wrapper using tic/toc
+COMPUTE = "compute"
+# The part of PROCESS not spent in COMPUTE; mostly starting the MATLAB Runtime
+STARTUP = "startup"
+# Reading results.mat
+LOADMAT = "loadmat"
+# Converting the outputs (structs to dictionaries, etc.)
+CONVERT = "convert"
+# The whole call
+TOTAL = "total"
+
+
+@contextmanager
+def timed(timings: dict, phase: str):
+    """Add the time spent in the context to the given phase."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[phase] = timings.get(phase, 0.0) + time.perf_counter() - start
+
+
+def add_compute_time(timings: dict, compute_time: float | None) -> None:
+    """Split the process time into compute and startup, using the time reported by the wrapper.
+
+    Wrappers compiled before compute times were reported do not save them, in which case
+    only the process time is known.
+    """
+    if compute_time is None:
+        return
+    timings[COMPUTE] = float(compute_time)
+    if PROCESS in timings:
+        timings[STARTUP] = max(timings[PROCESS] - timings[COMPUTE], 0.0)
@@ -0,0 +1,252 @@
+"""
+A persistent, content-addressed cache of MATLAB execution results.
+
+Results are keyed by a stable hash of the compiled binary, the function name, the number of
+requested outputs and the input values as sent to MATLAB. They are stored as compressed pickles,
+one file per result, with an SQLite index used for lookups and least recently used eviction.
+
+Only open a cache directory that you trust, as the stored results are unpickled when read.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import pickle
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from .matlab_execution_result import MatlabExecutionResult
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+
+
+class UncacheableInputError(TypeError):
+    """Raised when an input value cannot be hashed in a stable way."""
+
+
+def _update_hash(digest, value) -> None:
+    """Add a value to the hash, in a form that does not depend on memory layout or dict order."""
+    if value is None:
+        digest.update(b"N")
+    elif isinstance(value, (bool, np.bool_)):
+        digest.update(b"B1" if value else b"B0")
+    elif isinstance(value, str):
+        encoded = value.encode("utf-8")
+        digest.update(b"S" + struct.pack("<Q", len(encoded)) + encoded)
+    elif isinstance(value, bytes):
+        digest.update(b"Y" + struct.pack("<Q", len(value)) + value)
+    elif isinstance(value, int) and not -(2**63) <= value < 2**64:
+        # Too large for a fixed-size integer type, so np.asarray would give an object array of it
+        digest.update(b"I" + str(value).encode())
+    elif isinstance(value, (int, float, complex, np.generic)):
+        _update_hash(digest, np.asarray(value))
+    elif isinstance(value, np.ndarray):
+        digest.update(b"A" + value.dtype.str.encode() + struct.pack(f"<{value.ndim + 1}Q", value.ndim, *value.shape))
+        if value.dtype.hasobject:
+            for element in value.flat:
+                _update_hash(digest, element)
+        elif value.dtype.names is not None:
+            for name in value.dtype.names:
+                _update_hash(digest, name)
+                _update_hash(digest, value[name])
+        else:
+            digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        digest.update(b"D" + struct.pack("<Q", len(value)))
+        # The type is hashed along with the key, so that e.g. {1: x} and {"1": x} differ
+        for key in sorted(value, key=lambda key: (type(key).__name__, str(key))):
+            _update_hash(digest, type(key).__name__)
+            _update_hash(digest, str(key))
+            _update_hash(digest, value[key])
+    elif isinstance(value, (list, tuple)):
+        digest.update(b"L" + struct.pack("<Q", len(value)))
+        for element in value:
+            _update_hash(digest, element)
+    else:
+        raise UncacheableInputError(f"Cannot cache inputs of type {type(value).__name__}")
+
+
+def hash_values(*values) -> str:
+    """A stable hash of the given values, see _update_hash for the supported types."""
+    digest = hashlib.sha256()
+    for value in values:
+        _update_hash(digest, value)
+    return digest.hexdigest()
+
+
+class MatlabResultCache:
+    """A size-bounded on-disk cache of MatlabExecutionResults.
+
+    Only successful results are stored. When a compiled binary changes, its previous results
+    can no longer be found, and are removed the first time the new binary is seen.
+
+    Attributes:
+        directory (str): The cache directory, which may be shared between processes.
+        max_bytes (int): The maximum total size of the stored results, after which the least
+            recently used are evicted.
+        hits (int): The number of lookups that found a result, in this process.
+        misses (int): The number of lookups that did not find a result, in this process.
+        evictions (int): The number of results evicted to stay within max_bytes, in this process.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 1024**3) -> None:
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = threading.Lock()
+        # (path, size, mtime) -> hash, so that each binary is only hashed once
+        self._binary_hashes: dict[tuple[str, int, int], str] = {}
+        self._connection = sqlite3.connect(
+            os.path.join(self.directory, "index.sqlite"), timeout=30, check_same_thread=False
+        )
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, binary_file TEXT, binary_hash TEXT, function_name TEXT, "
+                "size INTEGER, last_access REAL)"
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS results_last_access ON results (last_access)")
+
+    @property
+    def stats(self) -> dict:
+        with self._lock:
+            entries, size = self._connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": size,
+        }
+
+    def binary_hash(self, binary_file: str) -> str:
+        """The hash of the compiled binary, invalidating any results of earlier versions of it."""
+        binary_file = os.path.abspath(binary_file)
+        stat = os.stat(binary_file)
+        stamp = (binary_file, stat.st_size, stat.st_mtime_ns)
+        if stamp not in self._binary_hashes:
+            digest = hashlib.sha256()
+            with open(binary_file, "rb") as file:
+                for block in iter(lambda: file.read(1024**2), b""):
+                    digest.update(block)
+            self._binary_hashes[stamp] = digest.hexdigest()
+            self._invalidate(binary_file, self._binary_hashes[stamp])
+        return self._binary_hashes[stamp]
+
+    def make_key(self, binary_file: str, function_name: str, output_count: int, inputs) -> str | None:
+        """The key of a call, or None if the inputs cannot be hashed."""
+        try:
+            return hash_values(self.binary_hash(binary_file), function_name, int(output_count), inputs)
+        except UncacheableInputError as e:
+            logger.info("Not caching call to %s: %s", function_name, e)
+            return None
+
+    def get(self, key: str) -> MatlabExecutionResult | None:
+        """Return the stored result for the key, or None."""
+        with self._lock:
+            found = self._connection.execute("SELECT key FROM results WHERE key = ?", (key,)).fetchone()
+            if found is not None:
+                with self._connection:
+                    self._connection.execute("UPDATE results SET last_access = ? WHERE key = ?", (time.time(), key))
+        data = None
+        if found is not None:
+            try:
+                with open(self._payload_file(key), "rb") as file:
+                    data = pickle.loads(zlib.decompress(file.read()))
+            except (OSError, zlib.error, pickle.UnpicklingError, EOFError) as e:
+                logger.warning("Discarding unreadable cached result %s: %s", key, e)
+                self._remove([key])
+
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return MatlabExecutionResult(**data)
+
+    def put(self, key: str, binary_file: str, result: MatlabExecutionResult) -> None:
+        """Store a successful result, evicting the least recently used results if needed."""
+        if not result.success:
+            return
+        payload = zlib.compress(pickle.dumps(result.__dict__, protocol=pickle.HIGHEST_PROTOCOL), 1)
+        payload_file = self._payload_file(key)
+        os.makedirs(os.path.dirname(payload_file), exist_ok=True)
+        # Write to a temporary file first, so that readers never see a partial result
+        temporary_file = f"{payload_file}.{os.getpid()}.{threading.get_ident()}"
+        with open(temporary_file, "wb") as file:
+            file.write(payload)
+        os.replace(temporary_file, payload_file)
+
+        binary_hash = self.binary_hash(binary_file)
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    os.path.abspath(binary_file),
+                    binary_hash,
+                    result.function_name,
+                    len(payload),
+                    time.time(),
+                ),
+            )
+        self._evict()
+
+    def clear(self) -> None:
+        """Remove all stored results."""
+        with self._lock:
+            keys = [key for (key,) in self._connection.execute("SELECT key FROM results")]
+        self._remove(keys)
+
+    def close(self) -> None:
+        self._connection.close()
+
+    def _payload_file(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.bin")
+
+    def _invalidate(self, binary_file: str, binary_hash: str) -> None:
+        """Remove the results of other versions of a binary."""
+        with self._lock:
+            keys = [
+                key
+                for (key,) in self._connection.execute(
+                    "SELECT key FROM results WHERE binary_file = ? AND binary_hash != ?", (binary_file, binary_hash)
+                )
+            ]
+        if keys:
+            logger.info("Binary %s has changed, removing %d cached results", binary_file, len(keys))
+            self._remove(keys)
+
+    def _evict(self) -> None:
+        with self._lock:
+            (total,) = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()
+            if total <= self.max_bytes:
+                return
+            evicted = []
+            for key, size in self._connection.execute("SELECT key, size FROM results ORDER BY last_access"):
+                if total <= self.max_bytes:
+                    break
+                evicted.append(key)
+                total -= size
+            self.evictions += len(evicted)
+        logger.info("Evicting %d cached results", len(evicted))
+        self._remove(evicted)
+
+    def _remove(self, keys: list[str]) -> None:
+        with self._lock, self._connection:
+            self._connection.executemany("DELETE FROM results WHERE key = ?", [(key,) for key in keys])
+        for key in keys:
+            try:
+                os.remove(self._payload_file(key))
+            except FileNotFoundError:
+                pass
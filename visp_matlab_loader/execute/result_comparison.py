@@ -0,0 +1,333 @@
+"""
+Comparison of MATLAB outputs, used by MatlabExecutionResult.compare_results and __eq__.
+
+Numeric arrays are compared in a single vectorized step, with a relative and absolute tolerance
+that can be set per output. Containers (dicts, lists, tuples and cell arrays) are compared
+element by element. Instead of a bare bool, the comparison returns a ComparisonReport listing
+every difference found, with the maximum absolute and relative error, the number of mismatching
+elements and the first mismatching index of each array. The report is truthy if the outputs match,
+so it can be used as a bool.
+
+Messages are only formatted when the report is printed or debug logging is enabled.
+"""
+from __future__ import annotations
+
+import logging
+import numbers
+from collections.abc import Mapping
+from typing import Any
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
+
+# The kinds of arrays compared with tolerances: booleans, integers, floats and complex numbers
+NUMERIC_KINDS = "biufc"
+
+# Maximum number of characters of a value shown in a difference
+VALUE_PREVIEW_LENGTH = 80
+
+
+def _preview(value) -> str:
+    text = repr(value)
+    if len(text) > VALUE_PREVIEW_LENGTH:
+        return text[: VALUE_PREVIEW_LENGTH - 3] + "..."
+    return text
+
+
+class OutputDifference:
+    """A single difference between two outputs.
+
+    Attributes:
+        path (str): Where the difference is, such as "structVal.Value" or "list1[3]".
+        reason (str): One of "type", "keys", "length", "shape", "dtype" or "values".
+        expected: The expected value, or a description of it such as its shape.
+        actual: The actual value, or a description of it.
+        mismatch_count (int): The number of mismatching elements, for "values".
+        element_count (int): The number of compared elements, for "values".
+        max_abs_error (float | None): The largest absolute difference, for numeric values.
+        max_rel_error (float | None): The largest difference relative to the expected value,
+            for numeric values, leaving out elements where the expected value is zero.
+        first_mismatch_index (tuple | None): The index of the first mismatching element of an array.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        reason: str,
+        expected: Any = None,
+        actual: Any = None,
+        mismatch_count: int = 1,
+        element_count: int = 1,
+        max_abs_error: float | None = None,
+        max_rel_error: float | None = None,
+        first_mismatch_index: tuple | None = None,
+    ) -> None:
+        self.path = path
+        self.reason = reason
+        self.expected = expected
+        self.actual = actual
+        self.mismatch_count = mismatch_count
+        self.element_count = element_count
+        self.max_abs_error = max_abs_error
+        self.max_rel_error = max_rel_error
+        self.first_mismatch_index = first_mismatch_index
+
+    def to_dict(self) -> dict:
+        """The difference as a dictionary, with the values shortened to a preview."""
+        return {
+            "path": self.path,
+            "reason": self.reason,
+            "expected": _preview(self.expected),
+            "actual": _preview(self.actual),
+            "mismatch_count": self.mismatch_count,
+            "element_count": self.element_count,
+            "max_abs_error": self.max_abs_error,
+            "max_rel_error": self.max_rel_error,
+            "first_mismatch_index": self.first_mismatch_index,
+        }
+
+    def __str__(self) -> str:
+        location = self.path or "<outputs>"
+        if self.reason != "values":
+            return (
+                f"{location}: different {self.reason}, expected {_preview(self.expected)}, got {_preview(self.actual)}"
+            )
+        message = f"{location}: {self.mismatch_count} of {self.element_count} values differ"
+        if self.max_abs_error is not None:
+            message += f", max abs error {self.max_abs_error:.6g}"
+        if self.max_rel_error is not None:
+            message += f", max rel error {self.max_rel_error:.6g}"
+        if self.first_mismatch_index is not None:
+            message += f", first at {self.first_mismatch_index}"
+        return message + f" (expected {_preview(self.expected)}, got {_preview(self.actual)})"
+
+    def __repr__(self) -> str:
+        return f"OutputDifference({self})"
+
+
+class ComparisonReport:
+    """The differences found when comparing two sets of outputs. Truthy if there are none.
+
+    Attributes:
+        differences (list[OutputDifference]): The differences, in the order they were found.
+        truncated (bool): Whether the comparison stopped early, as there were more than max_differences.
+    """
+
+    def __init__(self, differences: list[OutputDifference] | None = None, truncated: bool = False) -> None:
+        self.differences = differences if differences is not None else []
+        self.truncated = truncated
+
+    @property
+    def equal(self) -> bool:
+        return not self.differences
+
+    def __bool__(self) -> bool:
+        return self.equal
+
+    def to_dict(self) -> dict:
+        return {
+            "equal": self.equal,
+            "truncated": self.truncated,
+            "differences": [difference.to_dict() for difference in self.differences],
+        }
+
+    def __str__(self) -> str:
+        if self.equal:
+            return "Outputs match"
+        lines = [f"{len(self.differences)} difference(s){' (stopped early)' if self.truncated else ''}:"]
+        lines.extend(f"  {difference}" for difference in self.differences)
+        return "\n".join(lines)
+
+    def __repr__(self) -> str:
+        return f"ComparisonReport(equal={self.equal}, differences={len(self.differences)})"
+
+
+class _StopComparison(Exception):
+    """Raised to stop comparing once a difference beyond max_differences has been found."""
+
+
+class _Comparator:
+    def __init__(self, max_differences: int | None, check_dtype: bool) -> None:
+        # At least one difference is kept, so that a truncated comparison is never reported as equal
+        self.max_differences = max(max_differences, 1) if max_differences is not None else None
+        self.check_dtype = check_dtype
+        self.differences: list[OutputDifference] = []
+
+    def add(self, difference: OutputDifference) -> None:
+        if self.max_differences is not None and len(self.differences) >= self.max_differences:
+            raise _StopComparison
+        logger.debug("%s", difference)
+        self.differences.append(difference)
+
+    def compare(self, expected, actual, path: str, rtol: float, atol: float) -> None:
+        if _is_scalar(expected) and _is_scalar(actual) and _comparable_scalars(expected, actual):
+            self.compare_scalars(expected, actual, path, rtol, atol)
+        elif isinstance(expected, Mapping) and isinstance(actual, Mapping):
+            # dict and OrderedDict (as loaded by json_tricks) are the same to MATLAB
+            if set(expected) != set(actual):
+                self.add(OutputDifference(path, "keys", sorted(map(str, expected)), sorted(map(str, actual))))
+                return
+            for key in expected:
+                self.compare(expected[key], actual[key], f"{path}.{key}" if path else str(key), rtol, atol)
+        elif type(expected) != type(actual) and not (
+            isinstance(expected, np.ndarray) and isinstance(actual, np.ndarray)
+        ):
+            self.add(OutputDifference(path, "type", type(expected).__name__, type(actual).__name__))
+        elif isinstance(expected, (list, tuple)):
+            if len(expected) != len(actual):
+                self.add(OutputDifference(path, "length", len(expected), len(actual)))
+                return
+            for i, (item1, item2) in enumerate(zip(expected, actual)):
+                self.compare(item1, item2, f"{path}[{i}]", rtol, atol)
+        elif isinstance(expected, np.ndarray):
+            self.compare_arrays(expected, actual, path, rtol, atol)
+        elif expected != actual:
+            self.add(OutputDifference(path, "values", expected, actual))
+
+    def compare_scalars(self, expected, actual, path: str, rtol: float, atol: float) -> None:
+        # Also handles a numpy scalar saved as a native Python type during serialization
+        value1 = expected.item() if isinstance(expected, np.generic) else expected
+        value2 = actual.item() if isinstance(actual, np.generic) else actual
+        if isinstance(value1, numbers.Number) and isinstance(value2, numbers.Number):
+            error = abs(value1 - value2)
+            if error == error and error <= atol + rtol * abs(value1) or (value1 != value1 and value2 != value2):
+                return
+            if value1 == value2:
+                # Equal infinities
+                return
+            relative = error / abs(value1) if value1 != 0 else None
+            self.add(OutputDifference(path, "values", value1, value2, max_abs_error=error, max_rel_error=relative))
+        elif value1 != value2:
+            self.add(OutputDifference(path, "values", value1, value2))
+
+    def compare_arrays(self, expected: np.ndarray, actual: np.ndarray, path: str, rtol: float, atol: float) -> None:
+        if expected.shape != actual.shape:
+            self.add(OutputDifference(path, "shape", expected.shape, actual.shape))
+            return
+        if expected.dtype.hasobject or actual.dtype.hasobject:
+            if expected.dtype != actual.dtype:
+                self.add(OutputDifference(path, "dtype", str(expected.dtype), str(actual.dtype)))
+                return
+            # A cell array, where each element can be anything
+            for index, item1 in np.ndenumerate(expected):
+                self.compare(item1, actual[index], f"{path}[{', '.join(map(str, index))}]", rtol, atol)
+            return
+        if self.check_dtype and expected.dtype != actual.dtype:
+            self.add(OutputDifference(path, "dtype", str(expected.dtype), str(actual.dtype)))
+            return
+
+        numeric = expected.dtype.kind in NUMERIC_KINDS and actual.dtype.kind in NUMERIC_KINDS
+        if not numeric:
+            if expected.dtype.kind != actual.dtype.kind:
+                self.add(OutputDifference(path, "dtype", str(expected.dtype), str(actual.dtype)))
+                return
+            mismatches = np.asarray(expected != actual)
+            if mismatches.any():
+                self.add_array_difference(path, expected, actual, mismatches)
+            return
+
+        # The fast path for exact comparisons, without temporary arrays of errors
+        if rtol == 0 and atol == 0 and np.array_equal(expected, actual, equal_nan=expected.dtype.kind in "fc"):
+            return
+        if expected.dtype.kind in "b" or actual.dtype.kind in "b":
+            expected, actual = expected.astype(np.int8), actual.astype(np.int8)
+        # Subtract in a type wide enough not to wrap around, such as for unsigned integers
+        difference_type = np.result_type(expected.dtype, actual.dtype, np.float64)
+        with np.errstate(invalid="ignore", over="ignore"):
+            # Infinities of the same sign give NaN errors, handled below
+            errors = np.abs(expected.astype(difference_type, copy=False) - actual.astype(difference_type, copy=False))
+            mismatches = ~(errors <= atol + rtol * np.abs(expected))
+        if expected.dtype.kind in "fc" or actual.dtype.kind in "fc":
+            both_nan = np.isnan(expected) & np.isnan(actual)
+            mismatches &= ~(both_nan | (expected == actual))
+        if mismatches.any():
+            self.add_array_difference(path, expected, actual, mismatches, errors)
+
+    def add_array_difference(self, path: str, expected, actual, mismatches: np.ndarray, errors=None) -> None:
+        first = np.unravel_index(int(np.argmax(mismatches)), mismatches.shape) if mismatches.ndim else ()
+        max_abs_error = max_rel_error = None
+        if errors is not None:
+            mismatched_errors = errors[mismatches]
+            max_abs_error = float(np.nanmax(mismatched_errors)) if not np.all(np.isnan(mismatched_errors)) else None
+            reference = np.abs(np.asarray(expected)[mismatches])
+            with np.errstate(divide="ignore", invalid="ignore"):
+                relative = mismatched_errors / reference
+            relative = relative[np.isfinite(relative)]
+            max_rel_error = float(np.max(relative)) if relative.size else None
+        self.add(
+            OutputDifference(
+                path,
+                "values",
+                expected[first],
+                actual[first],
+                mismatch_count=int(np.count_nonzero(mismatches)),
+                element_count=int(mismatches.size),
+                max_abs_error=max_abs_error,
+                max_rel_error=max_rel_error,
+                first_mismatch_index=tuple(int(i) for i in first),
+            )
+        )
+
+
+def _is_scalar(value) -> bool:
+    return np.isscalar(value) or value is None
+
+
+def _comparable_scalars(value1, value2) -> bool:
+    # A numpy scalar may have been saved as a native Python type, otherwise the types must match
+    return isinstance(value1, np.generic) or isinstance(value2, np.generic) or type(value1) == type(value2)
+
+
+def _tolerance(tolerance) -> tuple[float, float]:
+    if isinstance(tolerance, Mapping):
+        return tolerance.get("rtol", 0.0), tolerance.get("atol", 0.0)
+    rtol, atol = tolerance
+    return rtol, atol
+
+
+def compare_outputs(
+    expected,
+    actual,
+    rtol: float = 0.0,
+    atol: float = 0.0,
+    tolerances: dict | None = None,
+    max_differences: int | None = None,
+    check_dtype: bool = True,
+) -> ComparisonReport:
+    """Compare two sets of outputs, such as MatlabExecutionResult.outputs.
+
+    Numeric values match if |expected - actual| <= atol + rtol * |expected|, so the expected values
+    are the reference; NaNs match each other. The default tolerances of zero require exact equality.
+
+    Args:
+        expected: The expected outputs, usually a dict of output names and values.
+        actual: The actual outputs.
+        rtol (float, optional): The relative tolerance. Defaults to 0.
+        atol (float, optional): The absolute tolerance. Defaults to 0.
+        tolerances (dict, optional): Tolerances for specific outputs, by output name, each given as
+            (rtol, atol) or {"rtol": ..., "atol": ...}. Applies to everything within that output.
+        max_differences (int, optional): Keep at most this many differences, stopping when another
+            is found. Defaults to finding all.
+        check_dtype (bool, optional): Whether numeric arrays of different types differ, even if
+            their values match. Defaults to True.
+
+    Returns:
+        ComparisonReport: The differences, truthy if there are none.
+    """
+    comparator = _Comparator(max_differences, check_dtype)
+    truncated = False
+    try:
+        if tolerances and isinstance(expected, Mapping) and isinstance(actual, Mapping):
+            if set(expected) != set(actual):
+                comparator.add(OutputDifference("", "keys", sorted(map(str, expected)), sorted(map(str, actual))))
+            else:
+                for name in expected:
+                    output_rtol, output_atol = _tolerance(tolerances[name]) if name in tolerances else (rtol, atol)
+                    comparator.compare(expected[name], actual[name], str(name), output_rtol, output_atol)
+        else:
+            comparator.compare(expected, actual, "", rtol, atol)
+    except _StopComparison:
+        truncated = True
+    return ComparisonReport(comparator.differences, truncated)
@@ -1,8 +1,31 @@
+from __future__ import annotations
+
 import fnmatch
+import hashlib
+import json
+import logging
 import os
-from typing import List
+import threading
+import time
+from typing import TYPE_CHECKING, List
+
+from visp_matlab_loader.project.matlab_project import FUNCTION_BINARIES_DIRECTORY, MatlabProject
+
+if TYPE_CHECKING:
+    from visp_matlab_loader.execute.mcr_cache import WarmUpResult
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.WARNING)
 
-from visp_matlab_loader.project.matlab_project import MatlabProject
+WRAPPER_PATTERN = "*_wrapper.m"
+
+# The index of found projects, stored in the searched directory if it is writable
+INDEX_FILE_NAME = ".compiled_projects_index.json"
+INDEX_VERSION = 2
+# Used for the index when the searched directory is not writable
+INDEX_CACHE_DIRECTORY = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")), "visp_matlab_loader"
+)
 
 
 def find_files(directory, pattern):
@@ -13,34 +36,215 @@ def find_files(directory, pattern):
                 yield filename
 
 
+def scan_directory(directory: str) -> dict:
+    """Find the wrapper files below directory, returning an index of them.
+
+    The index also holds the modification time of every directory searched. Adding, removing
+    or renaming a file or directory changes the modification time of the directory containing
+    it, so the index is still valid as long as none of these times have changed.
+
+    The binaries dedicated to single functions of a project are not projects of their own, so
+    their directories are not searched.
+    """
+    wrapper_files = []
+    directory_stamps = {}
+    for root, directories, files in os.walk(directory):
+        directories[:] = [name for name in directories if name != FUNCTION_BINARIES_DIRECTORY]
+        directory_stamps[os.path.relpath(root, directory)] = os.stat(root).st_mtime_ns
+        wrapper_files.extend(
+            os.path.relpath(os.path.join(root, basename), directory)
+            for basename in files
+            if fnmatch.fnmatch(basename, WRAPPER_PATTERN)
+        )
+    return {"version": INDEX_VERSION, "directories": directory_stamps, "wrapper_files": wrapper_files}
+
+
+def index_is_current(directory: str, index: dict) -> bool:
+    """Whether the directories in the index are unchanged, see scan_directory."""
+    if index.get("version") != INDEX_VERSION or not index.get("directories"):
+        return False
+    for relative_path, stamp in index["directories"].items():
+        try:
+            if os.stat(os.path.join(directory, relative_path)).st_mtime_ns != stamp:
+                return False
+        except OSError:
+            return False
+    return True
+
+
 class CompiledProjectFinder:
+    """Finds the compiled projects, by their wrapper files, below a directory.
+
+    The projects found are stored in an index file, which is reused as long as no directory in
+    the tree has changed, so that the tree does not have to be searched again. The index is kept
+    in the directory itself (shared by everyone using it) or, if that is not writable, in
+    INDEX_CACHE_DIRECTORY.
+
+    Use CompiledProjectFinder.shared to get the finder of a directory shared within the process,
+    along with its MatlabProjects and their executors.
+    """
+
+    _shared_finders: dict = {}
+    _shared_lock = threading.Lock()
+
     @property
     def found_projects(self) -> List[MatlabProject]:
         return self._compiled_projects
 
     def has_project(self, project_name) -> bool:
-        return any([project.name == project_name for project in self._compiled_projects])
+        return project_name in self._projects_by_name
 
     def get_project(self, project_name) -> MatlabProject:
-        for project in self._compiled_projects:
-            if project.name == project_name:
-                return project
-        raise ValueError(f"Could not find project with name '{project_name}'")
+        try:
+            return self._projects_by_name[project_name]
+        except KeyError:
+            raise ValueError(f"Could not find project with name '{project_name}'") from None
 
-    def __init__(self, directory, verbose=False) -> None:
+    def __init__(self, directory, verbose=False, use_index=True) -> None:
         self._compiled_projects: list[MatlabProject] = []
+        self._projects_by_name: dict[str, MatlabProject] = {}
 
         self.directory = directory
         # Check if the directory exists
         if not os.path.exists(self.directory):
             raise FileNotFoundError(f"No such directory: '{self.directory}'")
 
-        self._compiled_projects = [MatlabProject(x) for x in find_files(self.directory, "*_wrapper.m")]
+        self.use_index = use_index
+        self._index: dict = {}
+        self._validated = 0.0
+        self._lock = threading.Lock()
+        self.refresh()
 
         if verbose:
             for wrapper_file in self._compiled_projects:
                 print(wrapper_file.binary_file)
 
+    @classmethod
+    def shared(cls, directory, max_age: float = 10.0) -> "CompiledProjectFinder":
+        """The finder for directory shared within this process.
+
+        Args:
+            directory (str): The directory to search.
+            max_age (float, optional): If the shared finder was last checked against the directory tree
+                longer ago than this, in seconds, it is checked again (see refresh). Defaults to 10.
+        """
+        key = os.path.realpath(directory)
+        with cls._shared_lock:
+            finder = cls._shared_finders.get(key)
+            if finder is None:
+                finder = cls._shared_finders[key] = cls(directory)
+                return finder
+        if time.monotonic() - finder._validated > max_age:
+            finder.refresh()
+        return finder
+
+    def refresh(self) -> bool:
+        """Search the directory again if it has changed since the last search.
+
+        Projects that are still present keep their MatlabProject (and executor).
+
+        Returns:
+            bool: Whether the directory had changed.
+        """
+        with self._lock:
+            directory = os.path.abspath(self.directory)
+            if self._index and index_is_current(directory, self._index):
+                self._validated = time.monotonic()
+                return False
+
+            index = self._load_index(directory) if self.use_index and not self._index else None
+            if index is None or not index_is_current(directory, index):
+                logger.info("Searching %s for compiled projects", directory)
+                index = scan_directory(directory)
+                if self.use_index:
+                    self._save_index(directory, index)
+            self._index = index
+            self._validated = time.monotonic()
+
+            previous = {project.wrapper_file: project for project in self._compiled_projects}
+            self._compiled_projects = []
+            self._projects_by_name = {}
+            for relative_path in index["wrapper_files"]:
+                wrapper_file = os.path.join(directory, relative_path)
+                project = previous.get(wrapper_file) or MatlabProject(wrapper_file)
+                self._compiled_projects.append(project)
+                # As with a linear search, the first project with a name is used
+                self._projects_by_name.setdefault(project.name, project)
+            return True
+
+    def warm_up(
+        self,
+        cache_root: str,
+        worker_count: int = 1,
+        project_names: list[str] | None = None,
+        function_binaries: bool = True,
+    ) -> list[WarmUpResult]:
+        """Have the MATLAB Runtime extract every project ahead of time, see MatlabExecutor.warm_up.
+
+        The projects are warmed up one at a time, each filling worker_count cache roots below
+        cache_root in parallel. The cache roots are shared by the projects.
+
+        Args:
+            cache_root (str): The directory of the per-worker cache roots.
+            worker_count (int, optional): The number of cache roots to fill. Defaults to 1.
+            project_names (list[str], optional): Only warm up these projects. Defaults to all.
+            function_binaries (bool, optional): Whether to also warm up the binaries dedicated to single
+                functions of the projects. Defaults to True.
+
+        Returns:
+            list[WarmUpResult]: The start latencies of each binary and cache root.
+        """
+        results = []
+        for project in self.found_projects:
+            if project_names and project.name not in project_names:
+                continue
+            results.extend(project.warm_up(cache_root, worker_count, function_binaries))
+        return results
+
+    @staticmethod
+    def _index_files(directory: str) -> list[str]:
+        """Where the index of directory may be stored, in order of preference."""
+        cache_name = hashlib.sha1(directory.encode("utf-8")).hexdigest() + ".json"
+        return [os.path.join(directory, INDEX_FILE_NAME), os.path.join(INDEX_CACHE_DIRECTORY, cache_name)]
+
+    def _load_index(self, directory: str) -> dict | None:
+        for index_file in self._index_files(directory):
+            try:
+                with open(index_file, "r", encoding="utf-8") as file:
+                    index = json.load(file)
+            except (OSError, ValueError):
+                continue
+            if index.get("root") == directory:
+                return index
+        return None
+
+    def _save_index(self, directory: str, index: dict) -> None:
+        index["root"] = directory
+        index_file, cache_file = self._index_files(directory)
+        try:
+            if not os.path.exists(index_file):
+                stamp = os.stat(directory).st_mtime_ns
+                open(index_file, "a", encoding="utf-8").close()
+                if index["directories"].get(".") == stamp:
+                    # Only creating the index file changed the directory since it was searched
+                    index["directories"]["."] = os.stat(directory).st_mtime_ns
+            # Written in place, as replacing the file would change the directory again. A reader seeing
+            # a partial file cannot parse it, and searches the directory itself.
+            with open(index_file, "w", encoding="utf-8") as file:
+                json.dump(index, file)
+            return
+        except OSError as e:
+            logger.info("Could not write the project index %s: %s", index_file, e)
+
+        temporary_file = f"{cache_file}.{os.getpid()}.{threading.get_ident()}"
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            with open(temporary_file, "w", encoding="utf-8") as file:
+                json.dump(index, file)
+            os.replace(temporary_file, cache_file)
+        except OSError as e:
+            logger.info("Could not write the project index %s: %s", cache_file, e)
+
 
 # Test main function
 def main():
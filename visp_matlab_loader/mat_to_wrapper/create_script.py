@@ -36,6 +36,8 @@ def directory_to_script(
     verbose: bool = False,
     excluded_files: List[str] | None = None,
     save_function_location=None,
+    worker_mode: bool = False,
+    included_functions: List[str] | None = None,
 ):
     """Create a MATLAB function wrapper for a given directory.
 
@@ -51,6 +53,13 @@ def directory_to_script(
                     specified output variables, so we must specify this.
     - varargin: A cell list of inputs for the function, in the order they should
                 according to the function signature.
+    - output_file: Optional. The file to save the results to. Defaults to 'results.mat'
+                   in the current directory.
+
+    Instead of function_name, output_count and varargin, the input file may contain:
+    - requests: A cell list of {function_name, output_count, varargin} cells, which are
+                called in order. The results are then a cell list with one {success, result}
+                cell per request, where result is the error message if the call failed.
 
 
     Args:
@@ -58,6 +67,12 @@ def directory_to_script(
         verbose (bool, optional): Whether to give additional status prints or not
         excluded_files (list, optional): A list of files which should be excluded, perhaps
                 as they are oddly shaped. Defaults to ['startup.m'].
+        worker_mode (bool, optional): Whether to generate the worker variant of the wrapper.
+                The worker variant can still be called with a single input file, but when
+                started as `<binary> --worker <request_fifo> <response_fifo>` it stays alive
+                and serves requests until 'quit' is received. See the worker protocol below.
+        included_functions (list, optional): Only add these functions to the wrapper, for a binary
+                dedicated to them. Defaults to all functions found.
 
     Returns:
         tuple: A tuple with two variables, the script text itself and the list of
@@ -74,16 +89,47 @@ def directory_to_script(
     # Filter the list to only include MATLAB .m files
     matlab_files = [f for f in files if f.endswith(".m")]
 
-    # Create a string to hold the MATLAB function
-    matlab_function = "function results = call_matlab_function(input_file)\n\n"
+    # Create a string to hold the MATLAB function.
+    # The entry point only handles the input file (or the worker loop), while the
+    # actual call is made by the dispatch_function subfunction further down.
+    if worker_mode:
+        matlab_function = _worker_entry_point()
+    else:
+        matlab_function = "function results = call_matlab_function(input_file)\n\n"
+        matlab_function += "results = run_input_file(input_file);\n"
+        matlab_function += "\nend\n\n"
+    matlab_function += "function results = run_input_file(input_file)\n\n"
     matlab_function += "disp(input_file)\n"
     matlab_function += "inp = load(input_file);\n"
-    matlab_function += "function_name = inp.function_name;\n"
-    matlab_function += "varargin = inp.varargin;\n"
-    matlab_function += "for i = 1:length(inp.varargin)\n"
-    matlab_function += "    sprintf('Index %i, class: %s',i,class(inp.varargin{i}))\n"
+    matlab_function += "compute_start = tic;\n"
+    matlab_function += "if isfield(inp, 'requests')\n"
+    matlab_function += "    % Several calls in one go; a failing call does not stop the others\n"
+    matlab_function += "    results = cell(1, numel(inp.requests));\n"
+    matlab_function += "    for r = 1:numel(inp.requests)\n"
+    matlab_function += "        request = inp.requests{r};\n"
+    matlab_function += "        request_start = tic;\n"
+    matlab_function += "        try\n"
+    matlab_function += "            request_results = dispatch_function(request{1}, request{2}, request{3});\n"
+    matlab_function += "            results{r} = {true, request_results, toc(request_start)};\n"
+    matlab_function += "        catch err\n"
+    matlab_function += "            results{r} = {false, err.message, toc(request_start)};\n"
+    matlab_function += "        end\n"
+    matlab_function += "    end\n"
+    matlab_function += "else\n"
+    matlab_function += "    results = dispatch_function(inp.function_name, inp.output_count, inp.varargin);\n"
+    matlab_function += "end\n"
+    matlab_function += "compute_time = toc(compute_start);\n"
+    matlab_function += "if isfield(inp, 'output_file')\n"
+    matlab_function += "    save(inp.output_file,'results','compute_time')\n"
+    matlab_function += "else\n"
+    matlab_function += "    save('results.mat','results','compute_time')\n"
+    matlab_function += "end\n"
+    matlab_function += "\nend\n\n"
+    matlab_function += "function results = dispatch_function(function_name, output_count, function_inputs)\n\n"
+    matlab_function += "for i = 1:length(function_inputs)\n"
+    matlab_function += "    sprintf('Index %i, class: %s',i,class(function_inputs{i}))\n"
     matlab_function += "end\n"
-    matlab_function += "output = cell(1,inp.output_count);\n"
+    matlab_function += "output = cell(1,output_count);\n"
 
     found_functions = set()
 
@@ -150,11 +196,13 @@ def directory_to_script(
                 if verbose:
                     vprint(" ---- SKIPPED AS IT CONTAINS MULTIPLE LINES ------")
                 continue
+            if included_functions is not None and function not in included_functions:
+                break
             current_function += f"if strcmp(function_name, '{function}')\n"
             if len(output) > 0:
-                current_function += "    [output{:}] = " + f"{function}" + "(varargin{:});"
+                current_function += "    [output{:}] = " + f"{function}" + "(function_inputs{:});"
             else:
-                current_function += f"    {function}" + "(varargin{:});"
+                current_function += f"    {function}" + "(function_inputs{:});"
             if len(arguments) > 0:
                 current_function += f"%{arguments}"
             current_function += "\n"
@@ -179,7 +227,6 @@ def directory_to_script(
     matlab_function += "% Ensure that strings are in a format readable by e.g. python\n"
     matlab_function += "results{1} = cellstr(results{1});\n"
 
-    matlab_function += "save('results.mat','results')\n"
     # Close the function definition
     matlab_function += "\nend"
 
@@ -198,6 +245,49 @@ def directory_to_script(
     return matlab_function, function_dict
 
 
+# The worker protocol, shared by the generated worker wrapper and MatlabWorker:
+#   - The binary is started as `<binary> --worker <request_fifo> <response_fifo>`,
+#     with the working directory set to a directory private to the worker.
+#   - Each request is a single line written to the request FIFO, containing the path
+#     to an input .mat file (the same format as for a single call), or 'quit'.
+#   - Results are saved exactly as for a single call (so 'output_file' should be given in
+#     the input file), after which a single line is written to the response FIFO:
+#     'ok', or 'error <message>' if the call failed.
+WORKER_FLAG = "--worker"
+WORKER_QUIT_REQUEST = "quit"
+WORKER_OK_RESPONSE = "ok"
+WORKER_ERROR_RESPONSE = "error"
+
+
+def _worker_entry_point():
+    """Return the entry point of the worker variant of the wrapper, see the worker protocol above."""
+    entry_point = "function results = call_matlab_function(input_file, request_fifo, response_fifo)\n\n"
+    entry_point += f"if ~strcmp(input_file, '{WORKER_FLAG}')\n"
+    entry_point += "    results = run_input_file(input_file);\n"
+    entry_point += "    return\n"
+    entry_point += "end\n"
+    entry_point += "results = 0;\n"
+    entry_point += "while true\n"
+    entry_point += "    fid = fopen(request_fifo, 'r');\n"
+    entry_point += "    request = fgetl(fid);\n"
+    entry_point += "    fclose(fid);\n"
+    entry_point += f"    if ~ischar(request) || strcmp(request, '{WORKER_QUIT_REQUEST}')\n"
+    entry_point += "        break\n"
+    entry_point += "    end\n"
+    entry_point += "    try\n"
+    entry_point += "        run_input_file(request);\n"
+    entry_point += f"        response = '{WORKER_OK_RESPONSE}';\n"
+    entry_point += "    catch err\n"
+    entry_point += f"        response = ['{WORKER_ERROR_RESPONSE} ' regexprep(err.message, '\\s+', ' ')];\n"
+    entry_point += "    end\n"
+    entry_point += "    fid = fopen(response_fifo, 'w');\n"
+    entry_point += "    fprintf(fid, '%s\\n', response);\n"
+    entry_point += "    fclose(fid);\n"
+    entry_point += "end\n"
+    entry_point += "\nend\n\n"
+    return entry_point
+
+
 def dict_to_json(function_dict: dict, output_file: str):
     with open(output_file, "w") as f:
         json.dump(function_dict, f)
@@ -1,21 +1,134 @@
+from __future__ import annotations
+
 import glob
 import os
+import threading
+from typing import Iterable, Mapping, NamedTuple
+
+# Directories searched for MATLAB installations (as <root>/R20*) and MATLAB Runtime environments
+# (as <root>/MATLAB_Runtime/R20*), separated by os.pathsep. Overridden by set_search_roots.
+SEARCH_ROOTS_ENVIRONMENT_VARIABLE = "VISP_MATLAB_ROOTS"
+DEFAULT_SEARCH_ROOTS = ("/usr/local/MATLAB",)
+RUNTIME_DIRECTORY = "MATLAB_Runtime"
+
+
+class MatlabInstallations(NamedTuple):
+    """The MATLAB installations and MATLAB Runtime environments found, latest release first."""
+
+    matlab_installs: tuple[str, ...]
+    runtime_installs: tuple[str, ...]
+
+
+_configured_search_roots: tuple[str, ...] | None = None
+# The installations found per tuple of search roots, and the path setters shared within the process
+_installations: dict[tuple[str, ...], MatlabInstallations] = {}
+_shared_path_setters: dict[tuple, MatlabPathSetter] = {}
+_discovery_lock = threading.Lock()
+
+
+def search_roots() -> tuple[str, ...]:
+    """The directories searched, from set_search_roots, the environment variable or the default."""
+    if _configured_search_roots is not None:
+        return _configured_search_roots
+    roots = os.environ.get(SEARCH_ROOTS_ENVIRONMENT_VARIABLE, "")
+    return tuple(root for root in roots.split(os.pathsep) if root) or DEFAULT_SEARCH_ROOTS
+
+
+def set_search_roots(roots: Iterable[str] | None) -> None:
+    """Search these directories from now on, or go back to the environment variable or default if None."""
+    global _configured_search_roots  # pylint: disable=global-statement
+    with _discovery_lock:
+        _configured_search_roots = None if roots is None else tuple(roots)
+
+
+def _scan(roots: tuple[str, ...]) -> MatlabInstallations:
+    matlab_dirs = [path for root in roots for path in glob.glob(os.path.join(root, "R20*"))]
+    runtime_dirs = [path for root in roots for path in glob.glob(os.path.join(root, RUNTIME_DIRECTORY, "R20*"))]
+    # Latest release first. The sort is stable, so the first root wins among equal releases.
+    matlab_dirs.sort(key=os.path.basename, reverse=True)
+    runtime_dirs.sort(key=os.path.basename, reverse=True)
+    return MatlabInstallations(tuple(dict.fromkeys(matlab_dirs)), tuple(dict.fromkeys(runtime_dirs)))
+
+
+def discover_installations(refresh: bool = False) -> MatlabInstallations:
+    """The installations below the search roots.
+
+    The search roots are only searched the first time, after which the result is shared by the
+    whole process. Installing or removing a release is therefore not noticed until refresh is used.
+
+    Args:
+        refresh (bool, optional): Search again, see refresh_installations. Defaults to False.
+    """
+    if refresh:
+        refresh_installations()
+    roots = search_roots()
+    with _discovery_lock:
+        installations = _installations.get(roots)
+        if installations is None:
+            installations = _installations[roots] = _scan(roots)
+        return installations
+
+
+def refresh_installations() -> None:
+    """Forget the installations found, and the shared path setters, so that the next use searches again.
+
+    Path setters already in use keep the installation they were created with.
+    """
+    with _discovery_lock:
+        _installations.clear()
+        _shared_path_setters.clear()
 
 
 class MatlabPathSetter:
-    matlab_root: str | None = None
-    _matlab_available_installs: list = []
-    _matlab_runtime_installs: list = []
-    verbose: bool = False
+    """The MATLAB installation or MATLAB Runtime environment to use.
+
+    The installations are found by discover_installations, which only searches the disk once per
+    process. Instances cannot be changed after they are created, so MatlabPathSetter.shared can
+    hand the same instance to every executor.
+
+    Creating an instance does not change os.environ. Binaries are instead run with the environment
+    from child_environment, so that projects built for different releases can run side by side.
+    Use set_ld_library_path to change the environment of the current process as well.
+    """
+
+    __slots__ = ("matlab_root", "verbose", "_installations")
+
+    matlab_root: str | None
+    verbose: bool
 
     def vprint(self, string: str):
         if self.verbose:
             print(string)
 
     def __init__(self, version=None, verbose=False):
-        self.matlab_root = self.find_latest_matlab_or_runtime(version)
-        self.set_ld_library_path()
-        self.verbose = verbose
+        object.__setattr__(self, "verbose", verbose)
+        object.__setattr__(self, "_installations", discover_installations())
+        object.__setattr__(self, "matlab_root", self.find_latest_matlab_or_runtime(version))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} cannot be changed, create a new one instead")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} cannot be changed, create a new one instead")
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(matlab_root={self.matlab_root!r})"
+
+    @classmethod
+    def shared(cls, version: str | None = None) -> MatlabPathSetter:
+        """The path setter for version (or the latest release) shared within this process.
+
+        Only the first call searches for installations, later calls are a dictionary lookup until
+        refresh_installations is called.
+        """
+        key = (version, search_roots())
+        with _discovery_lock:
+            path_setter = _shared_path_setters.get(key)
+        if path_setter is None:
+            path_setter = cls(version)
+            with _discovery_lock:
+                path_setter = _shared_path_setters.setdefault(key, path_setter)
+        return path_setter
 
     # Property to get the MATLAB mcc binary
     @property
@@ -32,16 +145,23 @@ class MatlabPathSetter:
         return os.path.join(self.matlab_root, "bin", "matlab")
 
     @property
-    def matlab_installs(self) -> list[str]:
-        if self._matlab_runtime_installs is None:
-            self.find_latest_matlab_or_runtime()
-        return self._matlab_available_installs
+    def library_directories(self) -> list[str]:
+        """The directories of the installation that must be in LD_LIBRARY_PATH."""
+        if self.matlab_root is None:
+            return []
+        return [
+            os.path.join(self.matlab_root, "runtime/glnxa64"),
+            os.path.join(self.matlab_root, "bin/glnxa64"),
+            os.path.join(self.matlab_root, "sys/os/glnxa64"),
+        ]
+
+    @property
+    def matlab_installs(self) -> tuple[str, ...]:
+        return self._installations.matlab_installs
 
     @property
-    def matlab_runtime_installs(self) -> list[str]:
-        if self._matlab_runtime_installs is None:
-            self.find_latest_matlab_or_runtime()
-        return self._matlab_runtime_installs
+    def matlab_runtime_installs(self) -> tuple[str, ...]:
+        return self._installations.runtime_installs
 
     def can_support_version(self, version: str) -> bool:
         # Ensure version starts with 'R'
@@ -57,42 +177,30 @@ class MatlabPathSetter:
         return version in current_versions
 
     def find_latest_matlab_or_runtime(self, version: str | None = None):
-        # Get a list of all MATLAB installations
-        matlab_dirs = glob.glob("/usr/local/MATLAB/R20*")
-        matlab_dirs.sort(reverse=True)  # Sort in reverse order to get the latest version first
+        matlab_dirs = self.matlab_installs
         if self.verbose:
             print("Available MATLAB installations:")
             for dir in matlab_dirs:
                 print(dir)
 
-        self._matlab_available_installs = matlab_dirs
-
-        # Get a list of all MATLAB Runtime environments
-        runtime_dirs = glob.glob("/usr/local/MATLAB/MATLAB_Runtime/R20*")
-        runtime_dirs.sort(reverse=True)  # Sort in reverse order to get the latest version first
+        runtime_dirs = self.matlab_runtime_installs
         if self.verbose:
             print("Available MATLAB Runtime environments:")
-            if runtime_dirs is None:
+            if not runtime_dirs:
                 print("None")
             else:
                 for dir in runtime_dirs:
                     print(dir)
 
-        self._matlab_runtime_installs = runtime_dirs
-
         # If a specific version was requested, try to use it
         if version is not None:
             if not version.startswith("R"):
                 version = "R" + version
-            version_dir_matlab = "/usr/local/MATLAB/" + version
-            version_dir_runtime = "/usr/local/MATLAB/MATLAB_Runtime/" + version
-            if version_dir_matlab in matlab_dirs:
-                return version_dir_matlab
-            elif version_dir_runtime in runtime_dirs:
-                return version_dir_runtime
-            else:
-                self.vprint(f"Error: Requested version {version} not found.")
-                return None
+            for dir in matlab_dirs + runtime_dirs:
+                if os.path.basename(dir) == version:
+                    return dir
+            self.vprint(f"Error: Requested version {version} not found.")
+            return None
 
         # If no specific version was requested, use the latest MATLAB installation or MATLAB Runtime environment
         if matlab_dirs:
@@ -102,17 +210,45 @@ class MatlabPathSetter:
         else:
             return None
 
+    def child_environment(self, environment: Mapping[str, str] | None = None) -> dict[str, str]:
+        """The environment to run a binary using this installation with.
+
+        LD_LIBRARY_PATH starts with the library directories of this installation, and the
+        directories of every other installation found are removed from it, so that the binary only
+        loads the libraries of a single release. The given environment is not changed.
+
+        Args:
+            environment (Mapping[str, str], optional): The environment to start from. Defaults to os.environ.
+
+        Returns:
+            dict[str, str]: A new environment.
+        """
+        child_environment = dict(os.environ if environment is None else environment)
+        if self.matlab_root is None:
+            return child_environment
+
+        own_directories = self.library_directories
+        other_roots = tuple(
+            os.path.join(root, "")
+            for root in self.matlab_installs + self.matlab_runtime_installs
+            if root != self.matlab_root
+        )
+        kept_directories = [
+            directory
+            for directory in child_environment.get("LD_LIBRARY_PATH", "").split(os.pathsep)
+            if directory and directory not in own_directories and not directory.startswith(other_roots)
+        ]
+        child_environment["LD_LIBRARY_PATH"] = os.pathsep.join(own_directories + kept_directories)
+        return child_environment
+
     def set_ld_library_path(self):
+        """Add the library directories of this installation to LD_LIBRARY_PATH of the current process."""
         if self.matlab_root is None:
             print("MATLAB installation or MATLAB Runtime environment not found.")
             return
 
         # Define the directories to add to LD_LIBRARY_PATH
-        dirs_to_add = [
-            os.path.join(self.matlab_root, "runtime/glnxa64"),
-            os.path.join(self.matlab_root, "bin/glnxa64"),
-            os.path.join(self.matlab_root, "sys/os/glnxa64"),
-        ]
+        dirs_to_add = self.library_directories
 
         # Get the current LD_LIBRARY_PATH
         ld_library_path = os.getenv("LD_LIBRARY_PATH", "")
@@ -132,20 +268,22 @@ class MatlabPathSetter:
 
         self.vprint(f"LD_LIBRARY_PATH set to: {ld_library_path}")
 
-    def verify_paths(self):
+    def verify_paths(self, environment: Mapping[str, str] | None = None):
+        """Whether the library directories exist and are in LD_LIBRARY_PATH of environment.
+
+        Args:
+            environment (Mapping[str, str], optional): The environment to check. Defaults to child_environment().
+        """
         if self.matlab_root is None:
             self.vprint("Error: MATLAB installation or MATLAB Runtime environment not found!")
             return False
 
-        # Get the current LD_LIBRARY_PATH
-        ld_library_path = os.getenv("LD_LIBRARY_PATH", "")
+        if environment is None:
+            environment = self.child_environment()
+        ld_library_path = environment.get("LD_LIBRARY_PATH", "")
 
         # Define the directories to check in LD_LIBRARY_PATH
-        dirs_to_check = [
-            os.path.join(self.matlab_root, "runtime/glnxa64"),
-            os.path.join(self.matlab_root, "bin/glnxa64"),
-            os.path.join(self.matlab_root, "sys/os/glnxa64"),
-        ]
+        dirs_to_check = self.library_directories
 
         # Check if the MATLAB directories are in LD_LIBRARY_PATH and exist
         for dir_to_check in dirs_to_check:
@@ -161,13 +299,14 @@ class MatlabPathSetter:
 
 
 def main():
-    # Create an instance of the class, which will find the latest MATLAB installation or MATLAB Runtime environment and set LD_LIBRARY_PATH
+    # Create an instance of the class, which will find the latest MATLAB installation or MATLAB Runtime environment
     # If you want to use a specific version, you can pass it as an argument, like this:
     # matlab_path_setter = MatlabPathSetter('R2023A')
     matlab_path_setter = MatlabPathSetter()
+    matlab_path_setter.set_ld_library_path()
 
     # Verify that the MATLAB paths have been added to LD_LIBRARY_PATH
-    matlab_path_setter.verify_paths()
+    matlab_path_setter.verify_paths(os.environ)
 
 
 if __name__ == "__main__":
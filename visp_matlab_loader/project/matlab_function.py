@@ -5,9 +5,11 @@ Depends on numpy and visp_matlab_loader.
 """
 from __future__ import annotations
 
-from typing import List, OrderedDict
+import functools
+from typing import Any, Iterable, Iterator, List, OrderedDict
 
 import numpy as np
+from visp_matlab_loader.execute import batch_execution
 from visp_matlab_loader.execute.matlab_execution_result import MatlabExecutionResult
 
 from visp_matlab_loader.project.matlab_project import MatlabProject
@@ -70,6 +72,26 @@ class MatlabFunction:
             If an unknown input is provided, if there are too many inputs,
             or if there are missing inputs in the input chain.
         """
+        requested_output_count, inputs = self._prepare_call(*args, **kwargs)
+        return self.matlab_project.executor.execute_script(self.function_name, requested_output_count, *inputs)
+
+    async def execute_async(self, *args, **kwargs) -> MatlabExecutionResult:
+        """
+        Executes a MATLAB function, as execute, without blocking the event loop.
+
+        See MatlabExecutor.execute_script_async for how concurrent calls and cancellation are handled.
+
+        Returns
+        -------
+        The result of the MATLAB script execution as a MatlabExecutionResult.
+        """
+        requested_output_count, inputs = self._prepare_call(*args, **kwargs)
+        return await self.matlab_project.executor.execute_script_async(
+            self.function_name, requested_output_count, *inputs
+        )
+
+    def _prepare_call(self, *args, **kwargs) -> tuple[int, list]:
+        """Validate the arguments, returning the number of outputs to request and the inputs in order."""
         # Create ordered dict from inputs
         used_inputs = OrderedDict({k: None for k in self.inputs.keys()})
 
@@ -121,8 +143,53 @@ class MatlabFunction:
         else:
             requested_output_count = self.output_count
 
-        return self.matlab_project.executor.execute_script(
-            self.function_name, requested_output_count, *used_inputs.values()
+        return requested_output_count, list(used_inputs.values())
+
+    def map(
+        self,
+        argument_sets: Iterable[Any],
+        max_workers: int | None = None,
+        max_in_flight: int | None = None,
+        ordered: bool = True,
+    ) -> Iterator[tuple[int, MatlabExecutionResult]]:
+        """
+        Executes the MATLAB function for many sets of arguments, running several calls at once.
+
+        Each argument set is handled as by execute: a dict is passed as named arguments, a
+        list or tuple as unnamed arguments, and anything else as the single unnamed argument.
+        Errors, including invalid inputs, are returned as results with return code -1 rather
+        than stopping the remaining calls.
+
+        Parameters
+        ----------
+        argument_sets : Iterable
+            The arguments for each call. Only consumed as there is room for more calls.
+        max_workers : int, optional
+            The number of calls to run at the same time, see MatlabExecutor.execute_many.
+        max_in_flight : int, optional
+            The maximum number of calls started but not yet yielded.
+        ordered : bool, optional
+            Whether to yield results in the order of argument_sets, rather than as they complete.
+
+        Yields
+        ------
+        The index of each argument set together with its MatlabExecutionResult.
+        """
+
+        def as_call(arguments):
+            if isinstance(arguments, dict):
+                return functools.partial(self.execute, **arguments)
+            if isinstance(arguments, (list, tuple)):
+                return functools.partial(self.execute, *arguments)
+            return functools.partial(self.execute, arguments)
+
+        executor = self.matlab_project.executor
+        return batch_execution.run_concurrently(
+            (as_call(arguments) for arguments in argument_sets),
+            executor.error_result_factory(self.function_name),
+            max_workers=max_workers or executor.default_concurrency,
+            max_in_flight=max_in_flight,
+            ordered=ordered,
         )
 
     # Allow for this class to be printed in a reasonable way:
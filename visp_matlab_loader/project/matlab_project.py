@@ -14,13 +14,21 @@ import json
 import os
 from glob import glob
 import re
+import time
 from types import NoneType
 from typing import TYPE_CHECKING, OrderedDict
 
 if TYPE_CHECKING:
     from visp_matlab_loader.execute.compiled_project_executor import MatlabExecutor
+    from visp_matlab_loader.execute.mcr_cache import WarmUpResult
     from visp_matlab_loader.project.matlab_function import MatlabFunction
 
+# The directory in the compiled directory holding the binaries dedicated to single functions, one
+# subdirectory per function (see MATLABProjectCompiler.compile_function_binaries)
+FUNCTION_BINARIES_DIRECTORY = "function_binaries"
+# How long the dedicated binaries found are used before the directory is checked again, in seconds
+FUNCTION_BINARIES_MAX_AGE = 10.0
+
 
 class MatlabProject:
     """
@@ -49,6 +57,43 @@ class MatlabProject:
 
         return binary_name
 
+    @property
+    def function_binaries(self) -> dict[str, str]:
+        """The binaries dedicated to single functions, by function name.
+
+        As binaries are added and removed when the project is compiled again, the directory is checked
+        again once function_binaries_max_age seconds have passed since the last check, and searched
+        again if the modification time of the directory or of one of its subdirectories has changed.
+        """
+        now = time.monotonic()
+        checked_ago = now - self._function_binaries_checked
+        if self._function_binaries is not None and checked_ago < self.function_binaries_max_age:
+            return self._function_binaries
+        directory = os.path.join(self.compiled_directory, FUNCTION_BINARIES_DIRECTORY)
+        try:
+            with os.scandir(directory) as entries:
+                subdirectories = sorted((entry.name, entry.stat().st_mtime_ns) for entry in entries if entry.is_dir())
+            stamp = (os.stat(directory).st_mtime_ns, tuple(subdirectories))
+        except OSError:
+            subdirectories, stamp = [], None
+        if self._function_binaries is None or stamp != self._function_binaries_stamp:
+            self._function_binaries = {}
+            self._function_binaries_stamp = stamp
+            for function_name, _ in subdirectories:
+                binary = os.path.join(directory, function_name, function_name)
+                if os.path.isfile(binary) and os.access(binary, os.X_OK):
+                    self._function_binaries[function_name] = binary
+        self._function_binaries_checked = now
+        return self._function_binaries
+
+    def binary_file_for(self, function_name: str) -> str:
+        """The binary to call a function with, its dedicated binary if it has one."""
+        binary = self.function_binaries.get(function_name)
+        # Checked again, in case it was removed since the directory was searched
+        if binary is not None and os.path.isfile(binary):
+            return binary
+        return self.binary_file
+
     @property
     def name(self) -> str:
         return os.path.basename(self.compiled_directory)
@@ -115,9 +160,12 @@ class MatlabProject:
 
     @property
     def test_case_files(self) -> list[str]:
-        # Get all json files in the 'test_cases' directory:
+        # Get all json and npz files in the 'test_cases' directory:
         if self.test_case_directory is not None:
-            return glob(os.path.join(self.test_case_directory, "*.json"))
+            return sorted(
+                glob(os.path.join(self.test_case_directory, "*.json"))
+                + glob(os.path.join(self.test_case_directory, "*.npz"))
+            )
         return []
 
     def _get_executioner(
@@ -150,11 +198,21 @@ class MatlabProject:
             self._executioner = self._get_executioner()
         return self._executioner
 
+    def warm_up(
+        self, cache_root: str | None = None, worker_count: int = 1, function_binaries: bool | list[str] = True
+    ) -> list[WarmUpResult]:
+        """Have the MATLAB Runtime extract the compiled binaries ahead of time, see MatlabExecutor.warm_up."""
+        return self.executor.warm_up(cache_root, worker_count, function_binaries)
+
     def __init__(self, project_wrapper_file: str) -> None:
         self.wrapper_file = os.path.abspath(project_wrapper_file)
         self._executioner: MatlabExecutor | None = None
         self._functions = {}
         self._required_matlab_version = None
+        self._function_binaries: dict[str, str] | None = None
+        self._function_binaries_stamp: tuple | None = None
+        self._function_binaries_checked = 0.0
+        self.function_binaries_max_age = FUNCTION_BINARIES_MAX_AGE
 
     def __str__(self):
         message = (
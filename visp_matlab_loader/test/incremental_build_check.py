@@ -0,0 +1,97 @@
+"""
+Checks that incremental compilation skips projects that have not changed, across processes.
+
+The projects in the source directory are compiled twice with compile_projects, each time in a new
+Python process with a different PYTHONHASHSEED, using the stand-in mcc (see utils/stand_in_mcc.py)
+so that MATLAB is not needed. The first run must compile every project, and the second must report
+every project as up to date. Without a source directory, a generated project with several
+subdirectories is used, as the order of the directories included is what tends to vary:
+
+    python -m visp_matlab_loader.test.incremental_build_check
+    python -m visp_matlab_loader.test.incremental_build_check matlab/libraries
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from visp_matlab_loader.compile.matlab_compiler import SUMMARY_FILE_NAME
+from visp_matlab_loader.utils.stand_in_mcc import create_stand_in_installation
+
+PACKAGE_PARENT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+GENERATED_SUBDIRECTORIES = ("alpha", "beta", "gamma", "delta", "epsilon", "zeta", "eta", "theta")
+
+_COMPILE_CODE = (
+    "import sys\n"
+    "from visp_matlab_loader.compile.matlab_compiler import MATLABProjectCompiler\n"
+    "MATLABProjectCompiler.compile_projects(sys.argv[1], sys.argv[2])\n"
+)
+
+
+def generate_project(source_path: str) -> None:
+    """Write a project with a function in each of several subdirectories to source_path/nested_project."""
+    for name in GENERATED_SUBDIRECTORIES:
+        directory = os.path.join(source_path, "nested_project", name, "inner")
+        os.makedirs(directory)
+        with open(os.path.join(directory, f"{name}_value.m"), "w", encoding="utf-8") as file:
+            file.write(f"function y = {name}_value(x)\ny = x + 1;\nend\n")
+
+
+def compile_in_new_process(source_path: str, output_path: str, environment: dict[str, str]) -> list[dict]:
+    """Run compile_projects in a new Python process, returning the projects of its summary."""
+    subprocess.run(
+        [sys.executable, "-c", _COMPILE_CODE, source_path, output_path],
+        check=True,
+        env=environment,
+        cwd=PACKAGE_PARENT,
+        stdout=subprocess.DEVNULL,
+    )
+    with open(os.path.join(output_path, SUMMARY_FILE_NAME), "r", encoding="utf-8") as file:
+        return json.load(file)["projects"]
+
+
+def check(source_path: str | None = None) -> list[str]:
+    """Compile the projects twice, returning the problems found."""
+    problems = []
+    with tempfile.TemporaryDirectory(prefix="incremental_build_check_") as directory:
+        if source_path is None:
+            source_path = os.path.join(directory, "libraries")
+            generate_project(source_path)
+        environment = dict(os.environ)
+        environment["VISP_MATLAB_ROOTS"] = create_stand_in_installation(os.path.join(directory, "matlab"))
+        environment["STAND_IN_MCC_TIME"] = "0"
+        output_path = os.path.join(directory, "compiled")
+
+        environment["PYTHONHASHSEED"] = "1"
+        for project in compile_in_new_process(source_path, output_path, environment):
+            if project["return_code"] != 0 or project["skipped"]:
+                problems.append(f"{project['project']} was not compiled by the first run")
+
+        environment["PYTHONHASHSEED"] = "2"
+        projects = compile_in_new_process(source_path, output_path, environment)
+        if not projects:
+            problems.append(f"No projects found in {source_path}")
+        for project in projects:
+            if project["return_code"] != 0 or not project["skipped"]:
+                problems.append(f"{project['project']} was not up to date in the second run")
+    return problems
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source_path", nargs="?", help="The directory of the projects, defaults to a generated one")
+    args = parser.parse_args(argv)
+
+    problems = check(os.path.abspath(args.source_path) if args.source_path else None)
+    for problem in problems:
+        print(problem)
+    print("FAILED" if problems else "OK: every project was up to date in the second run")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
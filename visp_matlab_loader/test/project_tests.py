@@ -33,7 +33,7 @@ class TestMatlabProject:
         logger.info("Project has test data\nTest case files:")
         test_results = []
         for test_case in project.test_case_files:
-            test_case_execution = MatlabExecutionResult.from_json(file=test_case)
+            test_case_execution = MatlabExecutionResult.load(test_case)
             logger.info(f"\t{test_case}\nExecution result of function: {test_case_execution.function_name}")
 
             matlab_function = project.functions.get(test_case_execution.function_name)
@@ -47,8 +47,9 @@ class TestMatlabProject:
             logger.info(f"Found function: {matlab_function}\nExecuting...")
             new_result = matlab_function.execute(*test_case_execution.inputs)
 
-            if not new_result.compare_results(test_case_execution):
-                logger.warning("Results do not match")
+            comparison = new_result.compare_results(test_case_execution)
+            if not comparison:
+                logger.warning("Results do not match:\n%s", comparison)
             else:
                 logger.info("Results match!")
             test_results.append((test_case, test_case_execution, new_result))
@@ -0,0 +1,307 @@
+"""
+Runs the test cases of all compiled projects concurrently, as a regression test.
+
+Each test case is a stored MatlabExecutionResult (see MatlabProject.test_case_files). Its inputs
+are run again, and the new outputs are compared to the stored ones. Unlike
+TestMatlabProject.test_project, which runs the test cases of one project in turn, the cases of
+all projects found by CompiledProjectFinder are run in a pool of threads, each call being a
+separate MATLAB process.
+
+The wall time and match status of every case are reported, and can be written as JUnit XML (for
+CI) and as a JSON summary. The wall times can be stored as a baseline, and later runs can fail if
+a case becomes much slower than its baseline:
+
+    python -m visp_matlab_loader.test.regression_runner matlab/compiled --junit results.xml --json summary.json
+    python -m visp_matlab_loader.test.regression_runner matlab/compiled --baseline times.json --update-baseline
+    python -m visp_matlab_loader.test.regression_runner matlab/compiled --baseline times.json --fail-on-regression
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+import traceback
+import xml.etree.ElementTree as ET
+from typing import Iterable
+
+from visp_matlab_loader.execute import batch_execution
+from visp_matlab_loader.execute.matlab_execution_result import MatlabExecutionResult
+from visp_matlab_loader.find_compiled_projects import CompiledProjectFinder
+from visp_matlab_loader.project.matlab_project import MatlabProject
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+PASSED = "passed"
+FAILED = "failed"
+ERROR = "error"
+SKIPPED = "skipped"
+
+
+class TestCaseResult:
+    """The outcome of running a single test case.
+
+    Attributes:
+        project_name (str): The name of the project.
+        test_case (str): The test case file.
+        function_name (str): The function that was tested, if the test case could be read.
+        status (str): One of PASSED, FAILED (different outputs or return code), ERROR or SKIPPED.
+        wall_time (float): The time taken to run the case, in seconds.
+        message (str): Why the case did not pass, empty if it did.
+        baseline_time (float | None): The wall time recorded in the baseline, if any.
+        regressed (bool): Whether the wall time exceeded what the baseline allows.
+    """
+
+    __test__ = False  # Not a pytest test class
+
+    def __init__(
+        self,
+        project_name: str,
+        test_case: str,
+        function_name: str = "",
+        status: str = PASSED,
+        wall_time: float = 0.0,
+        message: str = "",
+    ) -> None:
+        self.project_name = project_name
+        self.test_case = test_case
+        self.function_name = function_name
+        self.status = status
+        self.wall_time = wall_time
+        self.message = message
+        self.baseline_time: float | None = None
+        self.regressed = False
+
+    @property
+    def name(self) -> str:
+        """The file name of the test case, unique within its project.
+
+        The extension is kept, as a case can be stored both as .json and as .npz.
+        """
+        return os.path.basename(self.test_case)
+
+    @property
+    def key(self) -> str:
+        """The key of the test case in the baseline."""
+        return f"{self.project_name}/{self.name}"
+
+    def to_dict(self) -> dict:
+        return {
+            "project": self.project_name,
+            "test_case": self.test_case,
+            "function": self.function_name,
+            "status": self.status,
+            "wall_time": self.wall_time,
+            "baseline_time": self.baseline_time,
+            "regressed": self.regressed,
+            "message": self.message,
+        }
+
+
+def run_test_case(
+    project: MatlabProject, test_case: str, rtol: float = 0.0, atol: float = 0.0, check_dtype: bool = True
+) -> TestCaseResult:
+    """Run a single test case, comparing the new outputs to the stored ones.
+
+    The function is called through the executor with the stored number of outputs, rather than
+    through MatlabFunction.override_output_count, so that cases of the same function can run at once.
+    """
+    start = time.perf_counter()
+    result = TestCaseResult(project.name, test_case)
+    try:
+        expected = MatlabExecutionResult.load(test_case)
+        result.function_name = expected.function_name
+        if expected.function_name not in project.functions:
+            result.status = SKIPPED
+            result.message = f"Function {expected.function_name} not found in the project {project.name}"
+            return result
+
+        actual = project.executor.execute_script(expected.function_name, len(expected.outputs), *expected.inputs)
+        if actual.return_code != expected.return_code:
+            result.status = FAILED
+            result.message = (
+                f"Return code {actual.return_code}, expected {expected.return_code}\n{actual.execution_message}"
+            )
+        else:
+            comparison = actual.compare_results(expected, rtol=rtol, atol=atol, check_dtype=check_dtype)
+            if not comparison:
+                result.status = FAILED
+                result.message = str(comparison)
+    except Exception:  # pylint: disable=broad-except
+        result.status = ERROR
+        result.message = traceback.format_exc()
+    finally:
+        result.wall_time = time.perf_counter() - start
+    return result
+
+
+def collect_test_cases(projects: Iterable[MatlabProject], project_names: list[str] | None = None):
+    """The (project, test case file) pairs of the given projects, optionally only those named."""
+    for project in projects:
+        if project_names and project.name not in project_names:
+            continue
+        if not project.test_case_files:
+            logger.warning("Project %s has no test data, skipping...", project.name)
+        for test_case in project.test_case_files:
+            yield project, test_case
+
+
+def run_regression(
+    projects: Iterable[MatlabProject],
+    max_workers: int | None = None,
+    rtol: float = 0.0,
+    atol: float = 0.0,
+    project_names: list[str] | None = None,
+    check_dtype: bool = True,
+) -> list[TestCaseResult]:
+    """Run the test cases of all projects concurrently.
+
+    Args:
+        projects (Iterable[MatlabProject]): The projects, such as CompiledProjectFinder.found_projects.
+        max_workers (int, optional): The number of test cases to run at the same time. Defaults to the number of CPUs.
+        rtol (float, optional): The relative tolerance when comparing outputs. Defaults to 0.
+        atol (float, optional): The absolute tolerance when comparing outputs. Defaults to 0.
+        project_names (list[str], optional): Only run the test cases of these projects. Defaults to all.
+        check_dtype (bool, optional): Whether numeric outputs must also keep their type. Defaults to True.
+
+    Returns:
+        list[TestCaseResult]: The results, in the order of the projects and their test cases.
+    """
+    cases = list(collect_test_cases(projects, project_names))
+    logger.info("Running %d test cases", len(cases))
+
+    def error_result(message: str) -> TestCaseResult:
+        # Not reached, as run_test_case catches its own errors
+        return TestCaseResult("", "", status=ERROR, message=message)
+
+    results = []
+    for index, result in batch_execution.run_concurrently(
+        (lambda case=case: run_test_case(case[0], case[1], rtol, atol, check_dtype) for case in cases),
+        error_result,
+        max_workers=max_workers,
+    ):
+        logger.info("[%d/%d] %s %s (%.2f s)", index + 1, len(cases), result.key, result.status, result.wall_time)
+        results.append(result)
+    return results
+
+
+def apply_baseline(results: list[TestCaseResult], baseline: dict, max_slowdown: float = 1.5, slack: float = 1.0):
+    """Mark the results that are slower than their baseline allows.
+
+    A case regresses if its wall time exceeds max_slowdown times its baseline time plus slack
+    seconds, the slack covering the variation in starting the MATLAB Runtime.
+    """
+    for result in results:
+        result.baseline_time = baseline.get(result.key)
+        if result.baseline_time is not None and result.status != SKIPPED:
+            result.regressed = result.wall_time > result.baseline_time * max_slowdown + slack
+
+
+def to_baseline(results: list[TestCaseResult]) -> dict:
+    return {result.key: result.wall_time for result in results if result.status == PASSED}
+
+
+def summarize(results: list[TestCaseResult], wall_time: float) -> dict:
+    """The JSON summary of a run."""
+    counts = {status: sum(result.status == status for result in results) for status in (PASSED, FAILED, ERROR, SKIPPED)}
+    return {
+        "total": len(results),
+        **counts,
+        "regressed": sum(result.regressed for result in results),
+        "wall_time": wall_time,
+        "cases": [result.to_dict() for result in results],
+    }
+
+
+def to_junit_xml(results: list[TestCaseResult]) -> ET.ElementTree:
+    """The results as JUnit XML, with a test suite per project."""
+    root = ET.Element("testsuites", name="visp_matlab_loader regression")
+    suites: dict[str, ET.Element] = {}
+    for result in results:
+        if result.project_name not in suites:
+            suites[result.project_name] = ET.SubElement(root, "testsuite", name=result.project_name)
+        case = ET.SubElement(
+            suites[result.project_name],
+            "testcase",
+            classname=result.project_name,
+            name=result.name,
+            time=f"{result.wall_time:.3f}",
+        )
+        if result.status == FAILED:
+            ET.SubElement(case, "failure", message="Outputs do not match").text = result.message
+        elif result.status == ERROR:
+            ET.SubElement(case, "error", message="Error running test case").text = result.message
+        elif result.status == SKIPPED:
+            ET.SubElement(case, "skipped", message=result.message)
+        if result.regressed:
+            ET.SubElement(case, "failure", message="Wall time regressed").text = (
+                f"{result.wall_time:.2f} s, baseline {result.baseline_time:.2f} s"
+            )
+
+    for suite in root:
+        cases = list(suite)
+        suite.set("tests", str(len(cases)))
+        suite.set("failures", str(sum(case.find("failure") is not None for case in cases)))
+        suite.set("errors", str(sum(case.find("error") is not None for case in cases)))
+        suite.set("skipped", str(sum(case.find("skipped") is not None for case in cases)))
+        suite.set("time", f"{sum(float(case.get('time')) for case in cases):.3f}")
+    return ET.ElementTree(root)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("compiled_directory", help="The directory of the compiled projects")
+    parser.add_argument("--projects", nargs="+", help="Only test these projects")
+    parser.add_argument("--workers", type=int, help="Test cases to run at the same time, defaults to the CPU count")
+    parser.add_argument("--rtol", type=float, default=0.0)
+    parser.add_argument("--atol", type=float, default=0.0)
+    parser.add_argument("--ignore-dtype", action="store_true", help="Compare numeric outputs by value only")
+    parser.add_argument("--junit", help="Write JUnit XML to this file")
+    parser.add_argument("--json", help="Write a JSON summary to this file")
+    parser.add_argument("--baseline", help="A JSON file of wall times per test case")
+    parser.add_argument("--update-baseline", action="store_true", help="Store the wall times of passing cases")
+    parser.add_argument("--fail-on-regression", action="store_true", help="Fail if a case is slower than its baseline")
+    parser.add_argument("--max-slowdown", type=float, default=1.5)
+    parser.add_argument("--slack", type=float, default=1.0, help="Seconds allowed on top of the slowdown")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(format="%(message)s")
+    start = time.perf_counter()
+    finder = CompiledProjectFinder(args.compiled_directory)
+    results = run_regression(
+        finder.found_projects, args.workers, args.rtol, args.atol, args.projects, not args.ignore_dtype
+    )
+
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            apply_baseline(results, json.load(file), args.max_slowdown, args.slack)
+    summary = summarize(results, time.perf_counter() - start)
+
+    for result in results:
+        if result.status != PASSED or result.regressed:
+            print(f"{result.status.upper()}{' (slower than baseline)' if result.regressed else ''}: {result.key}")
+            if result.message:
+                print(f"    {result.message.strip()}".replace("\n", "\n    "))
+    print(
+        f"{summary['total']} test cases: {summary[PASSED]} passed, {summary[FAILED]} failed, {summary[ERROR]} errors, "
+        f"{summary[SKIPPED]} skipped, {summary['regressed']} slower than baseline, in {summary['wall_time']:.1f} s"
+    )
+
+    if args.junit:
+        to_junit_xml(results).write(args.junit, encoding="utf-8", xml_declaration=True)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump(summary, file, indent=2)
+    if args.baseline and args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump(to_baseline(results), file, indent=2, sort_keys=True)
+
+    failed = summary[FAILED] or summary[ERROR]
+    return 1 if failed or (args.fail_on_regression and summary["regressed"]) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
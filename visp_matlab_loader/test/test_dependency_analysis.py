@@ -0,0 +1,104 @@
+"""
+Tests of the dependency analysis used to prune the directories of a project (see compile/dependency_analysis.py).
+
+    python -m pytest visp_matlab_loader/test/test_dependency_analysis.py
+"""
+from __future__ import annotations
+
+import os
+
+from visp_matlab_loader.compile import dependency_analysis
+
+
+def write(path, text: str = "") -> str:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(text)
+    return str(path)
+
+
+def test_mex_files_are_followed(tmp_path):
+    write(tmp_path / "a" / "foo.m", "function y = foo(x)\ny = fastkernel(x);\nend\n")
+    write(tmp_path / "b" / "fastkernel.mexa64")
+    write(tmp_path / "c" / "unused.m", "function unused()\nend\n")
+
+    report = dependency_analysis.analyze(str(tmp_path), ["foo"])
+
+    assert report.directories == (str(tmp_path / "a"), str(tmp_path / "b"))
+    assert report.excluded_directories == (str(tmp_path), str(tmp_path / "c"))
+    assert report.functions == ("fastkernel", "foo")
+    assert report.missing == ()
+    assert report.dynamic_calls == ()
+
+
+def test_mex_files_can_be_allowed(tmp_path):
+    write(tmp_path / "a" / "foo.m", "function y = foo(name, x)\ny = feval(name, x);\nend\n")
+    write(tmp_path / "b" / "fastkernel.mexw64")
+
+    report = dependency_analysis.analyze(str(tmp_path), ["foo"], ["fastkernel"])
+
+    assert str(tmp_path / "b") in report.directories
+    assert report.missing == ()
+    assert [call.line for call in report.dynamic_calls] == [2]
+
+
+def test_data_directories_are_kept(tmp_path):
+    write(tmp_path / "a" / "foo.m", "function y = foo()\ny = load('coefficients.mat');\nend\n")
+    write(tmp_path / "data" / "coefficients.mat")
+
+    report = dependency_analysis.analyze(str(tmp_path), ["foo"])
+
+    assert report.directories == (str(tmp_path / "a"), str(tmp_path / "data"))
+
+
+def test_p_files_are_reported(tmp_path):
+    write(tmp_path / "a" / "foo.m", "function y = foo(x)\ny = obscured(x);\nend\n")
+    p_file = write(tmp_path / "b" / "obscured.p")
+
+    report = dependency_analysis.analyze(str(tmp_path), ["foo"])
+
+    assert str(tmp_path / "b") in report.directories
+    assert [call.file for call in report.dynamic_calls] == [p_file]
+
+
+def test_string_literal_calls_are_followed(tmp_path):
+    write(
+        tmp_path / "a" / "foo.m",
+        "function y = foo(x)\n"
+        "% commented_out(x)\n"
+        "y = feval('by_feval', x);\n"
+        "y = y + eval('by_eval(x)');\n"
+        "f = str2func(\"by_str2func\");\n"
+        "disp('only_in_a_string');\n"
+        "end\n",
+    )
+    for name in ("by_feval", "by_eval", "by_str2func", "commented_out", "only_in_a_string"):
+        write(tmp_path / name / f"{name}.m", f"function y = {name}(x)\ny = x;\nend\n")
+
+    report = dependency_analysis.analyze(str(tmp_path), ["foo"])
+
+    assert report.functions == ("by_eval", "by_feval", "by_str2func", "foo")
+    assert str(tmp_path / "commented_out") in report.excluded_directories
+    assert str(tmp_path / "only_in_a_string") in report.excluded_directories
+    assert report.dynamic_calls == ()
+
+
+def test_dynamic_calls_are_reported(tmp_path):
+    path = write(
+        tmp_path / "foo.m",
+        "function y = foo(name, code, x)\ny = feval(name, x);\neval(code);\nevalin('base', 'z = 1;');\nend\n",
+    )
+
+    report = dependency_analysis.analyze(str(tmp_path), ["foo", "not_there"])
+
+    assert [(call.file, call.line) for call in report.dynamic_calls] == [(path, 2), (path, 3), (path, 4)]
+    assert report.missing == ("not_there",)
+
+
+def test_private_directories_are_searched_through_their_parent(tmp_path):
+    write(tmp_path / "a" / "foo.m", "function y = foo(x)\ny = helper(x);\nend\n")
+    write(tmp_path / "a" / "private" / "helper.m", "function y = helper(x)\ny = x;\nend\n")
+
+    report = dependency_analysis.analyze(str(tmp_path), ["foo"])
+
+    assert report.directories == (str(tmp_path / "a"),)
@@ -0,0 +1,47 @@
+"""
+Tests of the hashing of inputs used as result cache keys (see execute/result_cache.py).
+
+    python -m pytest visp_matlab_loader/test/test_result_cache.py
+"""
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from visp_matlab_loader.execute.result_cache import UncacheableInputError, hash_values
+
+
+def test_dict_order_does_not_change_the_hash():
+    assert hash_values({"a": 1, "b": [2.0, "x"]}) == hash_values({"b": [2.0, "x"], "a": 1})
+
+
+def test_dict_key_type_changes_the_hash():
+    assert hash_values({1: "x"}) != hash_values({"1": "x"})
+
+
+def test_array_layout_does_not_change_the_hash():
+    array = np.arange(12, dtype=np.float64).reshape(3, 4)
+    assert hash_values(array) == hash_values(np.asfortranarray(array))
+    assert hash_values(array) == hash_values(array.T.copy().T)
+
+
+def test_array_shape_and_dtype_change_the_hash():
+    array = np.arange(12, dtype=np.float64)
+    assert hash_values(array) != hash_values(array.reshape(3, 4))
+    assert hash_values(array) != hash_values(array.astype(np.float32))
+
+
+def test_large_integers_are_hashed():
+    assert hash_values([{"n": 2**70}]) == hash_values([{"n": 2**70}])
+    assert hash_values(2**70) != hash_values(2**70 + 1)
+    assert hash_values(-(2**70)) != hash_values(2**70)
+
+
+def test_integers_hash_like_numpy_scalars():
+    assert hash_values(5) == hash_values(np.int64(5))
+    assert hash_values(2**64 - 1) == hash_values(np.uint64(2**64 - 1))
+
+
+def test_unsupported_types_are_uncacheable():
+    with pytest.raises(UncacheableInputError):
+        hash_values(object())
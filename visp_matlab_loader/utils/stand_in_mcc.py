@@ -0,0 +1,107 @@
+"""
+A stand-in for the MATLAB Compiler (mcc), used to exercise the compiler without MATLAB.
+
+It takes the options MatlabCompiler.compile passes to mcc, prints a line per included directory
+over COMPILE_TIME seconds (so that streamed output can be seen), and writes the stand-in binary
+from `stand_in_runtime.py` and a readme.txt to the output directory. The .m files of the included
+directories are appended to the binary as comments, standing in for its CTF archive, so that its
+size depends on the directories included. The time taken can be changed with the
+STAND_IN_MCC_TIME environment variable, and the stand-in fails if the script or a .m file in an
+included directory contains STAND_IN_MCC_FAIL.
+
+`create_stand_in_installation` creates a MATLAB installation directory using it as its mcc, to
+be found by MatlabPathSetter:
+
+    root = create_stand_in_installation('/tmp/matlab')
+    os.environ['VISP_MATLAB_ROOTS'] = root
+"""
+from __future__ import annotations
+
+import os
+import stat
+import sys
+import time
+
+# Make the package importable when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# pylint: disable=wrong-import-position
+from visp_matlab_loader.utils import stand_in_runtime
+
+COMPILE_TIME = 1.0
+FAIL_MARKER = "STAND_IN_MCC_FAIL"
+
+
+def create_stand_in_installation(directory: str, release: str = "R2023a") -> str:
+    """Create <directory>/<release>/bin/mcc running the stand-in, returning directory (the search root)."""
+    bin_directory = os.path.join(directory, release, "bin")
+    os.makedirs(bin_directory, exist_ok=True)
+    mcc_file = os.path.join(bin_directory, "mcc")
+    with open(mcc_file, "w", encoding="utf-8") as file:
+        file.write(
+            f'#!/bin/sh\nSTAND_IN_MCC_RELEASE={release} exec "{sys.executable}" "{os.path.abspath(__file__)}" "$@"\n'
+        )
+    os.chmod(mcc_file, os.stat(mcc_file).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return directory
+
+
+def append_archive(binary_file: str, sources: list[str]) -> None:
+    """Append the sources to the stand-in binary as comments."""
+    with open(binary_file, "a", encoding="utf-8") as binary:
+        for source in sources:
+            binary.write(f"\n# archived {os.path.basename(source)}\n")
+            with open(source, "r", encoding="utf-8", errors="replace") as file:
+                binary.writelines(f"# {line}" for line in file)
+
+
+def parse_arguments(argv: list[str]) -> tuple[dict[str, str], list[str], list[str]]:
+    """Split the mcc arguments into the options with a value, the included directories and the rest."""
+    options, include_directories, rest = {}, [], []
+    arguments = iter(argv)
+    for argument in arguments:
+        if argument == "-I":
+            include_directories.append(next(arguments))
+        elif argument in ("-o", "-d", "-R"):
+            options.setdefault(argument, [])
+            options[argument].append(next(arguments))
+        else:
+            rest.append(argument)
+    return {name: values[-1] for name, values in options.items()}, include_directories, rest
+
+
+def main(argv: list[str]) -> int:
+    options, include_directories, rest = parse_arguments(argv)
+    scripts = [argument for argument in rest if argument.endswith(".m")]
+    if "-o" not in options or "-d" not in options or len(scripts) != 1:
+        print("Usage: mcc -m [-v] [-R option] -o <name> -d <directory> <script.m> [-I <directory>]...")
+        return 1
+
+    sources = scripts + [
+        os.path.join(directory, name)
+        for directory in include_directories
+        if os.path.isdir(directory)
+        for name in sorted(os.listdir(directory))
+        if name.endswith(".m")
+    ]
+    for source in sources:
+        with open(source, "r", encoding="utf-8", errors="replace") as file:
+            if FAIL_MARKER in file.read():
+                print(f"Error: {source} contains {FAIL_MARKER}", file=sys.stderr)
+                return 1
+
+    compile_time = float(os.environ.get("STAND_IN_MCC_TIME", COMPILE_TIME))
+    print(f"Compiling {scripts[0]}", flush=True)
+    for directory in include_directories:
+        print(f"Adding {directory}", flush=True)
+        time.sleep(compile_time / max(len(include_directories), 1))
+
+    binary_file = os.path.join(options["-d"], options["-o"])
+    stand_in_runtime.write_stand_in_binary(binary_file)
+    append_archive(binary_file, sources)
+    stand_in_runtime.write_readme(options["-d"], os.environ.get("STAND_IN_MCC_RELEASE", "R2023a"))
+    print(f"Wrote {os.path.join(options['-d'], options['-o'])}", flush=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
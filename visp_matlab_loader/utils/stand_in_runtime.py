@@ -0,0 +1,218 @@
+"""
+A stand-in for the compiled `get_next_thousand` wrapper binary.
+
+It speaks the same input.mat/results.mat protocol as the wrapper generated by
+`create_script.directory_to_script` (including the worker mode), but is implemented in Python.
+This allows the executor to be exercised and measured without MATLAB or the MATLAB Runtime.
+
+A complete stand-in project, which can be loaded with `MatlabProject` or `CompiledProjectFinder`,
+is created using `create_stand_in_project`.
+
+The binary can be called in the same ways as the compiled wrapper:
+
+    stand_in_runtime.py <input_file>
+    stand_in_runtime.py --worker <request_fifo> <response_fifo>
+"""
+from __future__ import annotations
+
+import fcntl
+import os
+import stat
+import sys
+import time
+from typing import Callable
+
+import numpy as np
+from scipy.io import loadmat, savemat
+
+# Make the package importable when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# pylint: disable=wrong-import-position
+from visp_matlab_loader.mat_to_wrapper import create_script
+
+
+def _getnextfivetypes(input_val):
+    return (
+        float(input_val) + 0.5,
+        f"{input_val:g}",
+        np.array([input_val], dtype=object),
+        {"Value": input_val},
+        np.bool_(input_val != 0),
+    )
+
+
+# The time taken to "extract" the binary into an empty MCR cache root, see simulate_cache_extraction
+EXTRACTION_TIME = 0.5
+
+
+# Python versions of the functions in matlab/libraries/get_next_thousand, with their input and output names
+FUNCTIONS: dict[str, tuple[Callable, list[str], list[str]]] = {
+    "getnextone": (lambda x: (x + 1,), ["inputNumber"], ["nextNumber"]),
+    "getnextthousand": (lambda x: (np.arange(x + 1, x + 1001, dtype=float),), ["inputNumber"], ["nextNumbers"]),
+    "getnexttwothousand": (lambda x: (np.arange(x + 1, x + 2001, dtype=float),), ["inputNumber"], ["nextNumbers"]),
+    "getnextthree": (lambda x: (x + 1, x + 2, x + 3), ["inputNumber"], ["first", "second", "third"]),
+    "getnextthreelists": (
+        lambda x, y, z, count: tuple(np.arange(v + 1, v + count + 1, dtype=float) for v in (x, y, z)),
+        ["inputNumber1", "inputNumber2", "inputNumber3", "count"],
+        ["list1", "list2", "list3"],
+    ),
+    "getnextfivetypes": (
+        _getnextfivetypes,
+        ["inputVal"],
+        ["doubleVal", "stringVal", "cellVal", "structVal", "logicalVal"],
+    ),
+}
+
+
+def from_matlab(value):
+    """Convert a value loaded with squeeze_me=False to what the MATLAB function would see."""
+    if isinstance(value, np.ndarray):
+        if value.dtype == object:
+            return [from_matlab(x) for x in value.flat]
+        if value.dtype.kind == "U":
+            return "".join(value.flat)
+        if value.size == 1:
+            return value.item()
+    return value
+
+
+def dispatch_function(function_name: str, output_count: int, function_inputs: list):
+    """The equivalent of dispatch_function in the generated wrapper."""
+    if function_name not in FUNCTIONS:
+        raise ValueError(f"Undefined function '{function_name}'")
+    function, _, output_names = FUNCTIONS[function_name]
+    values = function(*function_inputs)[:output_count]
+
+    output = np.empty((len(values),), dtype=object)
+    for i, value in enumerate(values):
+        output[i] = value
+    results = np.empty((2,), dtype=object)
+    results[0] = np.array([", ".join(output_names)], dtype=object)
+    results[1] = output
+    return results
+
+
+def run_input_file(input_file: str):
+    """The equivalent of run_input_file in the generated wrapper."""
+    print(input_file)
+    inp = loadmat(input_file, squeeze_me=False, chars_as_strings=True)
+    compute_start = time.perf_counter()
+    if "requests" in inp:
+        results = np.empty((inp["requests"].size,), dtype=object)
+        for r, request in enumerate(inp["requests"].flat):
+            function_name, output_count, function_inputs = request.flat
+            result = np.empty((3,), dtype=object)
+            request_start = time.perf_counter()
+            try:
+                result[:2] = [
+                    True,
+                    dispatch_function(
+                        from_matlab(function_name), int(from_matlab(output_count)), from_matlab(function_inputs)
+                    ),
+                ]
+            except Exception as e:  # pylint: disable=broad-except
+                result[:2] = [False, str(e)]
+            result[2] = time.perf_counter() - request_start
+            results[r] = result
+    else:
+        results = dispatch_function(
+            from_matlab(inp["function_name"]),
+            int(from_matlab(inp["output_count"])),
+            from_matlab(inp["varargin"]),
+        )
+    compute_time = time.perf_counter() - compute_start
+    output_file = from_matlab(inp["output_file"]) if "output_file" in inp else "results.mat"
+    savemat(output_file, {"results": results, "compute_time": compute_time})
+    return results
+
+
+def simulate_cache_extraction() -> None:
+    """Behave like the MATLAB Runtime extracting the binary into MCR_CACHE_ROOT, if it is set.
+
+    The first start with a cache root takes EXTRACTION_TIME longer, holding a lock on the cache
+    root, so that other processes using the same cache root wait for it.
+    """
+    cache_root = os.environ.get("MCR_CACHE_ROOT")
+    if not cache_root:
+        return
+    os.makedirs(cache_root, exist_ok=True)
+    with open(os.path.join(cache_root, ".lock"), "w", encoding="utf-8") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        extracted = os.path.join(cache_root, "get_next_thousand")
+        if not os.path.isdir(extracted):
+            time.sleep(EXTRACTION_TIME)
+            os.makedirs(extracted)
+
+
+def serve(request_fifo: str, response_fifo: str) -> None:
+    """The equivalent of the worker loop in the generated wrapper."""
+    while True:
+        with open(request_fifo, "r", encoding="utf-8") as requests:
+            request = requests.readline()
+        if not request or request.strip() == create_script.WORKER_QUIT_REQUEST:
+            break
+        try:
+            run_input_file(request.strip())
+            response = create_script.WORKER_OK_RESPONSE
+        except Exception as e:  # pylint: disable=broad-except
+            response = f"{create_script.WORKER_ERROR_RESPONSE} {' '.join(str(e).split())}"
+        sys.stdout.flush()
+        with open(response_fifo, "w", encoding="utf-8") as responses:
+            responses.write(response + "\n")
+
+
+def create_stand_in_project(directory: str, project_name: str = "get_next_thousand") -> str:
+    """Create a compiled project directory using the stand-in as its binary.
+
+    Args:
+        directory (str): The directory in which to create the project directory.
+        project_name (str, optional): The name of the project. Defaults to 'get_next_thousand'.
+
+    Returns:
+        str: The path to the wrapper file of the project, as expected by `MatlabProject`.
+    """
+    project_directory = os.path.join(directory, project_name)
+    os.makedirs(project_directory, exist_ok=True)
+
+    wrapper_file = os.path.join(project_directory, f"{project_name}_wrapper.m")
+    with open(wrapper_file, "w", encoding="utf-8") as file:
+        file.write(f"% Stand-in project, the binary is {os.path.abspath(__file__)}\n")
+
+    write_stand_in_binary(os.path.join(project_directory, project_name))
+
+    function_dict = {name: {"output": outputs, "input": inputs} for name, (_, inputs, outputs) in FUNCTIONS.items()}
+    create_script.dict_to_json(function_dict, os.path.join(project_directory, "functions.json"))
+
+    write_readme(project_directory)
+
+    return wrapper_file
+
+
+def write_stand_in_binary(binary_file: str) -> None:
+    """Write an executable that runs the stand-in, to be used in place of a compiled binary."""
+    with open(binary_file, "w", encoding="utf-8") as file:
+        file.write(f'#!/bin/sh\nexec "{sys.executable}" "{os.path.abspath(__file__)}" "$@"\n')
+    os.chmod(binary_file, os.stat(binary_file).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+
+def write_readme(directory: str, release: str = "R2023a") -> None:
+    """Write the readme.txt of a compiled project, from which MatlabProject reads the required release."""
+    with open(os.path.join(directory, "readme.txt"), "w", encoding="utf-8") as file:
+        file.write(f"Stand-in project, not compiled.\nRequires MATLAB Runtime({release})\n")
+
+
+def main(argv: list[str]) -> int:
+    simulate_cache_extraction()
+    if len(argv) == 3 and argv[0] == create_script.WORKER_FLAG:
+        serve(argv[1], argv[2])
+        return 0
+    if len(argv) == 1:
+        run_input_file(argv[0])
+        return 0
+    print(__doc__)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
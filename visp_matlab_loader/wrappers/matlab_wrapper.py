@@ -34,7 +34,8 @@ class MatlabProjectWrapper(ABC):
         # set compiled directory to abs path
         self._compiled_directory = os.path.abspath(compiled_directory)
 
-        found_projects = CompiledProjectFinder(self._compiled_directory)
+        # Shared, so that creating several wrappers does not search the directory each time
+        found_projects = CompiledProjectFinder.shared(self._compiled_directory)
         if not found_projects.has_project(self._name):
             raise ValueError(f"Could not find project with name '{self._name}'")
         self._matlab_project = found_projects.get_project(self._name)